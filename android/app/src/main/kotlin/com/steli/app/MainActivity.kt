@@ -40,6 +40,7 @@ import androidx.compose.ui.graphics.Color
 import androidx.compose.ui.draw.clip
 import androidx.compose.ui.unit.dp
 import com.steli.app.data.AuthManager
+import com.steli.app.data.initHttpCache
 import com.steli.app.ui.screens.*
 import com.steli.app.ui.theme.SteliTheme
 
@@ -47,6 +48,7 @@ class MainActivity : ComponentActivity() {
     override fun onCreate(savedInstanceState: Bundle?) {
         super.onCreate(savedInstanceState)
         AuthManager.init(this)
+        initHttpCache(applicationContext)
         enableEdgeToEdge()
         setContent {
             SteliTheme {
@@ -1,15 +1,25 @@
 package com.steli.app.data
 
+import android.content.Context
+import okhttp3.Cache
 import okhttp3.Interceptor
 import okhttp3.OkHttpClient
 import retrofit2.Response
 import retrofit2.Retrofit
 import retrofit2.converter.gson.GsonConverterFactory
 import retrofit2.http.*
+import java.io.File
 
 /** Backend base URL: 10.0.2.2 is host machine from emulator. */
 private const val BASE_URL = "http://10.0.2.2:8000/"
 
+/** Response header with the version of a user's ranked list (sent back in PATCH requests). */
+const val RANKINGS_VERSION_HEADER = "X-Rankings-Version"
+
+/** Server-relative URLs (e.g. "/api/blobs/<sha256>" photos) resolved against [BASE_URL]. */
+fun resolveServerUrl(url: String): String =
+    if (url.startsWith("/")) BASE_URL.trimEnd('/') + url else url
+
 /** OkHttp interceptor that adds the auth token to every request. */
 private val authInterceptor = Interceptor { chain ->
     val original = chain.request()
@@ -24,17 +34,34 @@ private val authInterceptor = Interceptor { chain ->
     chain.proceed(request)
 }
 
-private val okHttpClient = OkHttpClient.Builder()
-    .addInterceptor(authInterceptor)
-    .build()
+/**
+ * Disk cache for responses with an ETag: OkHttp revalidates them with If-None-Match and the
+ * server answers 304 when nothing changed. Set by [initHttpCache] before the first request.
+ */
+private var httpCache: Cache? = null
 
-private val retrofit = Retrofit.Builder()
-    .baseUrl(BASE_URL)
-    .client(okHttpClient)
-    .addConverterFactory(GsonConverterFactory.create())
-    .build()
+private const val HTTP_CACHE_BYTES = 10L * 1024 * 1024
+
+fun initHttpCache(context: Context) {
+    httpCache = Cache(File(context.cacheDir, "http"), HTTP_CACHE_BYTES)
+}
 
-val steliApi: SteliApi = retrofit.create(SteliApi::class.java)
+private val okHttpClient by lazy {
+    OkHttpClient.Builder()
+        .addInterceptor(authInterceptor)
+        .apply { httpCache?.let { cache(it) } }
+        .build()
+}
+
+private val retrofit by lazy {
+    Retrofit.Builder()
+        .baseUrl(BASE_URL)
+        .client(okHttpClient)
+        .addConverterFactory(GsonConverterFactory.create())
+        .build()
+}
+
+val steliApi: SteliApi by lazy { retrofit.create(SteliApi::class.java) }
 
 interface SteliApi {
 
@@ -57,6 +84,10 @@ interface SteliApi {
     @GET("api/users/search")
     suspend fun searchUsers(@Query("q") query: String): List<UserPublic>
 
+    /** Public accounts followed by people the caller follows, most mutual follows first. */
+    @GET("api/users/me/suggestions")
+    suspend fun getFollowSuggestions(@Query("limit") limit: Int = 10): List<UserPublic>
+
     @GET("api/users/{username}")
     suspend fun getUser(@Path("username") username: String): UserPublic
 
@@ -95,11 +126,18 @@ interface SteliApi {
     @POST("api/spots")
     suspend fun createSpot(@Body request: CreateSpotRequest): StudySpot
 
+    @GET("api/spots/recommended")
+    suspend fun getRecommendedSpots(@Query("limit") limit: Int = 10): List<RecommendedSpot>
+
     // ── Rankings ──────────────────────────────────────────────────
 
     @PUT("api/rankings")
     suspend fun setRankings(@Body request: SetRankingsRequest): List<RankedSpot>
 
+    /** 409 if the list changed since [PatchRankingsRequest.version]. */
+    @PATCH("api/rankings")
+    suspend fun patchRankings(@Body request: PatchRankingsRequest): Response<List<RankedSpot>>
+
     @POST("api/rankings/compare")
     suspend fun compareSpots(@Body request: CompareSpotsRequest): CompareSpotsResponse
 
@@ -115,6 +153,10 @@ interface SteliApi {
     @GET("api/rankings/user/{username}")
     suspend fun getUserRankings(@Path("username") username: String): List<RankedSpot>
 
+    /** Same list, with its version in the [RANKINGS_VERSION_HEADER] header. */
+    @GET("api/rankings/user/{username}")
+    suspend fun getUserRankingsResponse(@Path("username") username: String): Response<List<RankedSpot>>
+
     @POST("api/rankings/feed/{eventId}/like")
     suspend fun toggleLike(@Path("eventId") eventId: Int): LikeResponse
 
@@ -29,6 +29,8 @@ data class UserPublic(
     @SerializedName("first_name") val firstName: String,
     @SerializedName("last_name") val lastName: String,
     @SerializedName("profile_photo_url") val profilePhotoUrl: String = "",
+    /** Resized renditions of [profilePhotoUrl] keyed by "avatar" / "card" / "full" (empty if none). */
+    @SerializedName("profile_photo_variants") val profilePhotoVariants: Map<String, String> = emptyMap(),
     @SerializedName("followers_count") val followersCount: Int = 0,
     @SerializedName("following_count") val followingCount: Int = 0,
     @SerializedName("ranked_count") val rankedCount: Int = 0,
@@ -36,6 +38,8 @@ data class UserPublic(
     @SerializedName("is_public") val isPublic: Boolean = false,
     @SerializedName("follow_status") val followStatus: String = "none",
     @SerializedName("pending_requests_count") val pendingRequestsCount: Int = 0,
+    /** Only in follow suggestions: how many people the viewer follows follow this user. */
+    @SerializedName("mutual_count") val mutualCount: Int = 0,
 )
 
 data class FollowResponse(
@@ -63,6 +67,14 @@ data class CreateSpotRequest(
     val category: String = "",
 )
 
+data class RecommendedSpot(
+    val spot: StudySpot,
+    /** Null for popular spots filled in when there are too few personal picks. */
+    @SerializedName("predicted_score") val predictedScore: Double? = null,
+    /** "similar_users" | "popular" */
+    val reason: String = "popular",
+)
+
 // ── Rankings ──────────────────────────────────────────────────────
 
 data class RankedItem(
@@ -76,6 +88,23 @@ data class SetRankingsRequest(
     val rankings: List<RankedItem>,
 )
 
+/** One incremental edit to the caller's list; null fields are left out of the request. */
+data class RankingOp(
+    val op: String, // "insert" | "move" | "update" | "remove"
+    @SerializedName("ranking_id") val rankingId: Int? = null,
+    @SerializedName("spot_name") val spotName: String? = null,
+    val position: Int? = null,
+    val score: Double? = null,
+    val notes: String? = null,
+    @SerializedName("photo_url") val photoUrl: String? = null,
+)
+
+data class PatchRankingsRequest(
+    /** [RANKINGS_VERSION_HEADER] of the list the ops were computed against. */
+    val version: Int,
+    val ops: List<RankingOp>,
+)
+
 data class CompareSpotsRequest(
     @SerializedName("winner_spot_name") val winnerSpotName: String,
     @SerializedName("loser_spot_name") val loserSpotName: String,
@@ -98,6 +127,7 @@ data class RankedSpot(
     val rating: String = "okay",
     val notes: String = "",
     @SerializedName("photo_url") val photoUrl: String = "",
+    @SerializedName("photo_variants") val photoVariants: Map<String, String> = emptyMap(),
     @SerializedName("created_at") val createdAt: String = "",
 )
 
@@ -110,6 +140,7 @@ data class FeedItem(
     val tier: String = "B",
     val notes: String = "",
     @SerializedName("photo_url") val photoUrl: String = "",
+    @SerializedName("photo_variants") val photoVariants: Map<String, String> = emptyMap(),
     @SerializedName("created_at") val createdAt: String = "",
     @SerializedName("likes_count") val likesCount: Int = 0,
     @SerializedName("is_liked") val isLiked: Boolean = false,
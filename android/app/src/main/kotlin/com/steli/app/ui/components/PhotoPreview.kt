@@ -23,6 +23,7 @@ import androidx.compose.ui.graphics.asImageBitmap
 import androidx.compose.ui.layout.ContentScale
 import coil.compose.AsyncImagePainter
 import coil.compose.SubcomposeAsyncImage
+import com.steli.app.data.resolveServerUrl
 import kotlinx.coroutines.Dispatchers
 import kotlinx.coroutines.withContext
 
@@ -85,7 +86,7 @@ fun PhotoPreview(
     }
 
     SubcomposeAsyncImage(
-        model = trimmed,
+        model = resolveServerUrl(trimmed),
         contentDescription = contentDescription,
         modifier = modifier,
         contentScale = contentScale,
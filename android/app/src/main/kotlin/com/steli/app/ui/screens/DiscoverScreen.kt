@@ -14,6 +14,7 @@ import androidx.compose.ui.Modifier
 import androidx.compose.ui.text.font.FontWeight
 import androidx.compose.ui.tooling.preview.Preview
 import androidx.compose.ui.unit.dp
+import com.steli.app.data.RecommendedSpot
 import com.steli.app.data.StudySpot
 import com.steli.app.data.UserPublic
 import com.steli.app.data.steliApi
@@ -36,23 +37,55 @@ fun DiscoverScreen(
     var spotsLoading by remember { mutableStateOf(true) }
     var spotsError by remember { mutableStateOf<String?>(null) }
     var spots by remember { mutableStateOf<List<StudySpot>>(emptyList()) }
+    var recommended by remember { mutableStateOf<List<RecommendedSpot>>(emptyList()) }
     var userSuggestions by remember { mutableStateOf<List<UserPublic>>(emptyList()) }
     var usersLoading by remember { mutableStateOf(false) }
     var addingSpotId by remember { mutableStateOf<Int?>(null) }
 
     val scope = rememberCoroutineScope()
+    val addSpot: (StudySpot) -> Unit = { spot ->
+        scope.launch {
+            addingSpotId = spot.id
+            onAddSpot(spot.name)
+            addingSpotId = null
+        }
+    }
 
     LaunchedEffect(query, refreshNonce) {
         val q = query.trim()
 
-        // Empty search: show global study spots (no user suggestions).
+        // Empty search: show recommendations, people the user may know and global study spots.
         if (q.isBlank()) {
             spotsLoading = true
             spotsError = null
             usersLoading = false
             userSuggestions = emptyList()
             try {
-                spots = steliApi.getSpots()
+                coroutineScope {
+                    val recommendedDeferred = async {
+                        try {
+                            steliApi.getRecommendedSpots(limit = 3)
+                        } catch (e: CancellationException) {
+                            throw e
+                        } catch (_: Exception) {
+                            emptyList()
+                        }
+                    }
+                    val suggestionsDeferred = async {
+                        try {
+                            steliApi.getFollowSuggestions(limit = 5)
+                        } catch (e: CancellationException) {
+                            throw e
+                        } catch (_: Exception) {
+                            emptyList()
+                        }
+                    }
+                    spots = steliApi.getSpots()
+                    recommended = recommendedDeferred.await()
+                    userSuggestions = suggestionsDeferred.await()
+                }
+            } catch (e: CancellationException) {
+                throw e
             } catch (_: Exception) {
                 spotsError = "Could not load study spots."
             } finally {
@@ -134,7 +167,7 @@ fun DiscoverScreen(
             )
 
             val trimmedQuery = query.trim()
-            if (trimmedQuery.isNotBlank() && (usersLoading || userSuggestions.isNotEmpty())) {
+            if (usersLoading || userSuggestions.isNotEmpty()) {
                 Spacer(Modifier.height(12.dp))
                 Text(
                     text = "SUGGESTED USERS",
@@ -204,7 +237,11 @@ fun DiscoverScreen(
                                                 color = MaterialTheme.colorScheme.onSurface,
                                             )
                                             Text(
-                                                text = "@${user.username}",
+                                                text = if (user.mutualCount > 0) {
+                                                    "@${user.username} · ${user.mutualCount} mutual"
+                                                } else {
+                                                    "@${user.username}"
+                                                },
                                                 style = MaterialTheme.typography.bodySmall,
                                                 color = MaterialTheme.colorScheme.onSurfaceVariant,
                                             )
@@ -224,6 +261,25 @@ fun DiscoverScreen(
                 }
             }
 
+            if (trimmedQuery.isBlank() && !spotsLoading && recommended.isNotEmpty()) {
+                Spacer(Modifier.height(12.dp))
+                Text(
+                    text = "RECOMMENDED FOR YOU",
+                    style = MaterialTheme.typography.labelSmall,
+                    color = MaterialTheme.colorScheme.onSurfaceVariant,
+                )
+                Spacer(Modifier.height(8.dp))
+                Column(verticalArrangement = Arrangement.spacedBy(8.dp)) {
+                    recommended.forEach { rec ->
+                        DiscoverSpotRow(
+                            spot = rec.spot,
+                            adding = addingSpotId == rec.spot.id,
+                            onAdd = { addSpot(rec.spot) },
+                        )
+                    }
+                }
+            }
+
             Spacer(Modifier.height(12.dp))
             Text(
                 text = "GLOBAL STUDY SPOTS",
@@ -262,13 +318,7 @@ fun DiscoverScreen(
                             DiscoverSpotRow(
                                 spot = spot,
                                 adding = addingSpotId == spot.id,
-                                onAdd = {
-                                    scope.launch {
-                                        addingSpotId = spot.id
-                                        onAddSpot(spot.name)
-                                        addingSpotId = null
-                                    }
-                                },
+                                onAdd = { addSpot(spot) },
                             )
                         }
                     }
@@ -221,7 +221,7 @@ private fun FeedCard(item: FeedItem) {
                     contentAlignment = Alignment.Center,
                 ) {
                     PhotoPreview(
-                        photoUrl = item.photoUrl,
+                        photoUrl = item.photoVariants["card"] ?: item.photoUrl,
                         contentDescription = item.spot.name,
                         modifier = Modifier.fillMaxSize(),
                         contentScale = ContentScale.Crop,
@@ -458,7 +458,7 @@ private fun UserAvatar(user: UserPublic, size: Int) {
     ) {
         if (user.profilePhotoUrl.isNotBlank()) {
             PhotoPreview(
-                photoUrl = user.profilePhotoUrl,
+                photoUrl = user.profilePhotoVariants["avatar"] ?: user.profilePhotoUrl,
                 contentDescription = "${user.firstName}'s photo",
                 modifier = Modifier.fillMaxSize(),
                 contentScale = ContentScale.Crop,
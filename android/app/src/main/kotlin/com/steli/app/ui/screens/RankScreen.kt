@@ -39,8 +39,64 @@ private data class LocalRankedSpot(
     val notes: String = "",
     val photoUrl: String = "",
     val rating: String = "okay", // "bad" | "okay" | "good"
+    val rankingId: Int? = null, // null until the server has stored it
 )
 
+private fun RankedSpot.toLocal() = LocalRankedSpot(
+    spotName = spot.name,
+    score = score,
+    notes = notes,
+    photoUrl = photoUrl,
+    rating = rating,
+    rankingId = id,
+)
+
+/*
+ * PATCH ops turning the server's list [saved] into [target]: remove what is gone, then walk
+ * [target] in order inserting new spots and moving / updating existing ones only where they
+ * differ, so a single drag or edit sends a handful of ops rather than the whole list.
+ */
+private fun rankingOps(saved: List<LocalRankedSpot>, target: List<LocalRankedSpot>): List<RankingOp> {
+    val kept = target.mapNotNull { it.rankingId }.toSet()
+    val ops = saved.filter { it.rankingId !in kept }
+        .map { RankingOp(op = "remove", rankingId = it.rankingId) }
+        .toMutableList()
+    val before = saved.associateBy { it.rankingId }
+    // The server's order as the ops so far leave it (null = a spot inserted by this patch).
+    val order = saved.mapNotNull { it.rankingId }.filter { it in kept }.toMutableList<Int?>()
+    target.forEachIndexed { i, spot ->
+        val id = spot.rankingId
+        if (id == null) {
+            ops += RankingOp(
+                op = "insert",
+                spotName = spot.spotName,
+                position = i,
+                score = spot.score,
+                notes = spot.notes,
+                photoUrl = spot.photoUrl,
+            )
+            order.add(i, null)
+            return@forEachIndexed
+        }
+        if (order.indexOf(id) != i) {
+            order.remove(id)
+            order.add(i, id)
+            ops += RankingOp(op = "move", rankingId = id, position = i)
+        }
+        val old = before[id] ?: return@forEachIndexed
+        if (old.score != spot.score || old.notes != spot.notes || old.photoUrl != spot.photoUrl) {
+            ops += RankingOp(
+                op = "update",
+                rankingId = id,
+                score = spot.score.takeIf { it != old.score },
+                notes = spot.notes.takeIf { it != old.notes },
+                photoUrl = spot.photoUrl.takeIf { it != old.photoUrl },
+            )
+        }
+    }
+    return ops
+}
+
 // Initial rating: 3 equal ranges on 0–10
 private const val SCORE_BAD_MAX = 10.0 / 3
 private const val SCORE_OKAY_MAX = (20.0 / 3) - .1
@@ -329,6 +385,9 @@ private class ComparingHandler(private val s: RankState.Comparing) : RankState.H
 @Composable
 fun RankScreen(prefillSpotName: String? = null) {
     var rankedSpots by remember { mutableStateOf<List<LocalRankedSpot>>(emptyList()) }
+    // The list as last stored on the server, and its version; saves send the difference.
+    var savedSpots by remember { mutableStateOf<List<LocalRankedSpot>>(emptyList()) }
+    var rankingsVersion by remember { mutableStateOf(0) }
     var state by remember(prefillSpotName) {
         mutableStateOf<RankState>(
             if (prefillSpotName.isNullOrBlank()) RankState.Viewing else RankState.Adding(prefillSpotName)
@@ -385,39 +444,49 @@ fun RankScreen(prefillSpotName: String? = null) {
     }
 
     // Load existing rankings in server order; normalize scores for display so position 1 = highest.
+    suspend fun loadRankings() {
+        val user = AuthManager.currentUser.value ?: return
+        val response = steliApi.getUserRankingsResponse(user.username)
+        val rankings = response.body() ?: return
+        rankingsVersion = response.headers()[RANKINGS_VERSION_HEADER]?.toIntOrNull() ?: 0
+        savedSpots = rankings.map { it.toLocal() }
+        rankedSpots = scoresFromRankOrder(savedSpots).sortedByDescending { it.score }
+    }
+
     LaunchedEffect(Unit) {
         try {
-            val user = AuthManager.currentUser.value ?: return@LaunchedEffect
-            val rankings = steliApi.getUserRankings(user.username)
-            val loaded = rankings.map {
-                LocalRankedSpot(
-                    spotName = it.spot.name,
-                    score = it.score,
-                    notes = it.notes,
-                    photoUrl = it.photoUrl,
-                    rating = it.rating,
-                )
-            }
-            rankedSpots = scoresFromRankOrder(loaded).sortedByDescending { it.score }
+            loadRankings()
         } catch (_: Exception) { }
         loading = false
     }
 
-    // Save the full ranked list to the server. Scores are normalized so position 1 = highest score
+    // Save the ranked list to the server as ops against what it last stored. Scores are normalized so position 1 = highest score
     fun saveRankings(spots: List<LocalRankedSpot>) {
         scope.launch {
             saving = true
             try {
                 val normalized = scoresFromRankOrder(spots).sortedByDescending { it.score }
-                steliApi.setRankings(
-                    SetRankingsRequest(
-                        rankings = normalized.map {
-                            RankedItem(spotName = it.spotName, score = it.score, notes = it.notes, photoUrl = it.photoUrl)
-                        }
-                    )
-                )
-                rankedSpots = normalized
-                error = null
+                val ops = rankingOps(savedSpots, normalized)
+                if (ops.isEmpty()) {
+                    rankedSpots = normalized
+                    error = null
+                    return@launch
+                }
+                val response = steliApi.patchRankings(PatchRankingsRequest(version = rankingsVersion, ops = ops))
+                val saved = response.body()
+                if (response.code() == 409) {
+                    // Changed on another device: show that list instead of overwriting it.
+                    loadRankings()
+                    error = "Your rankings changed on another device and were reloaded"
+                } else if (!response.isSuccessful || saved == null) {
+                    error = "Failed to save rankings due to error: HTTP " + response.code()
+                } else {
+                    rankingsVersion = response.headers()[RANKINGS_VERSION_HEADER]?.toIntOrNull() ?: rankingsVersion
+                    savedSpots = saved.map { it.toLocal() }
+                    val ids = saved.associate { it.spot.name.trim().lowercase() to it.id }
+                    rankedSpots = normalized.map { it.copy(rankingId = ids[it.spotName.trim().lowercase()]) }
+                    error = null
+                }
             } catch (e: Exception) {
                 error = "Failed to save rankings due to error: " + e.message
             } finally {
@@ -0,0 +1,197 @@
+"""Content-addressed blob storage for photos sent as data URLs."""
+
+import base64
+import binascii
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+import warnings
+from collections import Counter
+from pathlib import Path
+from typing import Iterator
+
+from cryptography.fernet import Fernet
+from PIL import Image
+
+URL_PREFIX = "/api/blobs/"
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+_DATA_URL_RE = re.compile(r"^data:([\w.+-]+/[\w.+-]+)?(?:;[\w-]+=[\w.-]+)*;base64,", re.IGNORECASE)
+# Blobs are served from the API's own origin, so only raster images that Pillow can
+# read are accepted, and they are stored under the type Pillow found, never the one
+# the client claimed (Pillow format -> MIME type).
+IMAGE_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "GIF": "image/gif", "WEBP": "image/webp"}
+MAX_PHOTO_BYTES = int(os.getenv("STELI_MAX_PHOTO_MB", "10")) * 1024 * 1024
+# A small, highly compressed file can still decode to gigabytes, so the pixel count is
+# capped too. Pillow itself refuses to open anything over twice this; between the two it
+# only warns, and the callers check the size themselves.
+MAX_IMAGE_PIXELS = int(os.getenv("STELI_MAX_IMAGE_PIXELS", str(50_000_000)))
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+warnings.filterwarnings("ignore", category=Image.DecompressionBombWarning)
+
+
+class InvalidPhoto(ValueError):
+    """A data URL that is not an accepted image, or is larger than MAX_PHOTO_BYTES or
+    MAX_IMAGE_PIXELS."""
+
+
+def is_digest(value: str) -> bool:
+    return bool(_DIGEST_RE.match(value))
+
+
+def blob_url(digest: str) -> str:
+    return URL_PREFIX + digest
+
+
+def digest_of(url: str | None) -> str | None:
+    """SHA-256 digest referenced by a blob URL, or None for anything else."""
+    if not url or not url.startswith(URL_PREFIX):
+        return None
+    digest = url[len(URL_PREFIX):]
+    return digest if is_digest(digest) else None
+
+
+def parse_data_url(url: str) -> tuple[str, bytes] | None:
+    """Split a base64 `data:` URL into (mime type, bytes). None if it is not one."""
+    m = _DATA_URL_RE.match(url)
+    if not m:
+        return None
+    try:
+        data = base64.b64decode(url[m.end():], validate=False)
+    except (binascii.Error, ValueError):
+        return None
+    return (m.group(1) or "application/octet-stream").lower(), data
+
+
+def image_type(data: bytes) -> str | None:
+    """MIME type of an accepted image format, or None if Pillow cannot read `data` as one.
+    Raises InvalidPhoto if the image has more than MAX_IMAGE_PIXELS pixels."""
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            mime = IMAGE_TYPES.get(img.format)
+            pixels = img.width * img.height
+            img.verify()
+    except Image.DecompressionBombError:
+        pixels = MAX_IMAGE_PIXELS + 1
+    except (OSError, ValueError, SyntaxError):
+        return None
+    if pixels > MAX_IMAGE_PIXELS:
+        raise InvalidPhoto(f"Photos must be at most {MAX_IMAGE_PIXELS // 1_000_000} megapixels")
+    return mime
+
+
+class BlobStore:
+    """Files keyed by SHA-256 of their bytes, Fernet-encrypted like the store snapshot.
+
+    Identical photos are written once; the Store refcounts references and deletes
+    unreferenced blobs at checkpoint time. `put()` pins the digest so a concurrent
+    garbage collection cannot delete it before the caller has recorded a reference.
+
+    Pins only cover this process. With `min_age` set (multi-worker mode), `put()` also
+    touches the file and `delete()` spares blobs written or re-put within that many
+    seconds, which covers another worker's upload still waiting to be recorded.
+    """
+
+    def __init__(self, root: Path, fernet: Fernet, min_age: float = 0):
+        self._root = root
+        self._fernet = fernet
+        self._min_age = min_age
+        self._lock = threading.Lock()
+        self._pins: Counter[str] = Counter()
+
+    def _path(self, digest: str) -> Path:
+        return self._root / digest[:2] / digest
+
+    def _variant_path(self, digest: str, variant: str, version: int) -> Path:
+        return self._root / digest[:2] / f"{digest}.{variant}.v{version}"
+
+    def _write(self, path: Path, data: bytes, mime: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with tmp_path.open("wb") as f:
+            f.write(self._fernet.encrypt(mime.encode("ascii") + b"\n" + data))
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(path)
+
+    def _read(self, path: Path) -> tuple[bytes, str] | None:
+        if not path.exists():
+            return None
+        plaintext = self._fernet.decrypt(path.read_bytes())
+        mime, _, data = plaintext.partition(b"\n")
+        return data, mime.decode("ascii")
+
+    def put(self, data: bytes, mime: str) -> str:
+        """Store bytes (once per digest) and return the digest, pinned until `unpin()`."""
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._pins[digest] += 1
+        path = self._path(digest)
+        if not path.exists():
+            self._write(path, data, mime)
+        elif self._min_age:
+            os.utime(path)
+        return digest
+
+    def get(self, digest: str) -> tuple[bytes, str] | None:
+        """(bytes, mime type) for a digest, or None if it is not stored."""
+        if not is_digest(digest):
+            return None
+        return self._read(self._path(digest))
+
+    def put_variant(self, digest: str, variant: str, version: int, data: bytes, mime: str) -> None:
+        self._write(self._variant_path(digest, variant, version), data, mime)
+
+    def get_variant(self, digest: str, variant: str, version: int) -> tuple[bytes, str] | None:
+        return self._read(self._variant_path(digest, variant, version))
+
+    def has_variants(self, digest: str, variants, version: int) -> bool:
+        return all(self._variant_path(digest, v, version).exists() for v in variants)
+
+    def unpin(self, digest: str) -> None:
+        with self._lock:
+            self._pins[digest] -= 1
+            if self._pins[digest] <= 0:
+                del self._pins[digest]
+
+    def delete(self, digest: str) -> bool:
+        """Remove a blob unless it is pinned. Returns True if it was removed."""
+        with self._lock:
+            if self._pins[digest] > 0:
+                return False
+            if self._min_age:
+                try:
+                    if time.time() - self._path(digest).stat().st_mtime < self._min_age:
+                        return False
+                except FileNotFoundError:
+                    pass
+            self._path(digest).unlink(missing_ok=True)
+            for derived in self._path(digest).parent.glob(f"{digest}.*"):
+                derived.unlink(missing_ok=True)
+            return True
+
+    def digests(self) -> Iterator[str]:
+        if not self._root.exists():
+            return
+        for shard in self._root.iterdir():
+            if shard.is_dir():
+                for path in shard.iterdir():
+                    if is_digest(path.name):
+                        yield path.name
+
+    def externalize(self, url: str) -> str:
+        """Store a data URL's image and return its (pinned) blob URL; other URLs pass
+        through. Raises InvalidPhoto for anything but an accepted image."""
+        m = _DATA_URL_RE.match(url) if url else None
+        if m is None:
+            return url
+        # Base64 is 4 characters per 3 bytes: reject oversized payloads before decoding.
+        if (len(url) - m.end()) // 4 * 3 > MAX_PHOTO_BYTES + 3:
+            raise InvalidPhoto(f"Photos must be at most {MAX_PHOTO_BYTES // (1024 * 1024)} MB")
+        parsed = parse_data_url(url)
+        mime = image_type(parsed[1]) if parsed and len(parsed[1]) <= MAX_PHOTO_BYTES else None
+        if mime is None:
+            raise InvalidPhoto("Photos must be JPEG, PNG, GIF or WebP images")
+        return blob_url(self.put(parsed[1], mime))
@@ -0,0 +1,88 @@
+"""Conditional GETs for the read endpoints the app refetches on every screen visit.
+
+A response is identified by a *stamp*: the endpoint, the entity, the version counters it
+depends on (app/versions.py) and the viewer class. The ETag is a digest of the stamp, so
+a request whose If-None-Match still matches gets a bare 304 before any data is loaded.
+Otherwise the serialized body is looked up by stamp in a bounded LRU and only built (and
+serialized) on a miss. Stamps are taken before the data is read, so a cached body is
+never older than its stamp.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+ETAG_HEADER = "ETag"
+# Clients keep the body but revalidate it on every use.
+CACHE_CONTROL = "private, no-cache"
+
+
+class ResponseCache:
+    """Serialized JSON bodies by stamp, least recently used evicted past `max_bytes`.
+    Thread-safe."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._bodies: OrderedDict[tuple, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, stamp: tuple) -> bytes | None:
+        with self._lock:
+            body = self._bodies.get(stamp)
+            if body is not None:
+                self._bodies.move_to_end(stamp)
+            return body
+
+    def put(self, stamp: tuple, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._bodies.pop(stamp, None)
+            if old is not None:
+                self._size -= len(old)
+            self._bodies[stamp] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._bodies.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._bodies = OrderedDict()
+            self._size = 0
+
+
+response_cache = ResponseCache(max_bytes=int(os.getenv("STELI_RESPONSE_CACHE_MB", "32")) * 1024 * 1024)
+
+
+def etag(stamp: tuple) -> str:
+    return '"' + hashlib.blake2b(repr(stamp).encode("utf-8"), digest_size=12).hexdigest() + '"'
+
+
+def matches(if_none_match: str | None, tag: str) -> bool:
+    """Whether an If-None-Match header lists `tag` (weak comparison, as for GET)."""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or any(c.removeprefix("W/") == tag for c in candidates)
+
+
+def cached_json(request: Request, stamp: tuple, build: Callable[[], object], headers: dict | None = None) -> Response:
+    """The JSON response `build()` returns for `stamp`: 304 if the client has it, else the
+    cached body, else a freshly built one. `headers` go on every outcome."""
+    tag = etag(stamp)
+    headers = {**(headers or {}), ETAG_HEADER: tag, "Cache-Control": CACHE_CONTROL}
+    if matches(request.headers.get("if-none-match"), tag):
+        return Response(status_code=304, headers=headers)
+    body = response_cache.get(stamp)
+    if body is None:
+        body = JSONResponse(jsonable_encoder(build())).body
+        response_cache.put(stamp, body)
+    return Response(body, media_type="application/json", headers=headers)
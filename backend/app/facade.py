@@ -2,7 +2,11 @@
 
 from __future__ import annotations
 
+import os
+
 from app.repositories import (
+    BlobRepository,
+    BlobRepositoryImpl,
     RankingRepository,
     RankingRepositoryImpl,
     SessionRepository,
@@ -14,16 +18,58 @@ from app.repositories import (
     UserRepository,
     UserRepositoryImpl,
 )
-from app.store import store
+
+STORAGE_BACKENDS = ("json", "sqlite")
 
 
 class SteliFacade:
-    def __init__(self):
-        self._users: UserRepository = UserRepositoryImpl(store)
-        self._sessions: SessionRepository = SessionRepositoryImpl(store)
-        self._social: SocialRepository = SocialRepositoryImpl(store)
-        self._spots: SpotRepository = SpotRepositoryImpl(store)
-        self._rankings: RankingRepository = RankingRepositoryImpl(store)
+    def __init__(self, storage: str | None = None):
+        storage = storage or os.getenv("STELI_STORAGE", "json")
+        if storage == "json":
+            from app.store import store
+
+            self._backend = store
+            self._users: UserRepository = UserRepositoryImpl(store)
+            self._sessions: SessionRepository = SessionRepositoryImpl(store)
+            self._social: SocialRepository = SocialRepositoryImpl(store)
+            self._spots: SpotRepository = SpotRepositoryImpl(store)
+            self._rankings: RankingRepository = RankingRepositoryImpl(store)
+            self._blobs: BlobRepository = BlobRepositoryImpl(store)
+        elif storage == "sqlite":
+            from app import sqlite_repositories as sql
+
+            backend = sql.SqliteBackend()
+            self._backend = backend
+            self._users = sql.SqliteUserRepository(backend)
+            self._sessions = sql.SqliteSessionRepository(backend)
+            self._social = sql.SqliteSocialRepository(backend)
+            self._spots = sql.SqliteSpotRepository(backend)
+            self._rankings = sql.SqliteRankingRepository(backend)
+            self._blobs = sql.SqliteBlobRepository(backend)
+        else:
+            raise ValueError(f"STELI_STORAGE must be one of {STORAGE_BACKENDS}, got {storage!r}")
+
+    def close(self):
+        """Flush and release the storage backend (called on shutdown)."""
+        self._backend.close()
+
+    @property
+    def multi_worker(self) -> bool:
+        """Whether several worker processes share the JSON store (`STELI_MULTI_WORKER`)."""
+        return getattr(self._backend, "multi_worker", False)
+
+    def sync(self):
+        """Apply writes made by other worker processes since the last call."""
+        if self.multi_worker:
+            self._backend.sync()
+
+    def sizes(self) -> dict[str, dict[str, int]]:
+        """Item counts and file sizes of the storage backend (the `/metrics` gauges)."""
+        return self._backend.sizes()
+
+    def entity_versions(self, keys: list[tuple[str, int]]) -> tuple:
+        """An epoch and the version of each (kind, id) entity, for ETags (see app/versions.py)."""
+        return self._backend.entity_versions(keys)
 
     # Users
     def create_user(self, username: str, password: str, first_name: str, last_name: str):
@@ -35,8 +81,8 @@ class SteliFacade:
     def get_user_by_username(self, username: str):
         return self._users.get_user_by_username(username)
 
-    def search_users(self, query: str):
-        return self._users.search_users(query)
+    def search_users(self, query: str, limit: int | None = None):
+        return self._users.search_users(query, limit=limit)
 
     def update_profile_photo(self, user_id: int, photo_url: str):
         return self._users.update_profile_photo(user_id, photo_url)
@@ -47,6 +93,9 @@ class SteliFacade:
     def is_profile_visible(self, target_id: int, viewer_id: int | None) -> bool:
         return self._users.is_profile_visible(target_id, viewer_id)
 
+    def get_user_cards(self, user_ids: list[int], viewer_id: int | None = None) -> list[dict]:
+        return self._users.get_user_cards(user_ids, viewer_id)
+
     # Sessions
     def create_token(self, user_id: int) -> str:
         return self._sessions.create_token(user_id)
@@ -82,11 +131,11 @@ class SteliFacade:
     def deny_follow_request(self, target_id: int, requester_id: int) -> bool:
         return self._social.deny_follow_request(target_id, requester_id)
 
-    def get_followers(self, user_id: int):
-        return self._social.get_followers(user_id)
+    def get_followers(self, user_id: int, limit: int | None = None, cursor: str | None = None):
+        return self._social.get_followers(user_id, limit=limit, cursor=cursor)
 
-    def get_following(self, user_id: int):
-        return self._social.get_following(user_id)
+    def get_following(self, user_id: int, limit: int | None = None, cursor: str | None = None):
+        return self._social.get_following(user_id, limit=limit, cursor=cursor)
 
     def followers_count(self, user_id: int) -> int:
         return self._social.followers_count(user_id)
@@ -94,6 +143,9 @@ class SteliFacade:
     def following_count(self, user_id: int) -> int:
         return self._social.following_count(user_id)
 
+    def get_follow_suggestions(self, user_id: int, limit: int = 10) -> list[tuple[int, int]]:
+        return self._social.get_follow_suggestions(user_id, limit=limit)
+
     # Spots
     def get_or_create_spot(self, name: str, category: str = ""):
         return self._spots.get_or_create_spot(name, category)
@@ -101,24 +153,45 @@ class SteliFacade:
     def list_spots(self):
         return self._spots.list_spots()
 
-    def search_spots(self, query: str):
-        return self._spots.search_spots(query)
+    def search_spots(self, query: str, limit: int | None = None):
+        return self._spots.search_spots(query, limit=limit)
+
+    def get_leaderboard(self, category: str = "", limit: int = 10):
+        return self._spots.get_leaderboard(category, limit=limit)
+
+    def get_recommended_spots(self, user_id: int, limit: int = 10):
+        return self._spots.get_recommended_spots(user_id, limit=limit)
+
+    def pairwise_rating(self, spot_id: int):
+        return self._spots.pairwise_rating(spot_id)
 
     # Rankings
     def set_rankings(self, user_id: int, ranked_items: list[dict]):
         return self._rankings.set_rankings(user_id, ranked_items)
 
+    def patch_rankings(self, user_id: int, version: int, ops: list[dict]):
+        return self._rankings.patch_rankings(user_id, version, ops)
+
+    def ranking_version(self, user_id: int) -> int:
+        return self._rankings.ranking_version(user_id)
+
     def get_user_rankings(self, user_id: int):
         return self._rankings.get_user_rankings(user_id)
 
     def ranked_count(self, user_id: int) -> int:
         return self._rankings.ranked_count(user_id)
 
-    def get_feed(self, user_id: int, limit: int = 20):
-        return self._rankings.get_feed(user_id, limit=limit)
+    def get_feed(self, user_id: int, limit: int = 20, cursor: str | None = None):
+        return self._rankings.get_feed(user_id, limit=limit, cursor=cursor)
+
+    def get_feed_page(self, user_id: int, limit: int = 20, cursor: str | None = None):
+        return self._rankings.get_feed_page(user_id, limit=limit, cursor=cursor)
 
-    def get_recent_rankings(self, limit: int = 20, viewer_id: int | None = None):
-        return self._rankings.get_recent_rankings(limit=limit, viewer_id=viewer_id)
+    def get_feed_items(self, event_ids: list[int], viewer_id: int | None = None):
+        return self._rankings.get_feed_items(event_ids, viewer_id)
+
+    def get_recent_rankings(self, limit: int = 20, viewer_id: int | None = None, cursor: str | None = None):
+        return self._rankings.get_recent_rankings(limit=limit, viewer_id=viewer_id, cursor=cursor)
 
     def get_matchup(self, user_id: int):
         return self._rankings.get_matchup(user_id)
@@ -136,8 +209,15 @@ class SteliFacade:
         comment = self._rankings.add_comment(feed_event_id, user_id, text)
         return comment
 
-    def get_comments(self, feed_event_id: int) -> list[dict]:
-        return self._rankings.get_comments(feed_event_id)
+    def get_comments(self, feed_event_id: int, limit: int | None = None, cursor: str | None = None) -> list[dict]:
+        return self._rankings.get_comments(feed_event_id, limit=limit, cursor=cursor)
+
+    # Blobs
+    def get_blob(self, digest: str):
+        return self._blobs.get_blob(digest)
+
+    def get_blob_variant(self, digest: str, variant: str):
+        return self._blobs.get_blob_variant(digest, variant)
 
 
 facade = SteliFacade()
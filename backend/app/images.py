@@ -0,0 +1,117 @@
+"""Sized JPEG variants of uploaded photos, rendered by a bounded background pool."""
+
+import io
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.blobs import MAX_IMAGE_PIXELS, BlobStore, digest_of, is_digest
+
+# variant -> longest edge in pixels. Ordered largest first so each variant is
+# downscaled from the previous one instead of from the original again.
+VARIANTS: dict[str, int] = {"full": 1600, "card": 640, "avatar": 160}
+JPEG_QUALITY = 82
+# Bump when the rendering changes so cached variants (and ETags) are replaced.
+PIPELINE_VERSION = 1
+
+
+class RenderTimeout(RuntimeError):
+    """Variants are still being rendered; the caller should retry later."""
+
+
+def variant_urls(url: str | None) -> dict[str, str]:
+    """Per-variant URLs for a blob URL ({} for empty or external URLs)."""
+    if not digest_of(url):
+        return {}
+    return {name: f"{url}/{name}" for name in VARIANTS}
+
+
+def render_variants(data: bytes) -> dict[str, bytes] | None:
+    """Decode once and encode every variant. None if the bytes are not an image (or one
+    of more than MAX_IMAGE_PIXELS pixels)."""
+    try:
+        img = Image.open(io.BytesIO(data))
+        if img.width * img.height > MAX_IMAGE_PIXELS:
+            return None
+        img.load()
+        img = ImageOps.exif_transpose(img)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        return None
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    out = {}
+    for name, edge in VARIANTS.items():
+        if max(img.size) > edge:
+            img = img.copy()
+            img.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        out[name] = buf.getvalue()
+    return out
+
+
+class ImagePipeline:
+    """Renders variants for stored blobs on a fixed-size thread pool.
+
+    Each original is rendered at most once at a time; concurrent requests for the
+    same digest share one future. Results are stored next to the original blob.
+    """
+
+    def __init__(self, blobs: BlobStore, workers: int | None = None):
+        self._blobs = blobs
+        workers = workers or int(os.getenv("STELI_IMAGE_WORKERS", "2"))
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="steli-images")
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future] = {}
+
+    def submit(self, digest: str) -> Future:
+        """Queue rendering for a digest (no-op future if already rendered or queued)."""
+        with self._lock:
+            fut = self._inflight.get(digest)
+            if fut is not None:
+                return fut
+            if self._blobs.has_variants(digest, VARIANTS, PIPELINE_VERSION):
+                fut = Future()
+                fut.set_result(True)
+                return fut
+            fut = self._pool.submit(self._render, digest)
+            self._inflight[digest] = fut
+            return fut
+
+    def _render(self, digest: str) -> bool:
+        try:
+            blob = self._blobs.get(digest)
+            if blob is None:
+                return False
+            data, _ = blob
+            rendered = render_variants(data)
+            if rendered is None:
+                return False  # not an image: there are no variants to serve
+            for name, body in rendered.items():
+                self._blobs.put_variant(digest, name, PIPELINE_VERSION, body, "image/jpeg")
+            return True
+        finally:
+            with self._lock:
+                self._inflight.pop(digest, None)
+
+    def get(self, digest: str, variant: str, timeout: float = 10.0) -> tuple[bytes, str] | None:
+        """Variant bytes, rendering them first (and waiting) if needed. None if the blob is
+        missing or not a renderable image; RenderTimeout if rendering takes over `timeout`."""
+        if variant not in VARIANTS or not is_digest(digest):
+            return None
+        found = self._blobs.get_variant(digest, variant, PIPELINE_VERSION)
+        if found is not None:
+            return found
+        try:
+            rendered = self.submit(digest).result(timeout=timeout)
+        except FutureTimeout:
+            raise RenderTimeout(digest) from None
+        if not rendered:
+            return None
+        return self._blobs.get_variant(digest, variant, PIPELINE_VERSION)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
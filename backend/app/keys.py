@@ -0,0 +1,34 @@
+"""Data-at-rest encryption key shared by every storage backend."""
+
+import os
+import secrets
+from pathlib import Path
+
+from cryptography.fernet import Fernet
+
+
+def load_fernet(data_dir: Path) -> Fernet:
+    """Load or generate the Fernet key in `data_dir/.store.key`.
+
+    Runs before any lock is taken, so workers starting together on a fresh data dir may
+    all get here. A new key is written in full to a private temporary file and then
+    linked into place, which fails if another process got there first; everyone then
+    uses the key that won.
+    """
+    data_dir.mkdir(parents=True, exist_ok=True)
+    key_file = data_dir / ".store.key"
+    if not key_file.exists():
+        tmp_path = data_dir / f".store.key.{os.getpid()}.{secrets.token_hex(4)}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(Fernet.generate_key() + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+            try:
+                os.link(tmp_path, key_file)
+            except FileExistsError:
+                pass  # another process created it; use theirs
+        finally:
+            tmp_path.unlink(missing_ok=True)
+    return Fernet(key_file.read_bytes().strip())
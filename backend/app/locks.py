@@ -0,0 +1,197 @@
+"""Store locks: per-collection reader/writer locks taken in one fixed order, and a
+cross-process file lock for multi-worker mode."""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from app.metrics import LOCK_WAIT
+
+try:
+    import fcntl
+except ImportError:  # Windows: multi-worker mode is unavailable.
+    fcntl = None
+
+# Collections are always locked in this order. In multi-worker mode the file lock and
+# the log tail lock come before them; the store's internal locks come after them
+# (blob refcounts -> commit -> WAL I/O -> flusher queue). A thread may re-enter a
+# lock it already holds, but never take one that sorts before a lock it holds.
+LOCK_ORDER = ("users", "sessions", "social", "rankings", "feed", "engagement")
+_RANK = {name: i for i, name in enumerate(LOCK_ORDER)}
+
+
+class RWLock:
+    """Many readers or one writer. Waiting writers hold back new readers, so a steady
+    stream of reads cannot starve a write.
+
+    Re-entrant: the writer may take the lock again (for reading or writing) and a
+    reader may read again even while a writer waits. Upgrading a read to a write is
+    an error, as two upgrading readers would deadlock.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._cond = threading.Condition(threading.Lock())
+        self._readers: dict[int, int] = {}  # thread ident -> read depth
+        self._writer: int | None = None
+        self._write_depth = 0
+        self._writers_waiting = 0
+
+    def acquire_read(self) -> float:
+        """Returns the seconds spent waiting (0.0 if the lock was free)."""
+        me = threading.get_ident()
+        start = None
+        with self._cond:
+            if self._writer != me and me not in self._readers:
+                while self._writer is not None or self._writers_waiting:
+                    start = start or time.perf_counter()
+                    self._cond.wait()
+            self._readers[me] = self._readers.get(me, 0) + 1
+        return time.perf_counter() - start if start else 0.0
+
+    def release_read(self):
+        me = threading.get_ident()
+        with self._cond:
+            depth = self._readers[me] - 1
+            if depth:
+                self._readers[me] = depth
+                return
+            del self._readers[me]
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self) -> float:
+        """Returns the seconds spent waiting (0.0 if the lock was free)."""
+        me = threading.get_ident()
+        start = None
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return 0.0
+            if me in self._readers:
+                raise RuntimeError(f"cannot upgrade the {self.name!r} read lock to a write lock")
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    start = start or time.perf_counter()
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._write_depth = 1
+        return time.perf_counter() - start if start else 0.0
+
+    def release_write(self):
+        with self._cond:
+            self._write_depth -= 1
+            if not self._write_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+
+class StoreLocks:
+    """One RWLock per collection in LOCK_ORDER; `hold()` takes several in that order."""
+
+    def __init__(self):
+        self._locks = {name: RWLock(name) for name in LOCK_ORDER}
+        self._held = threading.local()
+
+    @contextmanager
+    def hold(self, read: Iterable[str] = (), write: Iterable[str] = ()) -> Iterator[None]:
+        """Hold the named collections for reading and/or writing (write wins if both).
+
+        Raises RuntimeError instead of risking a deadlock if this thread already holds
+        a lock that sorts after one requested here.
+        """
+        write = set(write)
+        names = sorted(write.union(read), key=_RANK.__getitem__)
+        held: list[str] = self._held.__dict__.setdefault("names", [])
+        if held:
+            top = max(_RANK[name] for name in held)
+            for name in names:
+                if name not in held and _RANK[name] < top:
+                    raise RuntimeError(f"lock order violation: {name!r} requested while holding {held}")
+        taken: list[tuple[RWLock, bool]] = []
+        try:
+            for name in names:
+                lock = self._locks[name]
+                waited = lock.acquire_write() if name in write else lock.acquire_read()
+                if waited:
+                    # Only contended acquisitions are recorded; free locks cost nothing here.
+                    LOCK_WAIT.observe(waited, name, "write" if name in write else "read")
+                taken.append((lock, name in write))
+                held.append(name)
+            yield
+        finally:
+            for lock, exclusive in reversed(taken):
+                held.pop()
+                if exclusive:
+                    lock.release_write()
+                else:
+                    lock.release_read()
+
+    def holding(self) -> bool:
+        """Whether this thread holds any collection lock."""
+        return bool(getattr(self._held, "names", None))
+
+    def read(self, *names: str):
+        return self.hold(read=names)
+
+    def write(self, *names: str):
+        return self.hold(write=names)
+
+
+class FileLock:
+    """Exclusive lock shared by every process that opens `path` (flock), and by the
+    threads of this one.
+
+    Re-entrant within a thread; `acquire()` returns True only for the outermost
+    acquisition. POSIX only.
+    """
+
+    def __init__(self, path: Path):
+        if fcntl is None:
+            raise RuntimeError("file locks need fcntl (POSIX)")
+        self._path = path
+        self._mutex = threading.RLock()
+        self._depth = 0
+        self._fd: int | None = None
+
+    def acquire(self) -> bool:
+        self._mutex.acquire()
+        self._depth += 1
+        if self._depth > 1:
+            return False
+        try:
+            if self._fd is None:
+                self._path.parent.mkdir(parents=True, exist_ok=True)
+                self._fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o600)
+            with LOCK_WAIT.time("file", "write"):
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+        except BaseException:
+            self._depth -= 1
+            self._mutex.release()
+            raise
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if not self._depth:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._mutex.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def close(self):
+        with self._mutex:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
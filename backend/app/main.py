@@ -1,12 +1,38 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+
+from app.blobs import InvalidPhoto
+from app.etags import ETAG_HEADER
+from app.facade import facade
+from app.images import RenderTimeout
+from app.metrics import CONTENT_TYPE, RequestMetrics, exposition
+from app.pagination import NEXT_CURSOR_HEADER, InvalidCursor
+from app.passwords import HasherBusy
+from app.ranking_ops import RANKINGS_VERSION_HEADER, InvalidRankingOp, RankingVersionConflict
+from app.routers import auth, blobs, users, spots, rankings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Flush any batched (group/relaxed durability) writes before the process exits.
+    facade.close()
+
+
+def sync_with_other_workers():
+    """Multi-worker mode: apply other workers' writes before handling the request."""
+    facade.sync()
 
-from app.routers import auth, users, spots, rankings
 
 app = FastAPI(
     title="Steli API",
     description="Backend for Steli - share and rank study spots around campus",
     version="0.1.0",
+    lifespan=lifespan,
+    dependencies=[Depends(sync_with_other_workers)] if facade.multi_worker else [],
 )
 
 app.add_middleware(
@@ -15,14 +41,65 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, RANKINGS_VERSION_HEADER, ETAG_HEADER],
 )
+app.add_middleware(RequestMetrics)
+
+
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=400, content={"detail": "Invalid cursor"})
+
+
+@app.exception_handler(HasherBusy)
+async def hasher_busy_handler(request: Request, exc: HasherBusy):
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": "1"},
+        content={"detail": {"code": "SERVER_BUSY", "message": "Too many sign-ins right now, try again"}},
+    )
+
+
+@app.exception_handler(RenderTimeout)
+async def render_timeout_handler(request: Request, exc: RenderTimeout):
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": "1"},
+        content={"detail": {"code": "SERVER_BUSY", "message": "Photo is still being processed, try again"}},
+    )
+
+
+@app.exception_handler(InvalidRankingOp)
+async def invalid_ranking_op_handler(request: Request, exc: InvalidRankingOp):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.exception_handler(InvalidPhoto)
+async def invalid_photo_handler(request: Request, exc: InvalidPhoto):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.exception_handler(RankingVersionConflict)
+async def ranking_conflict_handler(request: Request, exc: RankingVersionConflict):
+    return JSONResponse(
+        status_code=409,
+        headers={RANKINGS_VERSION_HEADER: str(exc.current)},
+        content={"detail": {"code": "RANKINGS_CHANGED", "message": "Your rankings changed elsewhere, reload them"}},
+    )
 
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(spots.router, prefix="/api/spots", tags=["study-spots"])
 app.include_router(rankings.router, prefix="/api/rankings", tags=["rankings"])
+app.include_router(blobs.router, prefix="/api/blobs", tags=["blobs"])
 
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Request latencies, store lock waits and I/O timings, and store sizes for Prometheus."""
+    return Response(exposition(facade.sizes()), media_type=CONTENT_TYPE)
@@ -0,0 +1,155 @@
+"""Choosing which two spots a user is asked to compare next (`GET /api/rankings/matchup`).
+
+A comparison tells us most when neither outcome is a foregone conclusion and the spots
+have few comparisons behind them. Candidates are the spots the user has ranked, placed on
+the Elo scale by their score plus what the user's own comparisons moved them since. Each
+pick looks at the least-compared few spots and their nearest neighbours on that scale,
+skipping pairs the user compared recently.
+"""
+
+import bisect
+from collections import deque
+
+from app.pairwise import ELO_BASE, expected_score
+
+SCORE_SCALE = 40.0  # Elo points per score point: the 0-10 scale spans 10x odds
+RECENT_PAIRS = 20  # per user; not offered again while this recent
+ANCHORS = 4  # least-compared spots tried as one side of the pair
+NEIGHBORS = 4  # spots on each side of an anchor tried as the other
+
+
+def prior_rating(score: float) -> float:
+    """Where a ranking score sits on the Elo scale before any comparisons."""
+    return ELO_BASE + (score - 5.0) * SCORE_SCALE
+
+
+def standing(pairwise, user_id: int, spot_id: int, score: float) -> tuple[float, int]:
+    """(rating, comparisons) of a spot in a user's pool: their score moved by the Elo
+    their own comparisons gave it."""
+    elo, comparisons = pairwise.user_standing(user_id, spot_id)
+    return prior_rating(score) + elo - ELO_BASE, comparisons
+
+
+def information_gain(rating_a: float, rating_b: float, count_a: int, count_b: int) -> float:
+    """Fisher information of one outcome, p * (1 - p), weighted toward spots with few
+    comparisons."""
+    p = expected_score(rating_a, rating_b)
+    return p * (1.0 - p) * (1.0 / (1 + count_a) + 1.0 / (1 + count_b))
+
+
+class MatchupPool:
+    """One user's candidate spots, kept sorted by rating and by comparison count, so a
+    pick is a few bisects plus ANCHORS * NEIGHBORS candidate scores whatever the pool size.
+
+    Not thread-safe; the owner serializes changes.
+    """
+
+    def __init__(self):
+        self._entries: dict[int, tuple[float, int]] = {}  # spot id -> (rating, comparisons)
+        self._by_rating: list[tuple[float, int]] = []
+        self._by_count: list[tuple[int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, spot_id: int) -> bool:
+        return spot_id in self._entries
+
+    def put(self, spot_id: int, rating: float, comparisons: int):
+        self.remove(spot_id)
+        self._entries[spot_id] = (rating, comparisons)
+        bisect.insort(self._by_rating, (rating, spot_id))
+        bisect.insort(self._by_count, (comparisons, spot_id))
+
+    def remove(self, spot_id: int):
+        entry = self._entries.pop(spot_id, None)
+        if entry is None:
+            return
+        rating, comparisons = entry
+        del self._by_rating[bisect.bisect_left(self._by_rating, (rating, spot_id))]
+        del self._by_count[bisect.bisect_left(self._by_count, (comparisons, spot_id))]
+
+    def spot_ids(self) -> list[int]:
+        return list(self._entries)
+
+    def pick(self, recent=()) -> tuple[int, int] | None:
+        """The most informative pair of spot ids not in `recent` (a collection of
+        frozensets), or the most informative recent one when every candidate is."""
+        if len(self._entries) < 2:
+            return None
+        best, best_gain = None, -1.0
+        fallback, fallback_gain = None, -1.0
+        for count, anchor in self._by_count[:ANCHORS]:
+            rating = self._entries[anchor][0]
+            i = bisect.bisect_left(self._by_rating, (rating, anchor))
+            lo, hi = max(i - NEIGHBORS, 0), min(i + NEIGHBORS + 1, len(self._by_rating))
+            for other_rating, other in self._by_rating[lo:hi]:
+                if other == anchor:
+                    continue
+                gain = information_gain(rating, other_rating, count, self._entries[other][1])
+                if frozenset((anchor, other)) in recent:
+                    if gain > fallback_gain:
+                        fallback, fallback_gain = (anchor, other), gain
+                elif gain > best_gain:
+                    best, best_gain = (anchor, other), gain
+        return best or fallback
+
+
+class MatchupScheduler:
+    """Per-user `MatchupPool`s over each user's ranked spots, plus the pairs each user
+    compared last. Ratings and counts come from the user's own comparisons in `pairwise`.
+
+    Not thread-safe on its own: the store guards it with the rankings lock.
+    """
+
+    def __init__(self, pairwise):
+        self._pairwise = pairwise
+        self._pools: dict[int, MatchupPool] = {}
+        self._scores: dict[tuple[int, int], float] = {}  # (user id, spot id) -> ranking score
+        self._recent: dict[int, deque] = {}  # user id -> last RECENT_PAIRS compared pairs
+
+    def clear(self):
+        self._pools = {}
+        self._scores = {}
+        self._recent = {}
+
+    def _place(self, user_id: int, spot_id: int):
+        rating, comparisons = standing(self._pairwise, user_id, spot_id, self._scores[(user_id, spot_id)])
+        self._pools.setdefault(user_id, MatchupPool()).put(spot_id, rating, comparisons)
+
+    def add(self, user_id: int, spot_id: int, score: float):
+        """`user_id` ranked `spot_id` (or changed its score)."""
+        self._scores[(user_id, spot_id)] = score
+        self._place(user_id, spot_id)
+
+    def remove(self, user_id: int, spot_id: int):
+        self._scores.pop((user_id, spot_id), None)
+        pool = self._pools.get(user_id)
+        if pool is not None:
+            pool.remove(spot_id)
+            if not pool:
+                del self._pools[user_id]
+
+    def compared(self, user_id: int, winner_id: int, loser_id: int):
+        """Call after `pairwise` recorded the outcome."""
+        self._recent.setdefault(user_id, deque(maxlen=RECENT_PAIRS)).append(frozenset((winner_id, loser_id)))
+        for spot_id in (winner_id, loser_id):
+            if (user_id, spot_id) in self._scores:
+                self._place(user_id, spot_id)
+
+    def remember(self, columns: dict):
+        """Refill the recent pairs from a comparison log in `PairwiseRatings.columns()` form."""
+        self._recent = {}
+        for user_id, winner_id, loser_id in zip(columns["user_id"], columns["winner_id"], columns["loser_id"]):
+            self._recent.setdefault(user_id, deque(maxlen=RECENT_PAIRS)).append(frozenset((winner_id, loser_id)))
+
+    def pick(self, user_id: int) -> tuple[int, int] | None:
+        pool = self._pools.get(user_id)
+        if pool is None:
+            return None
+        return pool.pick(self._recent.get(user_id, ()))
+
+    def ranked(self, user_id: int) -> list[int]:
+        """Spot ids in the user's pool (used when it is too small to pick from)."""
+        pool = self._pools.get(user_id)
+        return pool.spot_ids() if pool is not None else []
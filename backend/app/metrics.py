@@ -0,0 +1,154 @@
+"""Process metrics served on `GET /metrics` in the Prometheus text format (version 0.0.4).
+
+Histograms are filled as requests and store operations run:
+
+    steli_http_request_duration_seconds{method, route, status}
+    steli_store_lock_wait_seconds{lock, mode}   time to acquire a collection lock of the
+                                                JSON store (only acquisitions that had to
+                                                wait), the file lock (multi-worker) or
+                                                the SQLite write lock
+    steli_store_io_seconds{step}                serialize / encrypt / write / fsync of WAL
+                                                records and snapshots, snapshot loads
+                                                and WAL replays, SQLite commits
+    steli_bcrypt_seconds{op}                    one bcrypt hash or verify, excluding the
+                                                wait for a hashing thread
+
+Gauges (item counts and file sizes) are read from the storage backend at scrape time.
+Each worker process keeps its own numbers.
+"""
+
+import bisect
+import threading
+import time
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# From an uncontended lock (tens of microseconds) to a slow bcrypt or checkpoint.
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    return ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values))
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Histogram:
+    """One series of bucket counts per combination of label values. Thread-safe."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket (the last one +Inf, not cumulative)..., sum]
+        self._series: dict[tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *labels: str):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += seconds
+
+    def time(self, *labels: str) -> "_Timer":
+        """A context manager observing how long its block took."""
+        return _Timer(self, labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(counts)) for labels, counts in self._series.items())
+        bounds = [_number(b) for b in self.buckets] + ["+Inf"]
+        for labels, counts in series:
+            base = _labels(self.labelnames, labels)
+            prefix = base + "," if base else ""
+            total = 0
+            for bound, n in zip(bounds, counts):
+                total += n
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {total}')
+            suffix = f"{{{base}}}" if base else ""
+            lines.append(f"{self.name}_sum{suffix} {_number(counts[-1])}")
+            lines.append(f"{self.name}_count{suffix} {total}")
+        return lines
+
+
+class _Timer:
+    # A class rather than @contextmanager: this runs on every lock and WAL write.
+    __slots__ = ("_histogram", "_labels", "_start")
+
+    def __init__(self, histogram: Histogram, labels: tuple[str, ...]):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start, *self._labels)
+
+
+def render_gauge(name: str, documentation: str, labelname: str, values: dict[str, float]) -> list[str]:
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+    lines.extend(f'{name}{{{labelname}="{_escape(key)}"}} {_number(value)}' for key, value in sorted(values.items()))
+    return lines
+
+
+REQUEST_DURATION = Histogram(
+    "steli_http_request_duration_seconds", "Time to handle a request, by route template.", ("method", "route", "status")
+)
+LOCK_WAIT = Histogram("steli_store_lock_wait_seconds", "Time spent waiting to acquire a store lock.", ("lock", "mode"))
+STORE_IO = Histogram("steli_store_io_seconds", "Time spent persisting and loading store data.", ("step",))
+BCRYPT = Histogram("steli_bcrypt_seconds", "Time spent in one bcrypt call.", ("op",))
+HISTOGRAMS = (REQUEST_DURATION, LOCK_WAIT, STORE_IO, BCRYPT)
+
+
+class RequestMetrics:
+    """ASGI middleware recording each HTTP request in REQUEST_DURATION, labelled with
+    the matched route's path template (so `/api/users/{username}` is one series)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status),
+            )
+
+
+def exposition(sizes: dict[str, dict[str, int]]) -> str:
+    """Every histogram, plus gauges for the storage backend's `sizes()`
+    ({"items": {collection: count}, "bytes": {file: size}})."""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    lines.extend(render_gauge("steli_store_items", "Items held per collection.", "collection", sizes["items"]))
+    lines.extend(render_gauge("steli_store_bytes", "Size of the store's files on disk.", "file", sizes["bytes"]))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,42 @@
+"""Opaque keyset cursors for paginated list endpoints."""
+
+import base64
+import binascii
+import json
+
+# Response header carrying the cursor for the next page (absent on the last page).
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Largest `limit` a list endpoint accepts.
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*key) -> str:
+    raw = json.dumps(list(key), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str | None, size: int) -> list | None:
+    """The key list encoded in `cursor` (None for no cursor). Raises InvalidCursor."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError) as exc:
+        raise InvalidCursor(cursor) from exc
+    if not isinstance(key, list) or len(key) != size or not isinstance(key[-1], int):
+        raise InvalidCursor(cursor)
+    return key
+
+
+def next_cursor(items: list[dict], limit: int | None, *fields: str) -> str | None:
+    """Cursor after the last item of a full page (None if the page was empty, short or
+    unbounded)."""
+    if not limit or not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(*(last[f] for f in fields))
@@ -0,0 +1,170 @@
+"""Spot strengths from pairwise comparisons (`POST /api/rankings/compare`).
+
+Every outcome is kept in compact columns and updates an Elo rating per spot, both
+overall and per user, as it arrives. A Bradley-Terry fit over all outcomes (on the same
+scale) is recomputed with NumPy on a background thread every `refit_every` outcomes.
+"""
+
+import array
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ELO_BASE = 1500.0
+ELO_SCALE = 400.0  # rating points per 10x odds
+ELO_K = 32.0
+
+
+def expected_score(rating: float, opponent: float) -> float:
+    """Probability that a spot rated `rating` beats one rated `opponent`."""
+    return 1.0 / (1.0 + 10.0 ** ((opponent - rating) / ELO_SCALE))
+
+
+def bradley_terry(winners: np.ndarray, losers: np.ndarray, n: int, max_iter: int = 500, tol: float = 1e-7) -> np.ndarray:
+    """Strengths of items 0..n-1 on the Elo scale, by Hunter's MM iteration.
+
+    Every item also gets one virtual win and one virtual loss against a fixed item of
+    strength 1 (rating ELO_BASE). That keeps unbeaten and winless items finite and
+    anchors the scale, so no renormalization is needed.
+    """
+    wins = np.bincount(winners, minlength=n) + 1.0
+    strength = np.ones(n)
+    for _ in range(max_iter):
+        inv = 1.0 / (strength[winners] + strength[losers])
+        games = (
+            np.bincount(winners, weights=inv, minlength=n)
+            + np.bincount(losers, weights=inv, minlength=n)
+            + 2.0 / (strength + 1.0)
+        )
+        updated = wins / games
+        converged = np.max(np.abs(updated - strength) / strength) < tol
+        strength = updated
+        if converged:
+            break
+    return ELO_BASE + ELO_SCALE * np.log10(strength)
+
+
+class PairwiseRatings:
+    """Comparison log plus the ratings derived from it.
+
+    `record()` calls must be serialized by the caller (the store's rankings lock, or the
+    SQLite backend's catch-up lock); reads need no lock. Fitted strengths are replaced
+    whole when a fit finishes.
+    """
+
+    def __init__(self, refit_every: int = 200):
+        self.refit_every = refit_every
+        self._users = array.array("q")
+        self._winners = array.array("q")
+        self._losers = array.array("q")
+        self._times = array.array("d")  # unix epoch seconds
+        self._elo: dict[int, float] = {}  # spot id -> rating
+        self._user_elo: dict[tuple[int, int], float] = {}  # (user id, spot id) -> rating
+        self._counts: dict[int, int] = {}
+        self._user_counts: dict[tuple[int, int], int] = {}
+        self._strengths: dict[int, float] = {}  # spot id -> Bradley-Terry rating, as of the last fit
+        self._fitted = 0  # outcomes the last (started) fit covers
+        self.strengths_version = 0  # outcomes the current strengths cover
+        self._fit_queued = False
+        self._fit_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="steli-pairwise")
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def clear(self):
+        self._users = array.array("q")
+        self._winners = array.array("q")
+        self._losers = array.array("q")
+        self._times = array.array("d")
+        self._elo = {}
+        self._user_elo = {}
+        self._counts = {}
+        self._user_counts = {}
+        self._strengths = {}
+        self._fitted = 0
+        self.strengths_version = 0
+
+    def record(self, user_id: int, winner_id: int, loser_id: int, created_at: float):
+        self._append(user_id, winner_id, loser_id, created_at)
+        if len(self._times) - self._fitted >= self.refit_every and not self._fit_queued:
+            self._fit_queued = True
+            self._pool.submit(self.fit)
+
+    def _append(self, user_id: int, winner_id: int, loser_id: int, created_at: float):
+        self._users.append(user_id)
+        self._winners.append(winner_id)
+        self._losers.append(loser_id)
+        self._times.append(created_at)  # last: a fit reads up to len(self._times)
+        self._update_elo(self._elo, winner_id, loser_id)
+        self._update_elo(self._user_elo, (user_id, winner_id), (user_id, loser_id))
+        for counts, w, l in ((self._counts, winner_id, loser_id),
+                             (self._user_counts, (user_id, winner_id), (user_id, loser_id))):
+            counts[w] = counts.get(w, 0) + 1
+            counts[l] = counts.get(l, 0) + 1
+
+    @staticmethod
+    def _update_elo(ratings: dict, winner, loser):
+        rw, rl = ratings.get(winner, ELO_BASE), ratings.get(loser, ELO_BASE)
+        delta = ELO_K * (1.0 - expected_score(rw, rl))
+        ratings[winner] = rw + delta
+        ratings[loser] = rl - delta
+
+    def load(self, columns: dict):
+        """Replace everything with the outcomes in `columns()` form, replaying Elo. Call
+        `fit()` once loading is done."""
+        self.clear()
+        for row in zip(columns.get("user_id", ()), columns.get("winner_id", ()),
+                       columns.get("loser_id", ()), columns.get("created_at", ())):
+            self._append(*row)
+
+    def columns(self) -> dict[str, list]:
+        n = len(self._times)
+        return {
+            "user_id": self._users[:n].tolist(),
+            "winner_id": self._winners[:n].tolist(),
+            "loser_id": self._losers[:n].tolist(),
+            "created_at": self._times[:n].tolist(),
+        }
+
+    def fit(self):
+        """Refit Bradley-Terry strengths over every outcome recorded so far."""
+        with self._fit_lock:
+            self._fit_queued = False
+            n = len(self._times)
+            if n == self._fitted and self._strengths:
+                return
+            self._fitted = n
+            if not n:
+                self._strengths = {}
+                self.strengths_version = 0
+                return
+            pairs = np.concatenate([np.frombuffer(self._winners[:n], dtype=np.int64),
+                                    np.frombuffer(self._losers[:n], dtype=np.int64)])
+            spot_ids, index = np.unique(pairs, return_inverse=True)
+            strengths = bradley_terry(index[:n], index[n:], len(spot_ids))
+            self._strengths = dict(zip(spot_ids.tolist(), strengths.tolist()))
+            self.strengths_version = n  # after the strengths: readers take it first
+
+    def user_standing(self, user_id: int, spot_id: int) -> tuple[float, int]:
+        """The spot's Elo rating and comparison count within one user's comparisons."""
+        key = (user_id, spot_id)
+        return self._user_elo.get(key, ELO_BASE), self._user_counts.get(key, 0)
+
+    def rating(self, spot_id: int, user_id: int | None = None) -> dict:
+        """A spot's Elo rating and comparison count (overall, or within one user's
+        comparisons) and its overall Bradley-Terry strength."""
+        if user_id is None:
+            elo, count = self._elo.get(spot_id, ELO_BASE), self._counts.get(spot_id, 0)
+        else:
+            key = (user_id, spot_id)
+            elo, count = self._user_elo.get(key, ELO_BASE), self._user_counts.get(key, 0)
+        return {
+            "elo": round(elo, 1),
+            "strength": round(self._strengths.get(spot_id, ELO_BASE), 1),
+            "comparisons": count,
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
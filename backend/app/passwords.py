@@ -0,0 +1,63 @@
+"""bcrypt hashing on a bounded worker pool, kept off the store lock."""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from app.metrics import BCRYPT
+
+
+class HasherBusy(RuntimeError):
+    """Too many hashes are already queued; the caller should retry later."""
+
+
+def hash_rounds(password_hash: str) -> int | None:
+    """Work factor of a `$2b$12$...` hash (None if it cannot be parsed)."""
+    parts = password_hash.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """Runs bcrypt on `workers` threads (bcrypt releases the GIL while hashing).
+
+    At most `max_pending` hashes may be queued or running; beyond that `hash()` and
+    `verify()` raise HasherBusy at once instead of piling up request threads, so a
+    burst of logins cannot tie up the server's worker threads needed by other traffic.
+    """
+
+    def __init__(self, rounds: int | None = None, workers: int | None = None, max_pending: int | None = None):
+        self.rounds = rounds or int(os.getenv("STELI_BCRYPT_ROUNDS", "12"))
+        workers = workers or int(os.getenv("STELI_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+        max_pending = max_pending or int(os.getenv("STELI_HASH_MAX_PENDING", str(workers * 8)))
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="steli-bcrypt")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _run(self, op: str, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            return self._pool.submit(self._timed, op, fn, *args).result()
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _timed(op: str, fn, *args):
+        with BCRYPT.time(op):
+            return fn(*args)
+
+    def hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return self._run("hash", bcrypt.hashpw, password.encode(), salt).decode()
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        return self._run("verify", bcrypt.checkpw, password.encode(), password_hash.encode())
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        return hash_rounds(password_hash) != self.rounds
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
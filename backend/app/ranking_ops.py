@@ -0,0 +1,64 @@
+"""Incremental ranked-list edits (`PATCH /api/rankings`) shared by every storage backend.
+
+A patch is the list version the client last saw plus a sequence of ops applied in order:
+
+    {"op": "insert", "spot_name": str, "position": int?, "score": float?, "notes": str?,
+     "photo_url": str?, "category": str?}
+    {"op": "move", "ranking_id": int, "position": int}
+    {"op": "update", "ranking_id": int, "score": float?, "notes": str?, "photo_url": str?}
+    {"op": "remove", "ranking_id": int}
+
+Positions are 0-based indexes into the list as it stands when the op runs (for a move,
+with the moved ranking already taken out); they are clamped to the list. An insert
+without a position appends.
+"""
+
+# Response header carrying the version of the caller's ranked list.
+RANKINGS_VERSION_HEADER = "X-Rankings-Version"
+
+UPDATE_FIELDS = ("score", "notes", "photo_url")
+
+
+class RankingVersionConflict(Exception):
+    """The list changed since the client read it."""
+
+    def __init__(self, current: int):
+        super().__init__(current)
+        self.current = current
+
+
+class InvalidRankingOp(ValueError):
+    pass
+
+
+def check_ops(ranked: dict[int, str], ops: list[dict]) -> None:
+    """Raise InvalidRankingOp unless every op applies, in order, to a list mapping ranking
+    id -> lowercase spot name `ranked`. Backends call this before changing anything, so
+    a patch is applied entirely or not at all."""
+    ranked = dict(ranked)
+    names = set(ranked.values())
+    for i, op in enumerate(ops):
+        kind = op.get("op")
+        if kind == "insert":
+            key = (op.get("spot_name") or "").lower().strip()
+            if not key:
+                raise InvalidRankingOp(f"ops[{i}]: spot_name is required")
+            if key in names:
+                raise InvalidRankingOp(f"ops[{i}]: {op['spot_name'].strip()!r} is already ranked")
+            names.add(key)
+            continue
+        if kind not in ("move", "update", "remove"):
+            raise InvalidRankingOp(f"ops[{i}]: unknown op {kind!r}")
+        rid = op.get("ranking_id")
+        if rid not in ranked:
+            raise InvalidRankingOp(f"ops[{i}]: ranking {rid} is not in this list")
+        if kind == "move" and op.get("position") is None:
+            raise InvalidRankingOp(f"ops[{i}]: position is required")
+        if kind == "remove":
+            names.discard(ranked.pop(rid))
+
+
+def clamp_position(position: int | None, length: int) -> int:
+    if position is None:
+        return length
+    return max(0, min(position, length))
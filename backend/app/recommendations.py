@@ -0,0 +1,195 @@
+"""Personalized spot suggestions (`GET /api/spots/recommended`) by item-item collaborative
+filtering over everyone's ranking scores.
+
+Two spots are similar when the users who ranked both scored them alike relative to their
+own average (adjusted cosine), shrunk toward 0 when few users ranked both. Each spot keeps
+its NEIGHBORS most similar spots. A user's predicted score for a spot they have not ranked
+is their average plus the similarity-weighted deviations of their scores for its
+neighbours. Each user's best TOP_N predictions are precomputed, so serving is a lookup.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+NEIGHBORS = 20  # most similar spots kept per spot
+SIMILARITY_SHRINK = 5.0  # co-rating users at which a similarity counts half
+PREDICTION_SHRINK = 1.0  # added to the weight sum, so one weak neighbour cannot dominate
+TOP_N = 50
+
+
+def spot_neighbors(users: np.ndarray, spots: np.ndarray, scores: np.ndarray, n_users: int, n_spots: int):
+    """Nearest spots by shrunk adjusted cosine similarity, from one (user, spot, score)
+    triple per ranking with users and spots as dense indexes. Returns (indexes, similarities),
+    each of shape (n_spots, k), only positive similarities kept (others are 0 with index 0)."""
+    counts = np.bincount(users, minlength=n_users)
+    means = np.bincount(users, weights=scores, minlength=n_users) / np.maximum(counts, 1)
+    centered = np.zeros((n_users, n_spots), dtype=np.float32)
+    centered[users, spots] = scores - means[users]
+    rated = np.zeros((n_users, n_spots), dtype=np.float32)
+    rated[users, spots] = 1.0
+    dot = centered.T @ centered
+    norms = np.sqrt(np.diag(dot))
+    common = rated.T @ rated
+    with np.errstate(divide="ignore", invalid="ignore"):
+        similarity = dot / np.outer(norms, norms) * (common / (common + SIMILARITY_SHRINK))
+    similarity = np.nan_to_num(similarity, nan=0.0, posinf=0.0, neginf=0.0)
+    np.fill_diagonal(similarity, 0.0)
+    similarity[similarity < 0] = 0.0
+    k = min(NEIGHBORS, max(n_spots - 1, 1))
+    indexes = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+    return indexes, np.take_along_axis(similarity, indexes, axis=1)
+
+
+def predict(row: dict[int, float], index: dict[int, int], spot_ids: np.ndarray,
+            neighbor_indexes: np.ndarray, neighbor_sims: np.ndarray, limit: int) -> tuple[tuple[int, float], ...]:
+    """A user's best `limit` (spot id, predicted score) among spots not in `row`
+    (spot id -> their score), best first."""
+    known = [(index[s], score) for s, score in row.items() if s in index]
+    if not known:
+        return ()
+    rated = np.fromiter((i for i, _ in known), dtype=np.int64, count=len(known))
+    scores = np.fromiter((score for _, score in known), dtype=np.float64, count=len(known))
+    mean = sum(row.values()) / len(row)
+    n, k = len(spot_ids), neighbor_indexes.shape[1]
+    candidates = neighbor_indexes[rated].ravel()
+    sims = neighbor_sims[rated].ravel()
+    weight = np.bincount(candidates, weights=sims, minlength=n)
+    deviation = np.bincount(candidates, weights=sims * np.repeat(scores - mean, k), minlength=n)
+    predicted = mean + deviation / (weight + PREDICTION_SHRINK)
+    predicted[weight <= 0] = -np.inf
+    predicted[rated] = -np.inf
+    limit = min(limit, n)
+    best = np.argpartition(-predicted, limit - 1)[:limit]
+    best = best[np.argsort(-predicted[best], kind="stable")]
+    return tuple(
+        (int(spot_ids[i]), round(float(predicted[i]), 2)) for i in best if np.isfinite(predicted[i])
+    )
+
+
+def recommendation(spot: dict, predicted_score: float | None) -> dict:
+    """API shape of one suggestion; spots filled in from the leaderboard have no prediction."""
+    return {
+        "spot": spot,
+        "predicted_score": predicted_score,
+        "reason": "similar_users" if predicted_score is not None else "popular",
+    }
+
+
+class Recommender:
+    """The user x spot score matrix (sparse: one dict per user) and precomputed top
+    predictions per user.
+
+    Changes only mark the user dirty and queue a refresh on a background thread: dirty
+    users are re-predicted against the current neighbour lists, which are rebuilt (and
+    everyone re-predicted) every `refit_every` changes or when a spot they do not cover
+    gets scored. Refreshes never queue up behind each other, so refits run at most back
+    to back. `load_rows`, if
+    given, returns the full matrix for a refit (for backends whose rows can change in
+    other processes); changes must then pass whole rows with `set_row()`. Writers must be
+    serialized by the caller; `recommended()` needs no lock.
+    """
+
+    def __init__(self, refit_every: int = 500, load_rows=None):
+        self.refit_every = refit_every
+        self._load_rows = load_rows
+        self._rows: dict[int, dict[int, float]] = {}  # user id -> spot id -> score
+        self._top: dict[int, tuple[tuple[int, float], ...]] = {}  # user id -> best (spot id, predicted)
+        self._model = None  # `predict()` arguments: spot id -> index, spot ids, neighbours
+        self._dirty: set[int] = set()
+        self._changes = 0  # since the last refit
+        self._queued = False
+        self._lock = threading.Lock()  # guards the matrix, `_dirty`, `_changes` and `_queued`
+        self._refresh_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="steli-recommender")
+
+    def clear(self):
+        with self._lock:
+            self._rows = {}
+            self._top = {}
+            self._model = None
+            self._dirty = set()
+            self._changes = 0
+
+    def _changed(self, user_id: int):
+        self._dirty.add(user_id)
+        self._changes += 1
+        if not self._queued:
+            self._queued = True
+            self._pool.submit(self.refresh)
+
+    def set_score(self, user_id: int, spot_id: int, score: float):
+        with self._lock:
+            self._rows.setdefault(user_id, {})[spot_id] = score
+            self._changed(user_id)
+
+    def remove_score(self, user_id: int, spot_id: int):
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is None or row.pop(spot_id, None) is None:
+                return
+            if not row:
+                del self._rows[user_id]
+            self._changed(user_id)
+
+    def set_row(self, user_id: int, row: dict[int, float]):
+        """Replace one user's scores (spot id -> score)."""
+        with self._lock:
+            if row:
+                self._rows[user_id] = dict(row)
+            else:
+                self._rows.pop(user_id, None)
+            self._changed(user_id)
+
+    def refresh(self):
+        """Bring the precomputed predictions up to date (the background job; also safe to
+        call directly)."""
+        with self._refresh_lock:
+            with self._lock:
+                self._queued = False
+                dirty, self._dirty = self._dirty, set()
+                refit = (
+                    self._model is None
+                    or self._changes >= self.refit_every
+                    or any(s not in self._model[0] for u in dirty for s in self._rows.get(u, ()))
+                )
+                if refit:
+                    self._changes = 0
+                    rows = None if self._load_rows else {u: dict(r) for u, r in self._rows.items()}
+                else:
+                    rows = {u: dict(self._rows[u]) for u in dirty if u in self._rows}
+            if refit:
+                if rows is None:
+                    rows = self._load_rows()
+                self._model = self._fit(rows)
+                top = {}
+            else:
+                top = dict(self._top)
+                for user_id in dirty:
+                    top.pop(user_id, None)
+            if self._model is not None:
+                for user_id, row in rows.items():
+                    top[user_id] = predict(row, *self._model, TOP_N)
+            self._top = top
+
+    @staticmethod
+    def _fit(rows: dict[int, dict[int, float]]):
+        triples = [(u, s, score) for u, row in rows.items() for s, score in row.items()]
+        if not triples:
+            return None
+        users, spots, scores = (np.array(column) for column in zip(*triples))
+        user_ids, user_index = np.unique(users, return_inverse=True)
+        spot_ids, spot_index = np.unique(spots, return_inverse=True)
+        neighbor_indexes, neighbor_sims = spot_neighbors(
+            user_index, spot_index, scores.astype(np.float64), len(user_ids), len(spot_ids)
+        )
+        index = {int(s): i for i, s in enumerate(spot_ids)}
+        return index, spot_ids, neighbor_indexes, neighbor_sims
+
+    def recommended(self, user_id: int, limit: int = 10) -> list[tuple[int, float]]:
+        """The user's best predicted (spot id, score) pairs, as of the last refresh."""
+        return list(self._top.get(user_id, ())[:limit])
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
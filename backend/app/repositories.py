@@ -3,8 +3,10 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
 
-from app.store import Store
+if TYPE_CHECKING:
+    from app.store import Store
 
 
 class UserRepository(ABC):
@@ -18,7 +20,7 @@ class UserRepository(ABC):
     def get_user_by_username(self, username: str) -> dict | None: ...
 
     @abstractmethod
-    def search_users(self, query: str) -> list[dict]: ...
+    def search_users(self, query: str, limit: int | None = None) -> list[dict]: ...
 
     @abstractmethod
     def update_profile_photo(self, user_id: int, photo_url: str) -> dict | None: ...
@@ -29,6 +31,9 @@ class UserRepository(ABC):
     @abstractmethod
     def is_profile_visible(self, target_id: int, viewer_id: int | None) -> bool: ...
 
+    @abstractmethod
+    def get_user_cards(self, user_ids: list[int], viewer_id: int | None = None) -> list[dict]: ...
+
 
 class SessionRepository(ABC):
     @abstractmethod
@@ -67,10 +72,10 @@ class SocialRepository(ABC):
     def deny_follow_request(self, target_id: int, requester_id: int) -> bool: ...
 
     @abstractmethod
-    def get_followers(self, user_id: int) -> list[dict]: ...
+    def get_followers(self, user_id: int, limit: int | None = None, cursor: str | None = None) -> list[dict]: ...
 
     @abstractmethod
-    def get_following(self, user_id: int) -> list[dict]: ...
+    def get_following(self, user_id: int, limit: int | None = None, cursor: str | None = None) -> list[dict]: ...
 
     @abstractmethod
     def followers_count(self, user_id: int) -> int: ...
@@ -78,6 +83,9 @@ class SocialRepository(ABC):
     @abstractmethod
     def following_count(self, user_id: int) -> int: ...
 
+    @abstractmethod
+    def get_follow_suggestions(self, user_id: int, limit: int = 10) -> list[tuple[int, int]]: ...
+
 
 class SpotRepository(ABC):
     @abstractmethod
@@ -87,13 +95,28 @@ class SpotRepository(ABC):
     def list_spots(self) -> list[dict]: ...
 
     @abstractmethod
-    def search_spots(self, query: str) -> list[dict]: ...
+    def search_spots(self, query: str, limit: int | None = None) -> list[dict]: ...
+
+    @abstractmethod
+    def get_leaderboard(self, category: str = "", limit: int = 10) -> list[dict]: ...
+
+    @abstractmethod
+    def get_recommended_spots(self, user_id: int, limit: int = 10) -> list[dict]: ...
+
+    @abstractmethod
+    def pairwise_rating(self, spot_id: int) -> dict: ...
 
 
 class RankingRepository(ABC):
     @abstractmethod
     def set_rankings(self, user_id: int, ranked_items: list[dict]) -> list[dict]: ...
 
+    @abstractmethod
+    def patch_rankings(self, user_id: int, version: int, ops: list[dict]) -> tuple[int, list[dict]]: ...
+
+    @abstractmethod
+    def ranking_version(self, user_id: int) -> int: ...
+
     @abstractmethod
     def get_user_rankings(self, user_id: int) -> list[dict]: ...
 
@@ -101,10 +124,18 @@ class RankingRepository(ABC):
     def ranked_count(self, user_id: int) -> int: ...
 
     @abstractmethod
-    def get_feed(self, user_id: int, limit: int = 20) -> list[dict]: ...
+    def get_feed(self, user_id: int, limit: int = 20, cursor: str | None = None) -> list[dict]: ...
 
     @abstractmethod
-    def get_recent_rankings(self, limit: int = 20, viewer_id: int | None = None) -> list[dict]: ...
+    def get_feed_page(self, user_id: int, limit: int = 20, cursor: str | None = None) -> list[dict]: ...
+
+    @abstractmethod
+    def get_feed_items(self, event_ids: list[int], viewer_id: int | None = None) -> list[dict]: ...
+
+    @abstractmethod
+    def get_recent_rankings(
+        self, limit: int = 20, viewer_id: int | None = None, cursor: str | None = None
+    ) -> list[dict]: ...
 
     @abstractmethod
     def get_matchup(self, user_id: int) -> dict | None: ...
@@ -122,7 +153,17 @@ class RankingRepository(ABC):
     def add_comment(self, feed_event_id: int, user_id: int, text: str) -> dict: ...
 
     @abstractmethod
-    def get_comments(self, feed_event_id: int) -> list[dict]: ...
+    def get_comments(
+        self, feed_event_id: int, limit: int | None = None, cursor: str | None = None
+    ) -> list[dict]: ...
+
+
+class BlobRepository(ABC):
+    @abstractmethod
+    def get_blob(self, digest: str) -> tuple[bytes, str] | None: ...
+
+    @abstractmethod
+    def get_blob_variant(self, digest: str, variant: str) -> tuple[bytes, str] | None: ...
 
 
 class UserRepositoryImpl(UserRepository):
@@ -138,10 +179,8 @@ class UserRepositoryImpl(UserRepository):
     def get_user_by_username(self, username: str) -> dict | None:
         return self._store.get_user_by_username(username)
 
-    def search_users(self, query: str) -> list[dict]:
-        if not query:
-            return list(self._store.users.values())
-        return self._store.search_users(query)
+    def search_users(self, query: str, limit: int | None = None) -> list[dict]:
+        return self._store.search_users(query, limit=limit)
 
     def update_profile_photo(self, user_id: int, photo_url: str) -> dict | None:
         return self._store.update_profile_photo(user_id, photo_url)
@@ -152,6 +191,9 @@ class UserRepositoryImpl(UserRepository):
     def is_profile_visible(self, target_id: int, viewer_id: int | None) -> bool:
         return self._store.is_profile_visible(target_id, viewer_id)
 
+    def get_user_cards(self, user_ids: list[int], viewer_id: int | None = None) -> list[dict]:
+        return self._store.user_cards(user_ids, viewer_id)
+
 
 class SessionRepositoryImpl(SessionRepository):
     def __init__(self, store: Store):
@@ -195,11 +237,11 @@ class SocialRepositoryImpl(SocialRepository):
     def deny_follow_request(self, target_id: int, requester_id: int) -> bool:
         return self._store.deny_follow_request(target_id, requester_id)
 
-    def get_followers(self, user_id: int) -> list[dict]:
-        return self._store.get_followers(user_id)
+    def get_followers(self, user_id: int, limit: int | None = None, cursor: str | None = None) -> list[dict]:
+        return self._store.get_followers(user_id, limit=limit, cursor=cursor)
 
-    def get_following(self, user_id: int) -> list[dict]:
-        return self._store.get_following(user_id)
+    def get_following(self, user_id: int, limit: int | None = None, cursor: str | None = None) -> list[dict]:
+        return self._store.get_following(user_id, limit=limit, cursor=cursor)
 
     def followers_count(self, user_id: int) -> int:
         return self._store.followers_count(user_id)
@@ -207,6 +249,9 @@ class SocialRepositoryImpl(SocialRepository):
     def following_count(self, user_id: int) -> int:
         return self._store.following_count(user_id)
 
+    def get_follow_suggestions(self, user_id: int, limit: int = 10) -> list[tuple[int, int]]:
+        return self._store.get_follow_suggestions(user_id, limit=limit)
+
 
 class SpotRepositoryImpl(SpotRepository):
     def __init__(self, store: Store):
@@ -218,8 +263,17 @@ class SpotRepositoryImpl(SpotRepository):
     def list_spots(self) -> list[dict]:
         return self._store.list_spots()
 
-    def search_spots(self, query: str) -> list[dict]:
-        return self._store.search_spots(query)
+    def search_spots(self, query: str, limit: int | None = None) -> list[dict]:
+        return self._store.search_spots(query, limit=limit)
+
+    def get_leaderboard(self, category: str = "", limit: int = 10) -> list[dict]:
+        return self._store.get_leaderboard(category, limit=limit)
+
+    def get_recommended_spots(self, user_id: int, limit: int = 10) -> list[dict]:
+        return self._store.get_recommended_spots(user_id, limit=limit)
+
+    def pairwise_rating(self, spot_id: int) -> dict:
+        return self._store.pairwise_rating(spot_id)
 
 
 class RankingRepositoryImpl(RankingRepository):
@@ -229,17 +283,31 @@ class RankingRepositoryImpl(RankingRepository):
     def set_rankings(self, user_id: int, ranked_items: list[dict]) -> list[dict]:
         return self._store.set_rankings(user_id, ranked_items)
 
+    def patch_rankings(self, user_id: int, version: int, ops: list[dict]) -> tuple[int, list[dict]]:
+        return self._store.patch_rankings(user_id, version, ops)
+
+    def ranking_version(self, user_id: int) -> int:
+        return self._store.ranking_version(user_id)
+
     def get_user_rankings(self, user_id: int) -> list[dict]:
         return self._store.get_user_rankings(user_id)
 
     def ranked_count(self, user_id: int) -> int:
         return self._store.ranked_count(user_id)
 
-    def get_feed(self, user_id: int, limit: int = 20) -> list[dict]:
-        return self._store.get_feed(user_id, limit=limit)
+    def get_feed(self, user_id: int, limit: int = 20, cursor: str | None = None) -> list[dict]:
+        return self._store.get_feed(user_id, limit=limit, cursor=cursor)
+
+    def get_feed_page(self, user_id: int, limit: int = 20, cursor: str | None = None) -> list[dict]:
+        return self._store.get_feed_page(user_id, limit=limit, cursor=cursor)
+
+    def get_feed_items(self, event_ids: list[int], viewer_id: int | None = None) -> list[dict]:
+        return self._store.get_feed_items(event_ids, viewer_id)
 
-    def get_recent_rankings(self, limit: int = 20, viewer_id: int | None = None) -> list[dict]:
-        return self._store.get_recent_rankings(limit=limit, viewer_id=viewer_id)
+    def get_recent_rankings(
+        self, limit: int = 20, viewer_id: int | None = None, cursor: str | None = None
+    ) -> list[dict]:
+        return self._store.get_recent_rankings(limit=limit, viewer_id=viewer_id, cursor=cursor)
 
     def get_matchup(self, user_id: int) -> dict | None:
         return self._store.get_matchup(user_id)
@@ -257,6 +325,19 @@ class RankingRepositoryImpl(RankingRepository):
         comment = self._store.add_comment(feed_event_id, user_id, text)
         return self._store._comment_to_response(comment)
 
-    def get_comments(self, feed_event_id: int) -> list[dict]:
-        comments = self._store.get_comments(feed_event_id)
+    def get_comments(
+        self, feed_event_id: int, limit: int | None = None, cursor: str | None = None
+    ) -> list[dict]:
+        comments = self._store.get_comments(feed_event_id, limit=limit, cursor=cursor)
         return [self._store._comment_to_response(c) for c in comments]
+
+
+class BlobRepositoryImpl(BlobRepository):
+    def __init__(self, store: Store):
+        self._store = store
+
+    def get_blob(self, digest: str) -> tuple[bytes, str] | None:
+        return self._store.get_blob(digest)
+
+    def get_blob_variant(self, digest: str, variant: str) -> tuple[bytes, str] | None:
+        return self._store.get_blob_variant(digest, variant)
@@ -0,0 +1,45 @@
+"""Photo blob routes (content-addressed, so responses never change)."""
+
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from app.blobs import IMAGE_TYPES
+from app.facade import facade
+from app.images import PIPELINE_VERSION, VARIANTS
+
+router = APIRouter()
+
+_IMMUTABLE = "public, max-age=31536000, immutable"
+# Blobs share the API's origin: never let a browser sniff, render or run them as a page.
+_SAFE = {
+    "X-Content-Type-Options": "nosniff",
+    "Content-Disposition": "inline",
+    "Content-Security-Policy": "default-src 'none'; sandbox",
+}
+_IMAGE_MIMES = frozenset(IMAGE_TYPES.values())
+
+
+def _image_response(blob: tuple[bytes, str] | None, etag: str) -> Response:
+    # Blobs stored before uploads were checked may hold anything; only images are served.
+    if blob is None or blob[1] not in _IMAGE_MIMES:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    data, mime = blob
+    return Response(content=data, media_type=mime, headers={"ETag": etag, "Cache-Control": _IMMUTABLE, **_SAFE})
+
+
+@router.get("/{digest}")
+def get_blob(digest: str, request: Request):
+    etag = f'"{digest}"'
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": _IMMUTABLE, **_SAFE})
+    return _image_response(facade.get_blob(digest), etag)
+
+
+@router.get("/{digest}/{variant}")
+def get_blob_variant(digest: str, variant: str, request: Request):
+    """A resized rendition of a photo: one of "avatar", "card" or "full"."""
+    if variant not in VARIANTS:
+        raise HTTPException(status_code=404, detail="Unknown variant")
+    etag = f'"{digest}-{variant}-v{PIPELINE_VERSION}"'
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": _IMMUTABLE, **_SAFE})
+    return _image_response(facade.get_blob_variant(digest, variant), etag)
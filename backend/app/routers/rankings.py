@@ -1,10 +1,16 @@
 """Ranking routes: create/update rankings, get feed, pairwise matchups."""
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 
 from app.facade import facade
 from app.auth import get_current_user, get_optional_user
+from app.etags import cached_json
+from app.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, next_cursor
+from app.ranking_ops import RANKINGS_VERSION_HEADER
+from app.versions import PAIRWISE, PROFILES, SPOTS
 
 router = APIRouter()
 
@@ -21,6 +27,24 @@ class SetRankingsRequest(BaseModel):
     rankings: list[RankedItem]
 
 
+class RankingOp(BaseModel):
+    """One incremental edit; which fields apply depends on `op` (see app.ranking_ops)."""
+    op: Literal["insert", "move", "update", "remove"]
+    ranking_id: int | None = None
+    spot_name: str | None = None
+    position: int | None = None
+    score: float | None = None
+    notes: str | None = None
+    photo_url: str | None = None
+    category: str | None = None
+
+
+class PatchRankingsRequest(BaseModel):
+    """Ops applied in order to the caller's list, which must still be at `version`."""
+    version: int
+    ops: list[RankingOp]
+
+
 class CompareSpotsRequest(BaseModel):
     winner_spot_name: str
     loser_spot_name: str
@@ -47,9 +71,20 @@ def set_rankings(req: SetRankingsRequest, user=Depends(get_current_user)):
     return results
 
 
+@router.patch("")
+def patch_rankings(req: PatchRankingsRequest, response: Response, user=Depends(get_current_user)):
+    """Insert, move, update or remove single rankings. Answers 409 if the list changed since
+    `version` (from the X-Rankings-Version header); the response carries the new one."""
+    ops = [op.model_dump(exclude_none=True) for op in req.ops]
+    version, results = facade.patch_rankings(user["id"], req.version, ops)
+    response.headers[RANKINGS_VERSION_HEADER] = str(version)
+    return results
+
+
 @router.get("/matchup")
 def get_matchup(user=Depends(get_current_user)):
-    """Get two random spots for pairwise comparison (Rank screen)."""
+    """Two spots to compare next (Rank screen): close in the caller's own ratings, few
+    comparisons so far, not compared recently. Random spots until they have ranked two."""
     result = facade.get_matchup(user["id"])
     if result is None:
         raise HTTPException(status_code=404, detail="Not enough spots for a matchup")
@@ -57,32 +92,56 @@ def get_matchup(user=Depends(get_current_user)):
 
 
 @router.get("/user/{username}")
-def get_user_rankings(username: str, user=Depends(get_optional_user)):
+def get_user_rankings(username: str, request: Request, user=Depends(get_optional_user)):
+    """A user's ranked list, the same for every viewer allowed to see it (with an ETag)."""
     target = facade.get_user_by_username(username)
     if target is None:
         raise HTTPException(status_code=404, detail="User not found")
     viewer_id = user["id"] if user else None
     if not facade.is_profile_visible(target["id"], viewer_id):
         raise HTTPException(status_code=403, detail="This profile is private")
-    return facade.get_user_rankings(target["id"])
+    # Version first: a write landing in between makes the next PATCH fail with 409
+    # rather than silently apply to a list the client has not seen.
+    headers = {RANKINGS_VERSION_HEADER: str(facade.ranking_version(target["id"]))}
+    stamp = ("rankings", target["id"], *facade.entity_versions([("rankings", target["id"]), SPOTS, PAIRWISE]))
+    return cached_json(request, stamp, lambda: facade.get_user_rankings(target["id"]), headers)
 
 
 @router.get("/feed")
-def get_feed(limit: int = 20, user=Depends(get_current_user)):
-    """Feed from followed users, ordered by recency."""
-    return facade.get_feed(user["id"], limit=limit)
+def get_feed(
+    request: Request,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    user=Depends(get_current_user),
+):
+    """Feed from followed users, ordered by recency. Pass the X-Next-Cursor header back as `cursor`.
+
+    The ETag covers the page's events, their likes and comments, their authors' rankings
+    (for borrowed photos) and everyone's names and photos; it is checked before hydrating."""
+    page = facade.get_feed_page(user["id"], limit=limit, cursor=cursor)
+    headers = {}
+    if cursor := next_cursor(page, limit, "created_at", "id"):
+        headers[NEXT_CURSOR_HEADER] = cursor
+    ids = [e["id"] for e in page]
+    authors = dict.fromkeys(("rankings", e["user_id"]) for e in page)
+    keys = [PROFILES, *(("event", e["id"]) for e in page), *authors]
+    stamp = ("feed", user["id"], *ids, *facade.entity_versions(keys))
+    return cached_json(request, stamp, lambda: facade.get_feed_items(ids, user["id"]), headers)
 
 
 @router.get("/recent")
-def get_recent_rankings(limit: int = 20, user=Depends(get_optional_user)):
+def get_recent_rankings(
+    response: Response,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    user=Depends(get_optional_user),
+):
     """Global recent feed: only shows items from public profiles or profiles the viewer follows."""
     viewer_id = user["id"] if user else None
-    items = facade.get_recent_rankings(limit=limit * 2, viewer_id=viewer_id)
-    visible = [
-        item for item in items
-        if facade.is_profile_visible(item["user"]["id"], viewer_id)
-    ]
-    return visible[:limit]
+    items = facade.get_recent_rankings(limit=limit, viewer_id=viewer_id, cursor=cursor)
+    if cursor := next_cursor(items, limit, "created_at", "id"):
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return items
 
 
 @router.post("/feed/{event_id}/like")
@@ -104,9 +163,18 @@ class AddCommentRequest(BaseModel):
 
 
 @router.get("/feed/{event_id}/comments")
-def get_comments(event_id: int, user=Depends(get_current_user)):
-    """Get all comments for a feed event."""
-    return facade.get_comments(event_id)
+def get_comments(
+    event_id: int,
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    user=Depends(get_current_user),
+):
+    """Comments for a feed event, oldest first (all of them unless `limit` is given)."""
+    comments = facade.get_comments(event_id, limit=limit, cursor=cursor)
+    if cursor := next_cursor(comments, limit, "created_at", "id"):
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return comments
 
 
 @router.post("/feed/{event_id}/comments")
@@ -1,8 +1,13 @@
 """Study spots API routes."""
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel
 
+from app.auth import get_current_user
+from app.etags import cached_json
 from app.facade import facade
+from app.pagination import MAX_PAGE_SIZE
+from app.recommendations import TOP_N
+from app.versions import SPOTS
 
 router = APIRouter()
 
@@ -13,10 +18,24 @@ class StudySpotCreate(BaseModel):
 
 
 @router.get("")
-def list_spots(q: str = ""):
+def list_spots(request: Request, q: str = "", limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE)):
+    """All spots (with an ETag), or up to `limit` autocomplete matches for `q` (best first)."""
     if q:
-        return facade.search_spots(q)
-    return facade.list_spots()
+        return facade.search_spots(q, limit=limit)
+    return cached_json(request, ("spots", *facade.entity_versions([SPOTS])), facade.list_spots)
+
+
+@router.get("/leaderboard")
+def get_leaderboard(category: str = "", limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE)):
+    """Best-rated spots across everyone's rankings, overall or within one `category`."""
+    return facade.get_leaderboard(category, limit=limit)
+
+
+@router.get("/recommended")
+def get_recommended_spots(limit: int = Query(10, ge=1, le=TOP_N), user=Depends(get_current_user)):
+    """Spots the caller has not ranked that people with similar taste scored highly, then
+    popular ones; `predicted_score` is null for the latter."""
+    return facade.get_recommended_spots(user["id"], limit=limit)
 
 
 @router.post("")
@@ -28,5 +47,5 @@ def create_spot(spot: StudySpotCreate):
 def get_spot(spot_id: int):
     for s in facade.list_spots():
         if s["id"] == spot_id:
-            return s
+            return {**s, "pairwise": facade.pairwise_rating(spot_id)}
     raise HTTPException(status_code=404, detail="Spot not found")
@@ -1,37 +1,43 @@
 """User profile, search, and follow routes."""
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 
 from app.facade import facade
 from app.auth import get_current_user, get_optional_user
+from app.etags import cached_json
+from app.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, next_cursor
+from app.suggestions import MAX_SUGGESTIONS
 
 router = APIRouter()
 
 
-def _public_user(user: dict, viewer=None):
-    uid = user["id"]
+def _public_users(users: list[dict], viewer=None) -> list[dict]:
     viewer_id = viewer["id"] if viewer else None
-    status = facade.follow_status(viewer_id, uid) if viewer_id else "none"
-    return {
-        "id": uid,
-        "username": user["username"],
-        "first_name": user["first_name"],
-        "last_name": user["last_name"],
-        "profile_photo_url": user.get("profile_photo_url", ""),
-        "followers_count": facade.followers_count(uid),
-        "following_count": facade.following_count(uid),
-        "ranked_count": facade.ranked_count(uid),
-        "is_following": status == "following",
-        "is_public": user.get("is_public", False),
-        "follow_status": status,
-        "pending_requests_count": facade.pending_requests_count(uid) if viewer_id and viewer_id == uid else 0,
-    }
+    return facade.get_user_cards([u["id"] for u in users], viewer_id)
+
+
+def _public_user(user: dict, viewer=None):
+    return _public_users([user], viewer=viewer)[0]
+
+
+def _cached_public_user(request: Request, user: dict, viewer=None):
+    """`_public_user()` with an ETag. Cards only differ by viewer class: the user
+    themselves, or the viewer's follow status."""
+    versions = facade.entity_versions([("user", user["id"])])
+    if viewer is None:
+        viewer_class = "none"
+    elif viewer["id"] == user["id"]:
+        viewer_class = "self"
+    else:
+        viewer_class = facade.follow_status(viewer["id"], user["id"])
+    stamp = ("user", user["id"], viewer_class, *versions)
+    return cached_json(request, stamp, lambda: _public_user(user, viewer=viewer))
 
 
 @router.get("/me")
-def get_me(user=Depends(get_current_user)):
-    return _public_user(user, viewer=user)
+def get_me(request: Request, user=Depends(get_current_user)):
+    return _cached_public_user(request, user, viewer=user)
 
 
 class UpdatePhotoRequest(BaseModel):
@@ -58,34 +64,63 @@ def update_privacy(req: UpdatePrivacyRequest, user=Depends(get_current_user)):
     return _public_user(updated, viewer=updated)
 
 
+@router.get("/me/suggestions")
+def get_follow_suggestions(limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS), user=Depends(get_current_user)):
+    """Public accounts followed by people the caller follows, with `mutual_count`, most
+    mutual follows first."""
+    suggestions = facade.get_follow_suggestions(user["id"], limit=limit)
+    mutuals = dict(suggestions)
+    cards = facade.get_user_cards([uid for uid, _ in suggestions], user["id"])
+    return [{**card, "mutual_count": mutuals[card["id"]]} for card in cards]
+
+
 @router.get("/search")
-def search_users(q: str = "", user=Depends(get_optional_user)):
-    results = facade.search_users(q)
-    return [_public_user(u, viewer=user) for u in results]
+def search_users(q: str = "", limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE), user=Depends(get_optional_user)):
+    """Up to `limit` users matching `q`: exact, then prefix, then substring matches."""
+    results = facade.search_users(q, limit=limit)
+    return _public_users(results, viewer=user)
 
 
 @router.get("/{username}")
-def get_user(username: str, user=Depends(get_optional_user)):
+def get_user(username: str, request: Request, user=Depends(get_optional_user)):
     target = facade.get_user_by_username(username)
     if target is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return _public_user(target, viewer=user)
+    return _cached_public_user(request, target, viewer=user)
 
 
 @router.get("/{username}/followers")
-def get_followers(username: str, user=Depends(get_optional_user)):
+def get_followers(
+    username: str,
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    user=Depends(get_optional_user),
+):
     target = facade.get_user_by_username(username)
     if target is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return [_public_user(u, viewer=user) for u in facade.get_followers(target["id"])]
+    users = facade.get_followers(target["id"], limit=limit, cursor=cursor)
+    if cursor := next_cursor(users, limit, "id"):
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return _public_users(users, viewer=user)
 
 
 @router.get("/{username}/following")
-def get_following(username: str, user=Depends(get_optional_user)):
+def get_following(
+    username: str,
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    user=Depends(get_optional_user),
+):
     target = facade.get_user_by_username(username)
     if target is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return [_public_user(u, viewer=user) for u in facade.get_following(target["id"])]
+    users = facade.get_following(target["id"], limit=limit, cursor=cursor)
+    if cursor := next_cursor(users, limit, "id"):
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return _public_users(users, viewer=user)
 
 
 @router.post("/{username}/follow")
@@ -111,7 +146,7 @@ def unfollow_user(username: str, user=Depends(get_current_user)):
 @router.get("/me/follow-requests")
 def get_follow_requests(user=Depends(get_current_user)):
     requests = facade.get_pending_follow_requests(user["id"])
-    return [_public_user(u, viewer=user) for u in requests]
+    return _public_users(requests, viewer=user)
 
 
 @router.post("/me/follow-requests/{username}/approve")
@@ -0,0 +1,91 @@
+"""Autocomplete index over short names: exact > prefix > substring matches."""
+
+import bisect
+
+
+def _normalize(term: str) -> str:
+    return " ".join(term.lower().split())
+
+
+def _grams(term: str, n: int) -> set[str]:
+    return {term[i:i + n] for i in range(len(term) - n + 1)}
+
+
+class SearchIndex:
+    """Maps document ids to a few searchable terms (e.g. username, first/last name).
+
+    Keeps a sorted (term, id) list for exact and prefix lookups and bigram/trigram
+    postings for substring lookups, both updated incrementally by `put()` / `remove()`.
+    Not thread-safe on its own: the store guards it with the users (or rankings) lock.
+    """
+
+    def __init__(self):
+        self._terms: dict[int, tuple[str, ...]] = {}
+        self._sorted: list[tuple[str, int]] = []
+        self._postings: dict[str, set[int]] = {}
+
+    def clear(self):
+        self._terms = {}
+        self._sorted = []
+        self._postings = {}
+
+    def put(self, doc_id: int, *terms: str):
+        """Index (or re-index, e.g. after a rename) a document under the given terms."""
+        normalized = tuple(dict.fromkeys(t for t in map(_normalize, terms) if t))
+        if self._terms.get(doc_id) == normalized:
+            return
+        self.remove(doc_id)
+        if not normalized:
+            return
+        self._terms[doc_id] = normalized
+        for term in normalized:
+            bisect.insort(self._sorted, (term, doc_id))
+            for gram in _grams(term, 2) | _grams(term, 3):
+                self._postings.setdefault(gram, set()).add(doc_id)
+
+    def remove(self, doc_id: int):
+        terms = self._terms.pop(doc_id, ())
+        for term in terms:
+            i = bisect.bisect_left(self._sorted, (term, doc_id))
+            if i < len(self._sorted) and self._sorted[i] == (term, doc_id):
+                del self._sorted[i]
+        for gram in {g for term in terms for g in _grams(term, 2) | _grams(term, 3)}:
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def search(self, query: str, limit: int | None = None) -> list[int]:
+        """Ids whose terms contain `query`: exact matches first, then prefix matches
+        (alphabetical), then substring matches. Single characters only match prefixes.
+        """
+        q = _normalize(query)
+        if not q:
+            return sorted(self._terms)[:limit]
+        found: dict[int, None] = {}
+        # Exact matches sort first among the terms starting with q.
+        i = bisect.bisect_left(self._sorted, (q,))
+        while i < len(self._sorted) and self._sorted[i][0].startswith(q):
+            found.setdefault(self._sorted[i][1])
+            if limit and len(found) >= limit:
+                return list(found)
+            i += 1
+        if len(q) < 2:
+            return list(found)
+        n = min(3, len(q))
+        postings = [self._postings.get(g) for g in _grams(q, n)]
+        if not all(postings):
+            return list(found)
+        postings.sort(key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        substring = []
+        for doc_id in candidates:
+            if doc_id in found:
+                continue
+            matches = [t for t in self._terms[doc_id] if q in t]
+            if matches:
+                substring.append((min(matches), doc_id))
+        substring.sort()
+        found.update((doc_id, None) for _, doc_id in substring)
+        return list(found)[:limit]
@@ -0,0 +1,82 @@
+"""In-memory session table with numeric expiries and heap-ordered sweeping."""
+
+import heapq
+from datetime import datetime, timezone
+from typing import Iterator, NamedTuple
+
+
+class Session(NamedTuple):
+    user_id: int
+    expires_at: float  # unix epoch seconds
+
+
+def parse_session(value) -> Session | None:
+    """Session from a persisted [user_id, epoch] or legacy {"user_id", "expires_at": iso}.
+
+    None if the value is unreadable.
+    """
+    if isinstance(value, list) and len(value) == 2:
+        return Session(int(value[0]), float(value[1]))
+    if isinstance(value, dict):
+        try:
+            user_id = int(value["user_id"])
+            exp = datetime.fromisoformat(value["expires_at"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if exp.tzinfo is None:
+            exp = exp.replace(tzinfo=timezone.utc)
+        return Session(user_id, exp.timestamp())
+    return None
+
+
+class SessionTable:
+    """token -> Session, plus a min-heap of (expires_at, token) for sweeping.
+
+    Lookups are a single dict read and never mutate, so they need no lock; an expired
+    session simply stops resolving until `pop_expired()` removes it. Writers must be
+    serialized by the caller (the store's sessions write lock). Revoked tokens stay in
+    the heap until their expiry comes up and are skipped then.
+    """
+
+    def __init__(self):
+        self._sessions: dict[str, Session] = {}
+        self._expiries: list[tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def clear(self):
+        self._sessions = {}
+        self._expiries = []
+
+    def add(self, token: str, session: Session):
+        self._sessions[token] = session
+        heapq.heappush(self._expiries, (session.expires_at, token))
+
+    def remove(self, token: str) -> bool:
+        return self._sessions.pop(token, None) is not None
+
+    def next_expiry(self) -> float:
+        """When the earliest session in the heap expires (inf if there is none)."""
+        return self._expiries[0][0] if self._expiries else float("inf")
+
+    def lookup(self, token: str, now: float) -> int | None:
+        """User id for a live token, else None."""
+        session = self._sessions.get(token)
+        if session is None or session.expires_at <= now:
+            return None
+        return session.user_id
+
+    def pop_expired(self, now: float) -> list[str]:
+        """Remove and return every token that has expired by `now`."""
+        expired = []
+        while self._expiries and self._expiries[0][0] <= now:
+            exp, token = heapq.heappop(self._expiries)
+            session = self._sessions.get(token)
+            if session is not None and session.expires_at == exp:
+                del self._sessions[token]
+                expired.append(token)
+        return expired
+
+    def items(self) -> Iterator[tuple[str, Session]]:
+        return iter(list(self._sessions.items()))
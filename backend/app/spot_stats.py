@@ -0,0 +1,148 @@
+"""Running per-spot score aggregates and the leaderboards built on them."""
+
+import bisect
+
+from app.tiers import score_to_rating
+
+HISTOGRAM_BINS = 10  # [0, 1), [1, 2), ... [9, 10]
+RATINGS = ("good", "okay", "bad")
+
+# Leaderboards order spots by their mean score shrunk toward PRIOR_SCORE by PRIOR_WEIGHT
+# virtual rankings, so a single 10 does not outrank fifty 9s. The key depends only on
+# the spot's own count and total, so one ranking changing moves one leaderboard entry.
+PRIOR_SCORE = 5.0
+PRIOR_WEIGHT = 2
+
+
+def score_bin(score: float) -> int:
+    return min(max(int(score), 0), HISTOGRAM_BINS - 1)
+
+
+def leaderboard_score(count: int, total: float) -> float:
+    return (total + PRIOR_SCORE * PRIOR_WEIGHT) / (count + PRIOR_WEIGHT)
+
+
+def category_key(category: str | None) -> str:
+    return (category or "").strip().lower()
+
+
+def stats_response(spot: dict, count: int, total: float, histogram: list[int], ratings: dict[str, int]) -> dict:
+    """API shape of one spot's aggregates. Tiers start at whole scores (see
+    `tiers.score_to_tier`), so their distribution is read off the histogram."""
+    total = round(total, 6)  # drop the drift of adding and subtracting scores over time
+    tiers = {
+        "S": histogram[9],
+        "A": histogram[8],
+        "B": histogram[7],
+        "C": histogram[6],
+        "D": histogram[5],
+        "F": sum(histogram[:5]),
+    }
+    return {
+        "spot": spot,
+        "count": count,
+        "mean_score": round(total / count, 2) if count else 0.0,
+        "leaderboard_score": round(leaderboard_score(count, total), 2),
+        "histogram": list(histogram),
+        "tiers": tiers,
+        "ratings": {r: ratings.get(r, 0) for r in RATINGS},
+    }
+
+
+class _Aggregate:
+    __slots__ = ("count", "total", "histogram", "ratings")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.histogram = [0] * HISTOGRAM_BINS
+        self.ratings = dict.fromkeys(RATINGS, 0)
+
+
+class SpotStats:
+    """Count, score total, histogram and rating buckets per spot over every user's
+    rankings, updated as rankings come and go, plus one sorted list per category (and
+    one overall) ordered by `leaderboard_score`. Reading the top k is O(k) whatever
+    the number of rankings; an update costs O(log spots) plus one list insertion.
+
+    Not thread-safe on its own: the store guards it with the rankings lock.
+    """
+
+    def __init__(self):
+        self._stats: dict[int, _Aggregate] = {}
+        self._categories: dict[int, str] = {}  # spot id -> category key
+        self._boards: dict[str, list[tuple[float, int, int]]] = {}  # "" = overall
+
+    def clear(self):
+        self._stats = {}
+        self._categories = {}
+        self._boards = {}
+
+    @staticmethod
+    def _key(spot_id: int, agg: _Aggregate) -> tuple[float, int, int]:
+        return (-leaderboard_score(agg.count, agg.total), -agg.count, spot_id)
+
+    def _unlist(self, spot_id: int):
+        agg = self._stats.get(spot_id)
+        if agg is None:
+            return
+        key = self._key(spot_id, agg)
+        for board in {"", self._categories.get(spot_id, "")}:
+            entries = self._boards.get(board, [])
+            i = bisect.bisect_left(entries, key)
+            if i < len(entries) and entries[i] == key:
+                del entries[i]
+                if not entries:
+                    del self._boards[board]
+
+    def _list(self, spot_id: int):
+        agg = self._stats[spot_id]
+        key = self._key(spot_id, agg)
+        bisect.insort(self._boards.setdefault("", []), key)
+        category = self._categories.get(spot_id, "")
+        if category:
+            bisect.insort(self._boards.setdefault(category, []), key)
+
+    def add(self, spot_id: int, category: str, score: float):
+        """Count one ranking of `spot_id`."""
+        self._unlist(spot_id)
+        self._categories[spot_id] = category_key(category)
+        agg = self._stats.get(spot_id)
+        if agg is None:
+            agg = self._stats[spot_id] = _Aggregate()
+        agg.count += 1
+        agg.total += score
+        agg.histogram[score_bin(score)] += 1
+        agg.ratings[score_to_rating(score)] += 1
+        self._list(spot_id)
+
+    def remove(self, spot_id: int, score: float):
+        """Forget one ranking of `spot_id` (one that `add()` counted)."""
+        agg = self._stats.get(spot_id)
+        if agg is None:
+            return
+        self._unlist(spot_id)
+        agg.count -= 1
+        if agg.count <= 0:
+            del self._stats[spot_id]
+            self._categories.pop(spot_id, None)
+            return
+        agg.total -= score
+        agg.histogram[score_bin(score)] -= 1
+        agg.ratings[score_to_rating(score)] -= 1
+        self._list(spot_id)
+
+    def set_category(self, spot_id: int, category: str):
+        if spot_id not in self._stats:
+            return
+        self._unlist(spot_id)
+        self._categories[spot_id] = category_key(category)
+        self._list(spot_id)
+
+    def top(self, category: str = "", limit: int = 10) -> list[tuple[int, int, float, list[int], dict[str, int]]]:
+        """Best `limit` spots overall (or in `category`): (spot id, count, total, histogram, ratings)."""
+        out = []
+        for _, _, spot_id in self._boards.get(category_key(category), ())[:limit]:
+            agg = self._stats[spot_id]
+            out.append((spot_id, agg.count, agg.total, list(agg.histogram), dict(agg.ratings)))
+        return out
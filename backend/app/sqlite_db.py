@@ -0,0 +1,484 @@
+"""SQLite database (WAL mode) behind the `STELI_STORAGE=sqlite` repositories."""
+
+import json
+import os
+import secrets
+import sqlite3
+import stat
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from app.blobs import URL_PREFIX
+from app.metrics import LOCK_WAIT, STORE_IO
+from app.spot_stats import HISTOGRAM_BINS, PRIOR_SCORE, PRIOR_WEIGHT
+from app.tiers import BAD_MAX, OKAY_MAX
+
+SCHEMA_VERSION = 1
+
+# Must match `spot_stats.leaderboard_score`; the helpers below mirror `spot_stats.score_bin`
+# and `tiers.score_to_rating` for the aggregate triggers.
+LEADERBOARD_ORDER = f"((total + {PRIOR_SCORE * PRIOR_WEIGHT}) / (count + {PRIOR_WEIGHT})) DESC, count DESC, spot_id"
+
+
+def _score_bin(score: str) -> str:
+    return f"min(max(CAST({score} AS INTEGER), 0), {HISTOGRAM_BINS - 1})"
+
+
+def _rating_flags(score: str) -> tuple[str, str, str]:
+    """SQL booleans for the bad / okay / good buckets of `score`."""
+    return (
+        f"{score} < {BAD_MAX!r}",
+        f"{score} >= {BAD_MAX!r} AND {score} < {OKAY_MAX!r}",
+        f"{score} >= {OKAY_MAX!r}",
+    )
+
+
+def _count_ranking(row: str) -> str:
+    bad, okay, good = _rating_flags(f"{row}.score")
+    return f"""
+    INSERT INTO spot_stats (spot_id, category, count, total, bad, okay, good)
+    SELECT {row}.spot_id, lower(trim(category)), 1, {row}.score, {bad}, {okay}, {good}
+    FROM spots WHERE id = {row}.spot_id
+    ON CONFLICT (spot_id) DO UPDATE SET count = count + 1, total = total + excluded.total,
+        bad = bad + excluded.bad, okay = okay + excluded.okay, good = good + excluded.good;
+    INSERT INTO spot_score_bins (spot_id, bin, n) VALUES ({row}.spot_id, {_score_bin(f"{row}.score")}, 1)
+    ON CONFLICT (spot_id, bin) DO UPDATE SET n = n + 1;"""
+
+
+def _uncount_ranking(row: str) -> str:
+    bad, okay, good = _rating_flags(f"{row}.score")
+    return f"""
+    UPDATE spot_stats SET count = count - 1, total = total - {row}.score,
+        bad = bad - ({bad}), okay = okay - ({okay}), good = good - ({good})
+    WHERE spot_id = {row}.spot_id;
+    DELETE FROM spot_stats WHERE spot_id = {row}.spot_id AND count <= 0;
+    UPDATE spot_score_bins SET n = n - 1 WHERE spot_id = {row}.spot_id AND bin = {_score_bin(f"{row}.score")};
+    DELETE FROM spot_score_bins WHERE spot_id = {row}.spot_id AND n <= 0;"""
+
+
+def _bump_version(kind: str, entity: str) -> str:
+    """Trigger statement bumping one `versions` row (see app/versions.py)."""
+    return f"""
+    INSERT INTO versions (kind, id, version) VALUES ('{kind}', {entity}, 1)
+    ON CONFLICT (kind, id) DO UPDATE SET version = version + 1;"""
+
+
+def _blob_digest(url: str) -> str:
+    """SQL for the digest of a blob URL (`blobs.digest_of`), NULL for any other URL."""
+    prefix = len(URL_PREFIX)
+    return (
+        f"(CASE WHEN substr({url}, 1, {prefix}) = '{URL_PREFIX}' AND length({url}) = {prefix + 64}"
+        f" THEN substr({url}, {prefix + 1}) END)"
+    )
+
+
+def _retain_blob(url: str) -> str:
+    digest = _blob_digest(url)
+    return f"""
+    INSERT INTO blob_refs (digest, refs) SELECT {digest}, 1 WHERE {digest} IS NOT NULL
+    ON CONFLICT (digest) DO UPDATE SET refs = refs + 1;
+    DELETE FROM blob_garbage WHERE digest = {digest};"""
+
+
+def _release_blob(url: str) -> str:
+    digest = _blob_digest(url)
+    return f"""
+    UPDATE blob_refs SET refs = refs - 1 WHERE digest = {digest};
+    INSERT OR IGNORE INTO blob_garbage (digest) SELECT digest FROM blob_refs WHERE digest = {digest} AND refs <= 0;
+    DELETE FROM blob_refs WHERE digest = {digest} AND refs <= 0;"""
+
+
+# Tables whose rows hold photo URLs: table -> column.
+PHOTO_COLUMNS = {"users": "profile_photo_url", "rankings": "photo_url", "feed_events": "photo_url"}
+
+
+def _blob_ref_triggers() -> str:
+    return "".join(
+        f"""
+CREATE TRIGGER IF NOT EXISTS {table}_retain_blob AFTER INSERT ON {table} BEGIN
+    {_retain_blob(f"NEW.{column}")}
+END;
+CREATE TRIGGER IF NOT EXISTS {table}_release_blob AFTER DELETE ON {table} BEGIN
+    {_release_blob(f"OLD.{column}")}
+END;
+CREATE TRIGGER IF NOT EXISTS {table}_replace_blob AFTER UPDATE OF {column} ON {table} BEGIN
+    {_retain_blob(f"NEW.{column}")}
+    {_release_blob(f"OLD.{column}")}
+END;"""
+        for table, column in PHOTO_COLUMNS.items()
+    )
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    username_key TEXT NOT NULL UNIQUE,
+    password_hash TEXT NOT NULL,
+    first_name TEXT NOT NULL DEFAULT '',
+    last_name TEXT NOT NULL DEFAULT '',
+    profile_photo_url TEXT NOT NULL DEFAULT '',
+    is_public INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    token TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at);
+CREATE TABLE IF NOT EXISTS follows (
+    follower_id INTEGER NOT NULL,
+    following_id INTEGER NOT NULL,
+    PRIMARY KEY (follower_id, following_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS follows_by_following ON follows (following_id, follower_id);
+CREATE TABLE IF NOT EXISTS follow_versions (
+    user_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL    -- bumped by the triggers below whenever the user (un)follows someone
+);
+CREATE TRIGGER IF NOT EXISTS follows_added AFTER INSERT ON follows BEGIN
+    INSERT INTO follow_versions (user_id, version) VALUES (NEW.follower_id, 1)
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS follows_removed AFTER DELETE ON follows BEGIN
+    INSERT INTO follow_versions (user_id, version) VALUES (OLD.follower_id, 1)
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+END;
+CREATE TABLE IF NOT EXISTS follow_requests (
+    requester_id INTEGER NOT NULL,
+    target_id INTEGER NOT NULL,
+    PRIMARY KEY (requester_id, target_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS follow_requests_by_target ON follow_requests (target_id, requester_id);
+CREATE TABLE IF NOT EXISTS spots (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL UNIQUE,
+    category TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS rankings (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    spot_id INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    score REAL NOT NULL,
+    tier TEXT NOT NULL,
+    notes TEXT NOT NULL DEFAULT '',
+    photo_url TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rankings_by_user ON rankings (user_id, rank);
+CREATE TABLE IF NOT EXISTS ranking_lists (
+    user_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL    -- bumped on every change to the user's ranked list
+);
+CREATE TABLE IF NOT EXISTS comparisons (
+    id INTEGER PRIMARY KEY,     -- append order; the backend tails new rows by id
+    user_id INTEGER NOT NULL,
+    winner_id INTEGER NOT NULL,
+    loser_id INTEGER NOT NULL,
+    created_at REAL NOT NULL    -- unix epoch seconds
+);
+CREATE INDEX IF NOT EXISTS comparisons_by_user ON comparisons (user_id, id);
+CREATE TABLE IF NOT EXISTS feed_events (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    spot_id INTEGER,
+    spot TEXT NOT NULL,         -- JSON copy of the spot at event time
+    score REAL NOT NULL,
+    tier TEXT NOT NULL,
+    photo_url TEXT NOT NULL DEFAULT '',
+    meta TEXT                   -- JSON, e.g. the loser of a comparison
+);
+CREATE INDEX IF NOT EXISTS feed_events_created_at ON feed_events (created_at);
+CREATE INDEX IF NOT EXISTS feed_events_by_user ON feed_events (user_id, id);
+CREATE TABLE IF NOT EXISTS likes (
+    feed_event_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    PRIMARY KEY (feed_event_id, user_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS comments (
+    id INTEGER PRIMARY KEY,
+    feed_event_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS comments_by_event ON comments (feed_event_id, id);
+""" + f"""
+-- Per-spot aggregates over all rankings, kept current by the triggers below. `category`
+-- is the spot's category key (trimmed, lowercase) so leaderboards can use one index.
+CREATE TABLE IF NOT EXISTS spot_stats (
+    spot_id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL DEFAULT '',
+    count INTEGER NOT NULL,
+    total REAL NOT NULL,
+    bad INTEGER NOT NULL DEFAULT 0,
+    okay INTEGER NOT NULL DEFAULT 0,
+    good INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS spot_stats_leaderboard ON spot_stats ({LEADERBOARD_ORDER});
+CREATE INDEX IF NOT EXISTS spot_stats_category_leaderboard ON spot_stats (category, {LEADERBOARD_ORDER});
+CREATE TABLE IF NOT EXISTS spot_score_bins (
+    spot_id INTEGER NOT NULL,
+    bin INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (spot_id, bin)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS rankings_count AFTER INSERT ON rankings BEGIN
+    {_count_ranking("NEW")}
+END;
+CREATE TRIGGER IF NOT EXISTS rankings_uncount AFTER DELETE ON rankings BEGIN
+    {_uncount_ranking("OLD")}
+END;
+CREATE TRIGGER IF NOT EXISTS rankings_recount AFTER UPDATE OF spot_id, score ON rankings BEGIN
+    {_uncount_ranking("OLD")}
+    {_count_ranking("NEW")}
+END;
+CREATE TRIGGER IF NOT EXISTS spots_recategorize AFTER UPDATE OF category ON spots BEGIN
+    UPDATE spot_stats SET category = lower(trim(NEW.category)) WHERE spot_id = NEW.id;
+END;
+CREATE TABLE IF NOT EXISTS versions (
+    kind TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    version INTEGER NOT NULL,   -- bumped by the triggers below; read for ETags
+    PRIMARY KEY (kind, id)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS users_versions
+AFTER UPDATE OF username, first_name, last_name, profile_photo_url, is_public ON users BEGIN
+    {_bump_version("user", "NEW.id")}
+    {_bump_version("profile", "0")}
+END;
+CREATE TRIGGER IF NOT EXISTS follows_added_versions AFTER INSERT ON follows BEGIN
+    {_bump_version("user", "NEW.follower_id")}
+    {_bump_version("user", "NEW.following_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS follows_removed_versions AFTER DELETE ON follows BEGIN
+    {_bump_version("user", "OLD.follower_id")}
+    {_bump_version("user", "OLD.following_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS follow_requests_added_versions AFTER INSERT ON follow_requests BEGIN
+    {_bump_version("user", "NEW.requester_id")}
+    {_bump_version("user", "NEW.target_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS follow_requests_removed_versions AFTER DELETE ON follow_requests BEGIN
+    {_bump_version("user", "OLD.requester_id")}
+    {_bump_version("user", "OLD.target_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS spots_added_versions AFTER INSERT ON spots BEGIN
+    {_bump_version("spots", "0")}
+END;
+CREATE TRIGGER IF NOT EXISTS spots_changed_versions AFTER UPDATE ON spots BEGIN
+    {_bump_version("spots", "0")}
+END;
+CREATE TRIGGER IF NOT EXISTS rankings_added_versions AFTER INSERT ON rankings BEGIN
+    {_bump_version("rankings", "NEW.user_id")}
+    {_bump_version("user", "NEW.user_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS rankings_removed_versions AFTER DELETE ON rankings BEGIN
+    {_bump_version("rankings", "OLD.user_id")}
+    {_bump_version("user", "OLD.user_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS rankings_changed_versions AFTER UPDATE ON rankings BEGIN
+    {_bump_version("rankings", "NEW.user_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS comparisons_versions AFTER INSERT ON comparisons BEGIN
+    {_bump_version("rankings", "NEW.user_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS likes_added_versions AFTER INSERT ON likes BEGIN
+    {_bump_version("event", "NEW.feed_event_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS likes_removed_versions AFTER DELETE ON likes BEGIN
+    {_bump_version("event", "OLD.feed_event_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS comments_added_versions AFTER INSERT ON comments BEGIN
+    {_bump_version("event", "NEW.feed_event_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS comments_removed_versions AFTER DELETE ON comments BEGIN
+    {_bump_version("event", "OLD.feed_event_id")}
+END;
+-- Rows referencing each blob, kept by the triggers below, and the blobs whose count
+-- dropped to zero: `SqliteBackend.collect_blobs()` deletes their files.
+CREATE TABLE IF NOT EXISTS blob_refs (
+    digest TEXT PRIMARY KEY,
+    refs INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS blob_garbage (
+    digest TEXT PRIMARY KEY
+) WITHOUT ROWID;
+{_blob_ref_triggers()}
+"""
+
+
+class SqliteDatabase:
+    """One connection per thread to a WAL-mode database file.
+
+    Readers never block the writer (or each other); writes go through `transaction()`,
+    which takes SQLite's write lock up front so concurrent writers queue instead of
+    failing with SQLITE_BUSY halfway through.
+    """
+
+    def __init__(self, path: Path, durability: str = "strict"):
+        self.path = path
+        # WAL + synchronous=NORMAL only fsyncs at checkpoints; a crash can lose the
+        # last transactions but never corrupts the database.
+        self._synchronous = "FULL" if durability == "strict" else "NORMAL"
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self.connection()
+        os.chmod(self.path, stat.S_IRUSR | stat.S_IWUSR)  # 0600: holds password hashes
+        conn.executescript(SCHEMA)
+        conn.execute(
+            "INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),)
+        )
+        # Part of every ETag, so a recreated database never matches the old one's.
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('versions_epoch', ?)", (secrets.token_hex(4),))
+        self._build_spot_stats()
+        self._build_blob_refs()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; `transaction()` issues BEGIN/COMMIT explicitly.
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self._synchronous}")
+            conn.execute("PRAGMA foreign_keys=OFF")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self.connection()
+        with LOCK_WAIT.time("sqlite", "write"):
+            conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        with STORE_IO.time("sqlite_commit"):
+            conn.execute("COMMIT")
+
+    def _build_spot_stats(self) -> None:
+        """Fill the aggregate tables once for databases created before they existed; the
+        triggers keep them current from then on."""
+        bad, okay, good = _rating_flags("r.score")
+        with self.transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'spot_stats_built'").fetchone():
+                return
+            conn.execute("DELETE FROM spot_stats")
+            conn.execute("DELETE FROM spot_score_bins")
+            conn.execute(
+                "INSERT INTO spot_stats (spot_id, category, count, total, bad, okay, good)"
+                f" SELECT r.spot_id, lower(trim(s.category)), COUNT(*), SUM(r.score), SUM({bad}), SUM({okay}),"
+                f" SUM({good}) FROM rankings r JOIN spots s ON s.id = r.spot_id GROUP BY r.spot_id"
+            )
+            conn.execute(
+                f"INSERT INTO spot_score_bins (spot_id, bin, n) SELECT r.spot_id, {_score_bin('r.score')}, COUNT(*)"
+                " FROM rankings r GROUP BY 1, 2"
+            )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('spot_stats_built', '1')")
+
+    def _build_blob_refs(self) -> None:
+        """Count blob references once for databases created before `blob_refs` existed;
+        the triggers keep the counts current from then on."""
+        with self.transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'blob_refs_built'").fetchone():
+                return
+            conn.execute("DELETE FROM blob_refs")
+            urls = " UNION ALL ".join(f"SELECT {column} AS url FROM {table}" for table, column in PHOTO_COLUMNS.items())
+            conn.execute(
+                f"INSERT INTO blob_refs (digest, refs) SELECT {_blob_digest('url')} AS digest, COUNT(*)"
+                f" FROM ({urls}) WHERE digest IS NOT NULL GROUP BY digest"
+            )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('blob_refs_built', '1')")
+
+    def get_meta(self, key: str) -> str | None:
+        row = self.connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def import_store(self, store) -> None:
+        """One-shot copy of an in-memory JSON `Store` into empty tables (ids are kept)."""
+        with self.transaction() as conn:
+            if conn.execute("SELECT value FROM meta WHERE key = 'imported_store'").fetchone():
+                return
+            conn.executemany(
+                "INSERT INTO users (id, username, username_key, password_hash, first_name, last_name,"
+                " profile_photo_url, is_public) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (u["id"], u["username"], u["username"].lower(), u["password_hash"], u["first_name"],
+                     u["last_name"], u.get("profile_photo_url", ""), int(u.get("is_public", False)))
+                    for u in store.users.values()
+                ],
+            )
+            conn.executemany(
+                "INSERT INTO sessions (token, user_id, expires_at) VALUES (?, ?, ?)",
+                [(token, s.user_id, s.expires_at) for token, s in store.sessions.items()],
+            )
+            conn.executemany("INSERT INTO follows (follower_id, following_id) VALUES (?, ?)", sorted(store.follows))
+            conn.executemany(
+                "INSERT INTO follow_requests (requester_id, target_id) VALUES (?, ?)", sorted(store.follow_requests)
+            )
+            conn.executemany(
+                "INSERT INTO spots (id, name, name_key, category) VALUES (?, ?, ?, ?)",
+                [(s["id"], s["name"], s["name"].lower().strip(), s.get("category", "")) for s in store.spots.values()],
+            )
+            # The JSON store keeps list order in `user_rankings`; here it is the rank column.
+            positions = {rid: i for ids in store.user_rankings.values() for i, rid in enumerate(ids, start=1)}
+            conn.executemany(
+                "INSERT INTO rankings (id, user_id, spot_id, rank, score, tier, notes, photo_url, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (r["id"], r["user_id"], r["spot_id"], positions.get(r["id"], r["rank"]), r["score"], r["tier"],
+                     r.get("notes", ""), r.get("photo_url", ""), r["created_at"])
+                    for r in store.rankings.values()
+                ],
+            )
+            conn.executemany(
+                "INSERT INTO ranking_lists (user_id, version) VALUES (?, ?)", sorted(store.ranking_versions.items())
+            )
+            columns = store.pairwise.columns()
+            conn.executemany(
+                "INSERT INTO comparisons (user_id, winner_id, loser_id, created_at) VALUES (?, ?, ?, ?)",
+                zip(columns["user_id"], columns["winner_id"], columns["loser_id"], columns["created_at"]),
+            )
+            conn.executemany(
+                "INSERT INTO feed_events (id, user_id, created_at, kind, spot_id, spot, score, tier, photo_url, meta)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (e["id"], e["user_id"], e["created_at"], e.get("kind", "new"), e["spot"].get("id"),
+                     json.dumps(e["spot"]), e["score"], e["tier"], e.get("photo_url", ""),
+                     json.dumps(e["meta"]) if "meta" in e else None)
+                    for e in store.feed_events
+                ],
+            )
+            conn.executemany(
+                "INSERT INTO likes (feed_event_id, user_id) VALUES (?, ?)",
+                [(eid, uid) for eid, likers in store.likes.items() for uid in likers],
+            )
+            conn.executemany(
+                "INSERT INTO comments (id, feed_event_id, user_id, text, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(c["id"], c["feed_event_id"], c["user_id"], c["text"], c["created_at"]) for c in store.comments],
+            )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('imported_store', ?)", (str(store._data_file),))
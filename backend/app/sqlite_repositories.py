@@ -0,0 +1,1076 @@
+"""Repository implementations over SQLite (selected with `STELI_STORAGE=sqlite`)."""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import secrets
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+from app import blobs
+from app.blobs import BlobStore
+from app.images import ImagePipeline, variant_urls
+from app.keys import load_fernet
+from app.matchups import RECENT_PAIRS, MatchupPool, standing
+from app.pagination import decode_cursor
+from app.pairwise import PairwiseRatings
+from app.ranking_ops import UPDATE_FIELDS, RankingVersionConflict, check_ops, clamp_position
+from app.passwords import HasherBusy, PasswordHasher
+from app.recommendations import Recommender, recommendation
+from app.repositories import (
+    BlobRepository,
+    RankingRepository,
+    SessionRepository,
+    SocialRepository,
+    SpotRepository,
+    UserRepository,
+)
+from app.sqlite_db import LEADERBOARD_ORDER, SqliteDatabase
+from app.spot_stats import HISTOGRAM_BINS, category_key, stats_response
+from app.suggestions import MAX_FOLLOWING, FollowSuggestions, spread
+from app.tiers import score_to_rating, score_to_tier
+from app.versions import PAIRWISE
+
+# Searchable user fields, as SQL expressions.
+_USER_TERMS = ("username", "first_name", "last_name", "first_name || ' ' || last_name")
+
+# Feed event columns; a "new" event without its own photo shows the author's current
+# photo for that spot.
+_EVENT_COLUMNS = """
+    e.id, e.user_id, e.created_at, e.kind, e.spot, e.score, e.tier, e.meta,
+    COALESCE(
+        NULLIF(TRIM(e.photo_url), ''),
+        CASE WHEN e.kind = 'new' THEN (
+            SELECT NULLIF(TRIM(r.photo_url), '') FROM rankings r
+            WHERE r.user_id = e.user_id AND r.spot_id = e.spot_id ORDER BY r.rank LIMIT 1
+        ) END,
+        ''
+    ) AS photo_url
+"""
+
+
+def _ids_param(ids) -> str:
+    """A list of ids as one JSON parameter, for `IN (SELECT value FROM json_each(?))`."""
+    return json.dumps(list(ids))
+
+
+def _like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _user(row: sqlite3.Row | None) -> dict | None:
+    if row is None:
+        return None
+    return {
+        "id": row["id"],
+        "username": row["username"],
+        "password_hash": row["password_hash"],
+        "first_name": row["first_name"],
+        "last_name": row["last_name"],
+        "profile_photo_url": row["profile_photo_url"],
+        "is_public": bool(row["is_public"]),
+    }
+
+
+def _user_summary(user: dict | None) -> dict:
+    user = user or {}
+    return {
+        "id": user.get("id", 0),
+        "username": user.get("username", ""),
+        "first_name": user.get("first_name", ""),
+        "last_name": user.get("last_name", ""),
+        "profile_photo_url": user.get("profile_photo_url", ""),
+        "profile_photo_variants": variant_urls(user.get("profile_photo_url")),
+    }
+
+
+# Comments joined with their author's summary fields.
+_COMMENT_SELECT = """
+    SELECT c.*, u.id AS author_id, u.username, u.first_name, u.last_name, u.profile_photo_url
+    FROM comments c LEFT JOIN users u ON u.id = c.user_id
+"""
+
+
+def _comment(row: sqlite3.Row) -> dict:
+    author = None
+    if row["author_id"] is not None:
+        author = {k: row[k] for k in ("username", "first_name", "last_name", "profile_photo_url")}
+        author["id"] = row["author_id"]
+    return {
+        "id": row["id"],
+        "user": _user_summary(author),
+        "text": row["text"],
+        "created_at": row["created_at"],
+    }
+
+
+def _spot(row: sqlite3.Row) -> dict:
+    return {"id": row["id"], "name": row["name"], "category": row["category"]}
+
+
+class SqliteBackend:
+    """Shared state for the SQLite repositories: the database, blobs and hashing pool.
+
+    An empty database is filled once from the JSON store's files in the same data dir,
+    if there are any, keeping all ids. Otherwise it starts empty.
+    """
+
+    # Several processes may share the database, and an upload is only pinned in its own
+    # process: a blob written (or re-put) by any of them is safe from collection for this
+    # long, as in the JSON store's multi-worker mode.
+    _BLOB_MIN_AGE_SECONDS = 600
+    # Unreferenced blobs are looked for at most this often per process.
+    _BLOB_COLLECT_INTERVAL_SECONDS = 60
+
+    def __init__(self, data_dir: Path | None = None):
+        data_dir = data_dir or Path(os.getenv("STELI_DATA_DIR", Path(__file__).resolve().parents[1] / "data"))
+        path = Path(os.getenv("STELI_SQLITE_PATH", data_dir / "steli.db"))
+        self.db = SqliteDatabase(path, durability=os.getenv("STELI_DURABILITY", "strict"))
+        self.blobs = BlobStore(data_dir / "blobs", load_fernet(data_dir), min_age=self._BLOB_MIN_AGE_SECONDS)
+        self.images = ImagePipeline(self.blobs)
+        self.passwords = PasswordHasher()
+        self.session_ttl_seconds = int(os.getenv("STELI_SESSION_TTL_SECONDS", str(60 * 60 * 24)))
+        # Cached per process; the `follow_versions` triggers tell when an entry is stale.
+        self.follow_suggestions = FollowSuggestions(max_users=int(os.getenv("STELI_SUGGESTION_CACHE_USERS", "10000")))
+        if self.db.get_meta("imported_store") is None:
+            self._import_json_store(data_dir)
+        self._blobs_collected_at = 0.0
+        self._collect_orphan_blobs()
+        # In-memory ratings over the `comparisons` table, which is only ever appended
+        # to: each read first applies the rows added since (by any process).
+        self._pairwise = PairwiseRatings(refit_every=int(os.getenv("STELI_PAIRWISE_REFIT_EVERY", "200")))
+        self._pairwise_seen = 0  # id of the last comparison row applied
+        self._pairwise_lock = threading.Lock()
+        self.pairwise()
+        self._pairwise.fit()
+        # Rows changed here are passed in as they commit; a refit rereads the whole table,
+        # which also picks up other processes' changes.
+        self.recommender = Recommender(
+            refit_every=int(os.getenv("STELI_RECOMMENDER_REFIT_EVERY", "500")), load_rows=self._recommender_rows
+        )
+        self.recommender.refresh()
+
+    def _import_json_store(self, data_dir: Path):
+        if self.db.connection().execute("SELECT 1 FROM users LIMIT 1").fetchone():
+            return
+        if not ((data_dir / "store.json").exists() or (data_dir / "store.wal").exists()):
+            return
+        from app.store import Store
+
+        # Its own instance over the snapshot and log; the app's `store` (and with it the
+        # demo seed) is never created.
+        store = Store(data_dir)
+        try:
+            self.db.import_store(store)
+        finally:
+            store.close()
+
+    @contextmanager
+    def photo_uploads(self) -> Iterator:
+        """Yields a function turning data URLs into (pinned) blob URLs and queues their
+        size variants. Pins are released when the block exits."""
+        pinned: list[str] = []
+
+        def externalize(url: str) -> str:
+            ref = self.blobs.externalize(url)
+            if ref != url:
+                digest = blobs.digest_of(ref)
+                pinned.append(digest)
+                self.images.submit(digest)
+            return ref
+
+        try:
+            yield externalize
+        finally:
+            for digest in pinned:
+                self.blobs.unpin(digest)
+            # Every write that can drop a photo reference goes through here.
+            self.collect_blobs()
+
+    def _collect_orphan_blobs(self) -> None:
+        """Blobs left behind by writes that never committed become garbage too."""
+        on_disk = list(self.blobs.digests())
+        with self.db.transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO blob_garbage (digest) SELECT value FROM json_each(?)"
+                " WHERE value NOT IN (SELECT digest FROM blob_refs)",
+                (json.dumps(on_disk),),
+            )
+        self.collect_blobs(force=True)
+
+    def collect_blobs(self, force: bool = False) -> None:
+        """Delete the files of blobs no row references any more (the `blob_refs` triggers
+        list them in `blob_garbage`). Pinned or recently written blobs are kept for later."""
+        now = time.monotonic()
+        if not force and now - self._blobs_collected_at < self._BLOB_COLLECT_INTERVAL_SECONDS:
+            return
+        self._blobs_collected_at = now
+        if not self.db.connection().execute("SELECT 1 FROM blob_garbage LIMIT 1").fetchone():
+            return
+        # In one write transaction, so no row can take a new reference meanwhile.
+        with self.db.transaction() as conn:
+            garbage = [r["digest"] for r in conn.execute("SELECT digest FROM blob_garbage")]
+            deleted = [digest for digest in garbage if self.blobs.delete(digest)]
+            conn.execute(
+                "DELETE FROM blob_garbage WHERE digest IN (SELECT value FROM json_each(?))", (_ids_param(deleted),)
+            )
+
+    def pairwise(self) -> PairwiseRatings:
+        """The pairwise ratings, caught up with every committed comparison."""
+        with self._pairwise_lock:
+            rows = self.db.connection().execute(
+                "SELECT id, user_id, winner_id, loser_id, created_at FROM comparisons WHERE id > ? ORDER BY id",
+                (self._pairwise_seen,),
+            ).fetchall()
+            for row in rows:
+                self._pairwise.record(row["user_id"], row["winner_id"], row["loser_id"], row["created_at"])
+                self._pairwise_seen = row["id"]
+        return self._pairwise
+
+    def entity_versions(self, keys: list[tuple[str, int]]) -> tuple:
+        """The database's epoch followed by the current version of each entity (the
+        `versions` triggers keep them; pairwise strengths are this process's own fit)."""
+        conn = self.db.connection()
+        rows = conn.execute(
+            "SELECT kind, id, version FROM versions WHERE (kind, id) IN"
+            " (SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?))",
+            (json.dumps(keys),),
+        ).fetchall()
+        versions = {(r["kind"], r["id"]): r["version"] for r in rows}
+        if PAIRWISE in keys:
+            versions[PAIRWISE] = self.pairwise().strengths_version
+        return (self.db.get_meta("versions_epoch"), *(versions.get(key, 0) for key in keys))
+
+    def _recommender_rows(self) -> dict[int, dict[int, float]]:
+        rows: dict[int, dict[int, float]] = {}
+        for r in self.db.connection().execute("SELECT user_id, spot_id, score FROM rankings"):
+            rows.setdefault(r["user_id"], {})[r["spot_id"]] = r["score"]
+        return rows
+
+    def sizes(self) -> dict[str, dict[str, int]]:
+        """Row counts per table and database file sizes, for the `/metrics` gauges."""
+        tables = ("users", "sessions", "follows", "follow_requests", "spots", "rankings", "comparisons",
+                  "feed_events", "likes", "comments")
+        row = self.db.connection().execute(
+            "SELECT " + ", ".join(f"(SELECT COUNT(*) FROM {t})" for t in tables)
+        ).fetchone()
+        wal = self.db.path.with_name(self.db.path.name + "-wal")
+        return {
+            "items": dict(zip(tables, row)),
+            "bytes": {
+                "database": self.db.path.stat().st_size,
+                "wal": wal.stat().st_size if wal.exists() else 0,
+            },
+        }
+
+    def close(self) -> None:
+        self.images.shutdown()
+        self.passwords.shutdown()
+        self._pairwise.shutdown()
+        self.recommender.shutdown()
+        self.db.close()
+
+
+class SqliteUserRepository(UserRepository):
+    def __init__(self, backend: SqliteBackend):
+        self._backend = backend
+        self._db = backend.db
+
+    def _get(self, user_id: int) -> dict | None:
+        return _user(self._db.connection().execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone())
+
+    def create_user(self, username: str, password: str, first_name: str, last_name: str) -> dict | None:
+        if self.get_user_by_username(username) is not None:
+            return None
+        password_hash = self._backend.passwords.hash(password)
+        try:
+            with self._db.transaction() as conn:
+                cur = conn.execute(
+                    "INSERT INTO users (username, username_key, password_hash, first_name, last_name)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (username, username.lower(), password_hash, first_name, last_name),
+                )
+        except sqlite3.IntegrityError:  # taken while we were hashing
+            return None
+        return self._get(cur.lastrowid)
+
+    def verify_user(self, username: str, password: str) -> dict | None:
+        user = self.get_user_by_username(username)
+        if user is None:
+            return None
+        passwords = self._backend.passwords
+        old_hash = user["password_hash"]
+        if not passwords.verify(password, old_hash):
+            return None
+        if passwords.needs_rehash(old_hash):
+            try:
+                new_hash = passwords.hash(password)
+            except HasherBusy:
+                return user  # Try again on a later login.
+            with self._db.transaction() as conn:
+                conn.execute(
+                    "UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?",
+                    (new_hash, user["id"], old_hash),
+                )
+        return user
+
+    def get_user_by_username(self, username: str) -> dict | None:
+        row = self._db.connection().execute(
+            "SELECT * FROM users WHERE username_key = ?", (username.lower(),)
+        ).fetchone()
+        return _user(row)
+
+    def search_users(self, query: str, limit: int | None = None) -> list[dict]:
+        """Exact, then prefix, then substring matches (single characters: prefixes only)."""
+        q = " ".join(query.lower().split())
+        conn = self._db.connection()
+        if not q:
+            rows = conn.execute("SELECT * FROM users ORDER BY id LIMIT ?", (limit or -1,)).fetchall()
+            return [_user(r) for r in rows]
+        prefix = _like_escape(q) + "%"
+        contains = "%" + prefix if len(q) > 1 else prefix
+        exact = " OR ".join(f"lower({t}) = :q" for t in _USER_TERMS)
+        starts = " OR ".join(f"{t} LIKE :prefix ESCAPE '\\'" for t in _USER_TERMS)
+        matches = " OR ".join(f"{t} LIKE :contains ESCAPE '\\'" for t in _USER_TERMS)
+        rows = conn.execute(
+            f"SELECT * FROM users WHERE {matches}"
+            f" ORDER BY CASE WHEN {exact} THEN 0 WHEN {starts} THEN 1 ELSE 2 END, id LIMIT :limit",
+            {"q": q, "prefix": prefix, "contains": contains, "limit": limit or -1},
+        ).fetchall()
+        return [_user(r) for r in rows]
+
+    def update_profile_photo(self, user_id: int, photo_url: str) -> dict | None:
+        with self._backend.photo_uploads() as externalize:
+            photo_url = externalize(photo_url)
+            with self._db.transaction() as conn:
+                conn.execute("UPDATE users SET profile_photo_url = ? WHERE id = ?", (photo_url, user_id))
+        return self._get(user_id)
+
+    def update_privacy(self, user_id: int, is_public: bool) -> dict | None:
+        with self._db.transaction() as conn:
+            conn.execute("UPDATE users SET is_public = ? WHERE id = ?", (int(is_public), user_id))
+        return self._get(user_id)
+
+    def is_profile_visible(self, target_id: int, viewer_id: int | None) -> bool:
+        if viewer_id is not None and viewer_id == target_id:
+            return True
+        row = self._db.connection().execute(
+            "SELECT is_public OR EXISTS ("
+            "  SELECT 1 FROM follows WHERE follower_id = ? AND following_id = users.id"
+            ") FROM users WHERE id = ?",
+            (viewer_id, target_id),
+        ).fetchone()
+        return bool(row and row[0])
+
+    def get_user_cards(self, user_ids: list[int], viewer_id: int | None = None) -> list[dict]:
+        rows = self._db.connection().execute(
+            """
+            SELECT u.*,
+                (SELECT COUNT(*) FROM follows WHERE following_id = u.id) AS followers_count,
+                (SELECT COUNT(*) FROM follows WHERE follower_id = u.id) AS following_count,
+                (SELECT COUNT(*) FROM rankings WHERE user_id = u.id) AS ranked_count,
+                EXISTS (SELECT 1 FROM follows WHERE follower_id = :viewer AND following_id = u.id) AS following,
+                EXISTS (SELECT 1 FROM follow_requests WHERE requester_id = :viewer AND target_id = u.id) AS requested,
+                CASE WHEN u.id = :viewer
+                    THEN (SELECT COUNT(*) FROM follow_requests WHERE target_id = u.id) ELSE 0
+                END AS pending_requests_count
+            FROM users u WHERE u.id IN (SELECT value FROM json_each(:ids))
+            """,
+            {"viewer": viewer_id, "ids": _ids_param(user_ids)},
+        ).fetchall()
+        by_id = {r["id"]: r for r in rows}
+        cards = []
+        for uid in user_ids:
+            r = by_id.get(uid)
+            if r is None:
+                continue
+            status = "following" if r["following"] else "requested" if r["requested"] else "none"
+            cards.append({
+                "id": uid,
+                "username": r["username"],
+                "first_name": r["first_name"],
+                "last_name": r["last_name"],
+                "profile_photo_url": r["profile_photo_url"],
+                "profile_photo_variants": variant_urls(r["profile_photo_url"]),
+                "followers_count": r["followers_count"],
+                "following_count": r["following_count"],
+                "ranked_count": r["ranked_count"],
+                "is_following": status == "following",
+                "is_public": bool(r["is_public"]),
+                "follow_status": status,
+                "pending_requests_count": r["pending_requests_count"],
+            })
+        return cards
+
+
+class SqliteSessionRepository(SessionRepository):
+    def __init__(self, backend: SqliteBackend):
+        self._backend = backend
+        self._db = backend.db
+
+    def create_token(self, user_id: int) -> str:
+        token = secrets.token_hex(32)
+        now = time.time()
+        with self._db.transaction() as conn:
+            # Expired sessions are swept in one indexed range delete per login.
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "INSERT INTO sessions (token, user_id, expires_at) VALUES (?, ?, ?)",
+                (token, user_id, now + self._backend.session_ttl_seconds),
+            )
+        return token
+
+    def get_user_by_token(self, token: str) -> dict | None:
+        row = self._db.connection().execute(
+            "SELECT u.* FROM sessions s JOIN users u ON u.id = s.user_id WHERE s.token = ? AND s.expires_at > ?",
+            (token, time.time()),
+        ).fetchone()
+        return _user(row)
+
+    def delete_token(self, token: str) -> None:
+        with self._db.transaction() as conn:
+            conn.execute("DELETE FROM sessions WHERE token = ?", (token,))
+
+
+class SqliteSocialRepository(SocialRepository):
+    def __init__(self, backend: SqliteBackend):
+        self._db = backend.db
+        self._suggestions = backend.follow_suggestions
+
+    def _users_page(self, sql: str, user_id: int, limit: int | None, cursor: str | None) -> list[dict]:
+        key = decode_cursor(cursor, 1)
+        rows = self._db.connection().execute(sql, (user_id, key[0] if key else 0, limit or -1)).fetchall()
+        return [_user(r) for r in rows]
+
+    def follow(self, follower_id: int, following_id: int) -> str:
+        if follower_id == following_id:
+            return "self"
+        with self._db.transaction() as conn:
+            if self._is_following(conn, follower_id, following_id):
+                return "following"
+            target = conn.execute("SELECT is_public FROM users WHERE id = ?", (following_id,)).fetchone()
+            if target and not target["is_public"]:
+                conn.execute(
+                    "INSERT OR IGNORE INTO follow_requests (requester_id, target_id) VALUES (?, ?)",
+                    (follower_id, following_id),
+                )
+                return "requested"
+            conn.execute(
+                "INSERT INTO follows (follower_id, following_id) VALUES (?, ?)", (follower_id, following_id)
+            )
+            conn.execute(
+                "DELETE FROM follow_requests WHERE requester_id = ? AND target_id = ?", (follower_id, following_id)
+            )
+            return "following"
+
+    def unfollow(self, follower_id: int, following_id: int) -> None:
+        with self._db.transaction() as conn:
+            conn.execute("DELETE FROM follows WHERE follower_id = ? AND following_id = ?", (follower_id, following_id))
+            conn.execute(
+                "DELETE FROM follow_requests WHERE requester_id = ? AND target_id = ?", (follower_id, following_id)
+            )
+
+    @staticmethod
+    def _is_following(conn: sqlite3.Connection, follower_id: int, following_id: int) -> bool:
+        row = conn.execute(
+            "SELECT 1 FROM follows WHERE follower_id = ? AND following_id = ?", (follower_id, following_id)
+        ).fetchone()
+        return row is not None
+
+    def is_following(self, follower_id: int, following_id: int) -> bool:
+        return self._is_following(self._db.connection(), follower_id, following_id)
+
+    def follow_status(self, viewer_id: int, target_id: int) -> str:
+        if self.is_following(viewer_id, target_id):
+            return "following"
+        row = self._db.connection().execute(
+            "SELECT 1 FROM follow_requests WHERE requester_id = ? AND target_id = ?", (viewer_id, target_id)
+        ).fetchone()
+        return "requested" if row else "none"
+
+    def get_pending_follow_requests(self, user_id: int) -> list[dict]:
+        rows = self._db.connection().execute(
+            "SELECT u.* FROM follow_requests r JOIN users u ON u.id = r.requester_id"
+            " WHERE r.target_id = ? ORDER BY r.requester_id",
+            (user_id,),
+        ).fetchall()
+        return [_user(r) for r in rows]
+
+    def pending_requests_count(self, user_id: int) -> int:
+        return self._db.connection().execute(
+            "SELECT COUNT(*) FROM follow_requests WHERE target_id = ?", (user_id,)
+        ).fetchone()[0]
+
+    def approve_follow_request(self, target_id: int, requester_id: int) -> bool:
+        with self._db.transaction() as conn:
+            cur = conn.execute(
+                "DELETE FROM follow_requests WHERE requester_id = ? AND target_id = ?", (requester_id, target_id)
+            )
+            if not cur.rowcount:
+                return False
+            conn.execute(
+                "INSERT OR IGNORE INTO follows (follower_id, following_id) VALUES (?, ?)", (requester_id, target_id)
+            )
+            return True
+
+    def deny_follow_request(self, target_id: int, requester_id: int) -> bool:
+        with self._db.transaction() as conn:
+            cur = conn.execute(
+                "DELETE FROM follow_requests WHERE requester_id = ? AND target_id = ?", (requester_id, target_id)
+            )
+            return bool(cur.rowcount)
+
+    def get_followers(self, user_id: int, limit: int | None = None, cursor: str | None = None) -> list[dict]:
+        return self._users_page(
+            "SELECT u.* FROM follows f JOIN users u ON u.id = f.follower_id"
+            " WHERE f.following_id = ? AND f.follower_id > ? ORDER BY f.follower_id LIMIT ?",
+            user_id, limit, cursor,
+        )
+
+    def get_following(self, user_id: int, limit: int | None = None, cursor: str | None = None) -> list[dict]:
+        return self._users_page(
+            "SELECT u.* FROM follows f JOIN users u ON u.id = f.following_id"
+            " WHERE f.follower_id = ? AND f.following_id > ? ORDER BY f.following_id LIMIT ?",
+            user_id, limit, cursor,
+        )
+
+    def get_follow_suggestions(self, user_id: int, limit: int = 10) -> list[tuple[int, int]]:
+        """Friends-of-friends (user id, mutual follows); see `app/suggestions.py`. Versions
+        are read before the lists they cover, so a stamp is never newer than its data."""
+        conn = self._db.connection()
+
+        def following_of(uid: int) -> list[int]:
+            return [r[0] for r in conn.execute(
+                "SELECT following_id FROM follows WHERE follower_id = ? ORDER BY following_id", (uid,)
+            )]
+
+        versions = dict(conn.execute("SELECT user_id, version FROM follow_versions WHERE user_id = ?", (user_id,)))
+        following = following_of(user_id)
+        versions.update(conn.execute(
+            "SELECT user_id, version FROM follow_versions WHERE user_id IN (SELECT value FROM json_each(?))",
+            (_ids_param(spread(following, MAX_FOLLOWING)),),
+        ))
+        candidates = self._suggestions.candidates(user_id, following, following_of, lambda uid: versions.get(uid, 0))
+        if not candidates:
+            return []
+        ids = _ids_param(uid for uid, _ in candidates)
+        public = {r[0] for r in conn.execute(
+            "SELECT id FROM users WHERE is_public AND id IN (SELECT value FROM json_each(?))", (ids,)
+        )}
+        requested = {r[0] for r in conn.execute(
+            "SELECT target_id FROM follow_requests WHERE requester_id = ?", (user_id,)
+        )}
+        return [(uid, n) for uid, n in candidates if uid in public and uid not in requested][:limit]
+
+    def followers_count(self, user_id: int) -> int:
+        return self._db.connection().execute(
+            "SELECT COUNT(*) FROM follows WHERE following_id = ?", (user_id,)
+        ).fetchone()[0]
+
+    def following_count(self, user_id: int) -> int:
+        return self._db.connection().execute(
+            "SELECT COUNT(*) FROM follows WHERE follower_id = ?", (user_id,)
+        ).fetchone()[0]
+
+
+def _get_or_create_spot(conn: sqlite3.Connection, name: str, category: str = "") -> dict:
+    """Must be called inside a write transaction."""
+    key = name.lower().strip()
+    row = conn.execute("SELECT * FROM spots WHERE name_key = ?", (key,)).fetchone()
+    if row is not None:
+        spot = _spot(row)
+        # Update category if provided and spot doesn't have one yet
+        if category and not spot["category"]:
+            conn.execute("UPDATE spots SET category = ? WHERE id = ?", (category, spot["id"]))
+            spot["category"] = category
+        return spot
+    cur = conn.execute(
+        "INSERT INTO spots (name, name_key, category) VALUES (?, ?, ?)", (name.strip(), key, category)
+    )
+    return {"id": cur.lastrowid, "name": name.strip(), "category": category}
+
+
+class SqliteSpotRepository(SpotRepository):
+    def __init__(self, backend: SqliteBackend):
+        self._backend = backend
+        self._db = backend.db
+
+    def get_or_create_spot(self, name: str, category: str = "") -> dict:
+        with self._db.transaction() as conn:
+            return _get_or_create_spot(conn, name, category)
+
+    def list_spots(self) -> list[dict]:
+        return [_spot(r) for r in self._db.connection().execute("SELECT * FROM spots ORDER BY id")]
+
+    def search_spots(self, query: str, limit: int | None = None) -> list[dict]:
+        """Exact name, then name/word prefix, then substring matches."""
+        q = " ".join(query.lower().split())
+        if not q:
+            return self.list_spots()[:limit]
+        word_prefix = "% " + _like_escape(q) + "%"
+        contains = "%" + _like_escape(q) + "%" if len(q) > 1 else word_prefix
+        rows = self._db.connection().execute(
+            "SELECT * FROM spots WHERE ' ' || name LIKE :contains ESCAPE '\\'"
+            " ORDER BY CASE WHEN name_key = :q THEN 0 WHEN ' ' || name LIKE :word_prefix ESCAPE '\\' THEN 1 ELSE 2 END,"
+            " id LIMIT :limit",
+            {"q": q, "word_prefix": word_prefix, "contains": contains, "limit": limit or -1},
+        ).fetchall()
+        return [_spot(r) for r in rows]
+
+    def get_leaderboard(self, category: str = "", limit: int = 10) -> list[dict]:
+        """Top spots by the trigger-maintained aggregates; an index walk of `limit` rows."""
+        conn = self._db.connection()
+        key = category_key(category)
+        rows = conn.execute(
+            f"SELECT * FROM spot_stats WHERE {'category = ?' if key else '1'} ORDER BY {LEADERBOARD_ORDER} LIMIT ?",
+            (key, limit) if key else (limit,),
+        ).fetchall()
+        if not rows:
+            return []
+        ids = _ids_param(r["spot_id"] for r in rows)
+        spots = {
+            r["id"]: _spot(r)
+            for r in conn.execute("SELECT * FROM spots WHERE id IN (SELECT value FROM json_each(?))", (ids,))
+        }
+        pairwise = self._backend.pairwise()
+        histograms = {r["spot_id"]: [0] * HISTOGRAM_BINS for r in rows}
+        for b in conn.execute(
+            "SELECT spot_id, bin, n FROM spot_score_bins WHERE spot_id IN (SELECT value FROM json_each(?))", (ids,)
+        ):
+            histograms[b["spot_id"]][b["bin"]] = b["n"]
+        return [
+            {
+                **stats_response(
+                    spots[r["spot_id"]], r["count"], r["total"], histograms[r["spot_id"]],
+                    {"bad": r["bad"], "okay": r["okay"], "good": r["good"]},
+                ),
+                "pairwise": pairwise.rating(r["spot_id"]),
+            }
+            for r in rows
+        ]
+
+    def get_recommended_spots(self, user_id: int, limit: int = 10) -> list[dict]:
+        """Precomputed collaborative-filtering picks the user has not ranked since, topped
+        up from the overall leaderboard."""
+        conn = self._db.connection()
+        ranked = {r[0] for r in conn.execute("SELECT spot_id FROM rankings WHERE user_id = ?", (user_id,))}
+        picks = [
+            (spot_id, score)
+            for spot_id, score in self._backend.recommender.recommended(user_id, limit + len(ranked))
+            if spot_id not in ranked
+        ][:limit]
+        if len(picks) < limit:
+            skip = ranked | {spot_id for spot_id, _ in picks}
+            popular = conn.execute(
+                f"SELECT spot_id FROM spot_stats ORDER BY {LEADERBOARD_ORDER} LIMIT ?", (limit + len(skip),)
+            )
+            picks += [(r[0], None) for r in popular if r[0] not in skip][:limit - len(picks)]
+        if not picks:
+            return []
+        spots = {
+            r["id"]: _spot(r)
+            for r in conn.execute(
+                "SELECT * FROM spots WHERE id IN (SELECT value FROM json_each(?))", (_ids_param(s for s, _ in picks),)
+            )
+        }
+        return [recommendation(spots[spot_id], score) for spot_id, score in picks]
+
+    def pairwise_rating(self, spot_id: int) -> dict:
+        return self._backend.pairwise().rating(spot_id)
+
+
+def _ranking_version(conn: sqlite3.Connection, user_id: int) -> int:
+    row = conn.execute("SELECT version FROM ranking_lists WHERE user_id = ?", (user_id,)).fetchone()
+    return row["version"] if row else 0
+
+
+def _bump_ranking_version(conn: sqlite3.Connection, user_id: int) -> int:
+    conn.execute(
+        "INSERT INTO ranking_lists (user_id, version) VALUES (?, 1)"
+        " ON CONFLICT (user_id) DO UPDATE SET version = version + 1",
+        (user_id,),
+    )
+    return _ranking_version(conn, user_id)
+
+
+def _add_spot_event(
+    conn: sqlite3.Connection, user_id: int, spot: dict, score: float, photo_url: str, created_at: str
+) -> None:
+    conn.execute(
+        "INSERT INTO feed_events (user_id, created_at, kind, spot_id, spot, score, tier, photo_url)"
+        " VALUES (?, ?, 'new', ?, ?, ?, ?, ?)",
+        (user_id, created_at, spot["id"], json.dumps(spot), score, score_to_tier(score), photo_url),
+    )
+
+
+def _remove_spot_events(conn: sqlite3.Connection, user_id: int, spot_ids) -> None:
+    """Drop the user's "new" events for these spots. Their likes and comments are kept,
+    as the JSON store keeps them."""
+    if not spot_ids:
+        return
+    conn.execute(
+        "DELETE FROM feed_events WHERE user_id = ? AND kind = 'new' AND spot_id IN (SELECT value FROM json_each(?))",
+        (user_id, _ids_param(spot_ids)),
+    )
+
+
+class SqliteRankingRepository(RankingRepository):
+    def __init__(self, backend: SqliteBackend):
+        self._backend = backend
+        self._db = backend.db
+
+    def set_rankings(self, user_id: int, ranked_items: list[dict]) -> list[dict]:
+        """Replace the user's list; adds a feed event only when a new spot was added."""
+        with self._backend.photo_uploads() as externalize:
+            ranked_items = [{**item, "photo_url": externalize(item.get("photo_url", ""))} for item in ranked_items]
+            with self._db.transaction() as conn:
+                old = conn.execute(
+                    "SELECT s.id, s.name_key FROM rankings r JOIN spots s ON s.id = r.spot_id WHERE r.user_id = ?",
+                    (user_id,),
+                ).fetchall()
+                old_spot_names = {r["name_key"] for r in old}
+                new_spot_names = {item["spot_name"].lower().strip() for item in ranked_items}
+                removed_spot_ids = [r["id"] for r in old if r["name_key"] not in new_spot_names]
+                added_names = new_spot_names - old_spot_names
+
+                conn.execute("DELETE FROM rankings WHERE user_id = ?", (user_id,))
+                now_iso = datetime.now(timezone.utc).isoformat()
+                event_item = None
+                for i, item in enumerate(ranked_items):
+                    spot = _get_or_create_spot(conn, item["spot_name"], item.get("category", ""))
+                    score = item.get("score", 5.0)
+                    conn.execute(
+                        "INSERT INTO rankings (user_id, spot_id, rank, score, tier, notes, photo_url, created_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (user_id, spot["id"], i + 1, score, score_to_tier(score), item.get("notes", ""),
+                         item.get("photo_url", ""), item.get("created_at", now_iso)),
+                    )
+                    if event_item is None and item["spot_name"].lower().strip() in added_names:
+                        event_item = (item, spot)
+
+                # Feed event only for the first newly added spot (not reorder/score-only changes).
+                if event_item is not None:
+                    item, spot = event_item
+                    _add_spot_event(conn, user_id, spot, item.get("score", 5.0), item.get("photo_url", ""), now_iso)
+
+                # Remove "new" events for spots this user no longer ranks.
+                _remove_spot_events(conn, user_id, removed_spot_ids)
+                _bump_ranking_version(conn, user_id)
+        results = self.get_user_rankings(user_id)
+        self._backend.recommender.set_row(user_id, {r["spot_id"]: r["score"] for r in results})
+        return results
+
+    def patch_rankings(self, user_id: int, version: int, ops: list[dict]) -> tuple[int, list[dict]]:
+        """Apply incremental ops in one transaction; ranks stay 1..n with range updates."""
+        with self._backend.photo_uploads() as externalize:
+            ops = [{**op, "photo_url": externalize(op["photo_url"])} if "photo_url" in op else op for op in ops]
+            with self._db.transaction() as conn:
+                current = _ranking_version(conn, user_id)
+                if version != current:
+                    raise RankingVersionConflict(current)
+                rows = conn.execute(
+                    "SELECT r.id, s.name_key FROM rankings r JOIN spots s ON s.id = r.spot_id"
+                    " WHERE r.user_id = ? ORDER BY r.rank",
+                    (user_id,),
+                ).fetchall()
+                check_ops({r["id"]: r["name_key"] for r in rows}, ops)
+                new_version = current
+                if ops:
+                    new_version = self._apply_ops(conn, user_id, len(rows), ops)
+        results = self.get_user_rankings(user_id)
+        if ops:
+            self._backend.recommender.set_row(user_id, {r["spot_id"]: r["score"] for r in results})
+        return new_version, results
+
+    @staticmethod
+    def _apply_ops(conn: sqlite3.Connection, user_id: int, length: int, ops: list[dict]) -> int:
+        def take_out(rid: int) -> int:
+            """Close the gap the ranking leaves; returns its spot id."""
+            rank, spot_id = conn.execute("SELECT rank, spot_id FROM rankings WHERE id = ?", (rid,)).fetchone()
+            conn.execute("UPDATE rankings SET rank = rank - 1 WHERE user_id = ? AND rank > ?", (user_id, rank))
+            return spot_id
+
+        def make_room(position: int) -> int:
+            conn.execute("UPDATE rankings SET rank = rank + 1 WHERE user_id = ? AND rank > ?", (user_id, position))
+            return position + 1
+
+        now_iso = datetime.now(timezone.utc).isoformat()
+        inserted: list[tuple[dict, float, str]] = []  # (spot, score, photo_url)
+        removed_spot_ids: set[int] = set()
+        for op in ops:
+            kind = op["op"]
+            if kind == "insert":
+                spot = _get_or_create_spot(conn, op["spot_name"], op.get("category", ""))
+                rank = make_room(clamp_position(op.get("position"), length))
+                score = op.get("score", 5.0)
+                conn.execute(
+                    "INSERT INTO rankings (user_id, spot_id, rank, score, tier, notes, photo_url, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (user_id, spot["id"], rank, score, score_to_tier(score), op.get("notes", ""),
+                     op.get("photo_url", ""), now_iso),
+                )
+                length += 1
+                inserted.append((spot, score, op.get("photo_url", "")))
+            elif kind == "remove":
+                removed_spot_ids.add(take_out(op["ranking_id"]))
+                conn.execute("DELETE FROM rankings WHERE id = ?", (op["ranking_id"],))
+                length -= 1
+            elif kind == "move":
+                take_out(op["ranking_id"])
+                rank = make_room(clamp_position(op["position"], length - 1))
+                conn.execute("UPDATE rankings SET rank = ? WHERE id = ?", (rank, op["ranking_id"]))
+            else:
+                changes = {field: op[field] for field in UPDATE_FIELDS if field in op}
+                if "score" in changes:
+                    changes["tier"] = score_to_tier(changes["score"])
+                conn.execute(
+                    f"UPDATE rankings SET {', '.join(f'{field} = ?' for field in changes)} WHERE id = ?",
+                    (*changes.values(), op["ranking_id"]),
+                )
+
+        # A spot removed and added back in the same patch keeps its events.
+        readded = {spot["id"] for spot, _, _ in inserted} & removed_spot_ids
+        for spot, score, photo_url in inserted:
+            if spot["id"] not in readded:
+                _add_spot_event(conn, user_id, spot, score, photo_url, now_iso)
+                break
+        _remove_spot_events(conn, user_id, removed_spot_ids - readded)
+        return _bump_ranking_version(conn, user_id)
+
+    def ranking_version(self, user_id: int) -> int:
+        return _ranking_version(self._db.connection(), user_id)
+
+    def get_user_rankings(self, user_id: int) -> list[dict]:
+        rows = self._db.connection().execute(
+            "SELECT r.*, s.name AS spot_name, s.category AS spot_category FROM rankings r"
+            " JOIN spots s ON s.id = r.spot_id WHERE r.user_id = ? ORDER BY r.rank",
+            (user_id,),
+        ).fetchall()
+        pairwise = self._backend.pairwise()
+        results = []
+        for r in rows:
+            out = {k: r[k] for k in ("id", "user_id", "spot_id", "rank", "score", "tier", "notes", "photo_url",
+                                     "created_at")}
+            out["spot"] = {"id": r["spot_id"], "name": r["spot_name"], "category": r["spot_category"]}
+            out["photo_variants"] = variant_urls(r["photo_url"])
+            out["rating"] = score_to_rating(r["score"])
+            out["pairwise"] = pairwise.rating(r["spot_id"], user_id)
+            results.append(out)
+        # Requirement: profile ranked list ordered by score (desc).
+        results.sort(key=lambda x: x["score"], reverse=True)
+        for i, item in enumerate(results, start=1):
+            item["rank"] = i
+        return results
+
+    def ranked_count(self, user_id: int) -> int:
+        return self._db.connection().execute(
+            "SELECT COUNT(*) FROM rankings WHERE user_id = ?", (user_id,)
+        ).fetchone()[0]
+
+    def _items(self, conn: sqlite3.Connection, events: list[sqlite3.Row], viewer_id: int | None) -> list[dict]:
+        """Feed events in API shape; like/comment data is fetched for the whole page at once."""
+        if not events:
+            return []
+        ids = _ids_param(e["id"] for e in events)
+        authors = _ids_param({e["user_id"] for e in events})
+        users = {
+            r["id"]: _user(r)
+            for r in conn.execute("SELECT * FROM users WHERE id IN (SELECT value FROM json_each(?))", (authors,))
+        }
+        likes = dict(conn.execute(
+            "SELECT feed_event_id, COUNT(*) FROM likes WHERE feed_event_id IN (SELECT value FROM json_each(?))"
+            " GROUP BY feed_event_id",
+            (ids,),
+        ).fetchall())
+        liked = {
+            r[0] for r in conn.execute(
+                "SELECT feed_event_id FROM likes WHERE user_id = ?"
+                " AND feed_event_id IN (SELECT value FROM json_each(?))",
+                (viewer_id, ids),
+            )
+        } if viewer_id else set()
+        counts = dict(conn.execute(
+            "SELECT feed_event_id, COUNT(*) FROM comments WHERE feed_event_id IN (SELECT value FROM json_each(?))"
+            " GROUP BY feed_event_id",
+            (ids,),
+        ).fetchall())
+        recent: dict[int, list[dict]] = {}
+        for c in conn.execute(
+            f"""
+            SELECT * FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY feed_event_id ORDER BY id DESC) AS n FROM (
+                    {_COMMENT_SELECT} WHERE c.feed_event_id IN (SELECT value FROM json_each(?))
+                )
+            ) WHERE n <= 3 ORDER BY feed_event_id, id
+            """,
+            (ids,),
+        ):
+            recent.setdefault(c["feed_event_id"], []).append(_comment(c))
+        out = []
+        for e in events:
+            event_id = e["id"]
+            out.append({
+                "id": event_id,
+                "user": _user_summary(users.get(e["user_id"])),
+                "spot": json.loads(e["spot"]),
+                "rank": 1,
+                "score": e["score"],
+                "tier": e["tier"],
+                "notes": "",
+                "photo_url": e["photo_url"],
+                "photo_variants": variant_urls(e["photo_url"]),
+                "created_at": e["created_at"],
+                "kind": e["kind"],
+                "likes_count": likes.get(event_id, 0),
+                "is_liked": event_id in liked,
+                "comments_count": counts.get(event_id, 0),
+                "comments": recent.get(event_id, []),
+            })
+        return out
+
+    def get_feed(self, user_id: int, limit: int = 20, cursor: str | None = None) -> list[dict]:
+        conn = self._db.connection()
+        return self._items(conn, self._feed_page(conn, _EVENT_COLUMNS, user_id, limit, cursor), viewer_id=user_id)
+
+    def get_feed_page(self, user_id: int, limit: int = 20, cursor: str | None = None) -> list[dict]:
+        rows = self._feed_page(self._db.connection(), "e.id, e.user_id, e.created_at", user_id, limit, cursor)
+        return [dict(r) for r in rows]
+
+    def get_feed_items(self, event_ids: list[int], viewer_id: int | None = None) -> list[dict]:
+        conn = self._db.connection()
+        rows = {
+            r["id"]: r for r in conn.execute(
+                f"SELECT {_EVENT_COLUMNS} FROM feed_events e WHERE e.id IN (SELECT value FROM json_each(?))",
+                (_ids_param(event_ids),),
+            )
+        }
+        return self._items(conn, [rows[eid] for eid in event_ids if eid in rows], viewer_id=viewer_id)
+
+    @staticmethod
+    def _feed_page(conn: sqlite3.Connection, columns: str, user_id: int, limit: int, cursor: str | None):
+        key = decode_cursor(cursor, 2)
+        return conn.execute(
+            f"""
+            SELECT {columns} FROM follows f JOIN feed_events e ON e.user_id = f.following_id
+            WHERE f.follower_id = :user AND e.user_id != :user AND e.kind = 'new' AND e.id < :before
+            ORDER BY e.id DESC LIMIT :limit
+            """,
+            {"user": user_id, "before": key[1] if key else 2**63 - 1, "limit": limit},
+        ).fetchall()
+
+    def get_recent_rankings(
+        self, limit: int = 20, viewer_id: int | None = None, cursor: str | None = None
+    ) -> list[dict]:
+        key = decode_cursor(cursor, 2)
+        conn = self._db.connection()
+        rows = conn.execute(
+            f"""
+            SELECT {_EVENT_COLUMNS} FROM feed_events e JOIN users u ON u.id = e.user_id
+            WHERE e.kind = 'new' AND e.id < :before AND (
+                u.is_public OR e.user_id = :viewer
+                OR EXISTS (SELECT 1 FROM follows WHERE follower_id = :viewer AND following_id = e.user_id)
+            )
+            ORDER BY e.id DESC LIMIT :limit
+            """,
+            {"viewer": viewer_id, "before": key[1] if key else 2**63 - 1, "limit": limit},
+        ).fetchall()
+        return self._items(conn, rows, viewer_id=viewer_id)
+
+    def get_matchup(self, user_id: int) -> dict | None:
+        """The most informative pair of the user's ranked spots (see `app/matchups.py`),
+        or random spots until they ranked two. The pool is built from the user's own
+        rankings, so this reads O(their list) rows rather than every spot."""
+        conn = self._db.connection()
+        pairwise = self._backend.pairwise()
+        pool = MatchupPool()
+        for r in conn.execute("SELECT spot_id, score FROM rankings WHERE user_id = ?", (user_id,)):
+            pool.put(r["spot_id"], *standing(pairwise, user_id, r["spot_id"], r["score"]))
+        recent = {
+            frozenset((r["winner_id"], r["loser_id"]))
+            for r in conn.execute(
+                "SELECT winner_id, loser_id FROM comparisons WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+                (user_id, RECENT_PAIRS),
+            )
+        }
+        pair = pool.pick(recent)
+        if pair is None:
+            row = conn.execute("SELECT COUNT(*), MAX(id) FROM spots").fetchone()
+            if row[0] < 2:
+                return None
+            # Spot ids are handed out in order and never deleted, so a random id is
+            # almost always a spot.
+            pair = pool.spot_ids()[:1]
+            while len(pair) < 2:
+                spot_id = random.randint(1, row[1])
+                if spot_id not in pair and conn.execute("SELECT 1 FROM spots WHERE id = ?", (spot_id,)).fetchone():
+                    pair.append(spot_id)
+        spots = {r["id"]: _spot(r) for r in conn.execute("SELECT * FROM spots WHERE id IN (?, ?)", pair)}
+        return {"spot_a": spots[pair[0]], "spot_b": spots[pair[1]]}
+
+    def record_pairwise_result(self, user_id: int, winner_spot_name: str, loser_spot_name: str) -> dict:
+        with self._db.transaction() as conn:
+            winner = _get_or_create_spot(conn, winner_spot_name)
+            loser = _get_or_create_spot(conn, loser_spot_name)
+            now = datetime.now(timezone.utc)
+            conn.execute(
+                "INSERT INTO comparisons (user_id, winner_id, loser_id, created_at) VALUES (?, ?, ?, ?)",
+                (user_id, winner["id"], loser["id"], now.timestamp()),
+            )
+            conn.execute(
+                "INSERT INTO feed_events (user_id, created_at, kind, spot_id, spot, score, tier, meta)"
+                " VALUES (?, ?, 'compare', ?, ?, 0.0, '—', ?)",
+                (user_id, now.isoformat(), winner["id"], json.dumps(winner),
+                 json.dumps({"loser": {"id": loser["id"], "name": loser["name"]}})),
+            )
+        self._backend.pairwise()  # apply it now rather than on the next read
+        return {"winner": winner, "loser": loser}
+
+    def toggle_like(self, feed_event_id: int, user_id: int) -> bool:
+        with self._db.transaction() as conn:
+            cur = conn.execute(
+                "DELETE FROM likes WHERE feed_event_id = ? AND user_id = ?", (feed_event_id, user_id)
+            )
+            if cur.rowcount:
+                return False
+            conn.execute("INSERT INTO likes (feed_event_id, user_id) VALUES (?, ?)", (feed_event_id, user_id))
+            return True
+
+    def unlike(self, feed_event_id: int, user_id: int) -> None:
+        with self._db.transaction() as conn:
+            conn.execute("DELETE FROM likes WHERE feed_event_id = ? AND user_id = ?", (feed_event_id, user_id))
+
+    def add_comment(self, feed_event_id: int, user_id: int, text: str) -> dict:
+        with self._db.transaction() as conn:
+            cur = conn.execute(
+                "INSERT INTO comments (feed_event_id, user_id, text, created_at) VALUES (?, ?, ?, ?)",
+                (feed_event_id, user_id, text, datetime.now(timezone.utc).isoformat()),
+            )
+            return _comment(conn.execute(f"{_COMMENT_SELECT} WHERE c.id = ?", (cur.lastrowid,)).fetchone())
+
+    def get_comments(
+        self, feed_event_id: int, limit: int | None = None, cursor: str | None = None
+    ) -> list[dict]:
+        key = decode_cursor(cursor, 2)
+        rows = self._db.connection().execute(
+            f"{_COMMENT_SELECT} WHERE c.feed_event_id = ? AND c.id > ? ORDER BY c.id LIMIT ?",
+            (feed_event_id, key[1] if key else 0, limit or -1),
+        ).fetchall()
+        return [_comment(c) for c in rows]
+
+
+class SqliteBlobRepository(BlobRepository):
+    def __init__(self, backend: SqliteBackend):
+        self._backend = backend
+
+    def get_blob(self, digest: str) -> tuple[bytes, str] | None:
+        return self._backend.blobs.get(digest)
+
+    def get_blob_variant(self, digest: str, variant: str) -> tuple[bytes, str] | None:
+        return self._backend.images.get(digest, variant)
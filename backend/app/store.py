@@ -1,100 +1,647 @@
 """Filesystem-backed store with in-memory cache."""
 
+import atexit
+import bisect
+import functools
+import heapq
 import json
 import os
 import random
 import secrets
-import stat
 import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-
-import bcrypt
-from cryptography.fernet import Fernet, InvalidToken
+from typing import Iterator
+
+from cryptography.fernet import InvalidToken
+
+from app import blobs, tiers
+from app.blobs import BlobStore
+from app.images import ImagePipeline, variant_urls
+from app.keys import load_fernet
+from app.locks import LOCK_ORDER, FileLock, StoreLocks
+from app.matchups import MatchupScheduler
+from app.metrics import STORE_IO
+from app.pagination import decode_cursor
+from app.pairwise import PairwiseRatings
+from app.ranking_ops import UPDATE_FIELDS, RankingVersionConflict, check_ops, clamp_position
+from app.passwords import HasherBusy, PasswordHasher
+from app.recommendations import Recommender, recommendation
+from app.search import SearchIndex
+from app.sessions import Session, SessionTable, parse_session
+from app.spot_stats import SpotStats, stats_response
+from app.suggestions import FollowSuggestions
+from app.timelines import Timelines
+from app.versions import PAIRWISE, PROFILES, SPOTS, EntityVersions
+from app.wal import WalTail, WriteAheadLog
+
+# strict: every commit is fsynced by the calling thread before it returns (the default).
+# group: a background flusher batches commits; callers wait for their batch's fsync.
+# relaxed: the flusher batches commits without fsync; callers never wait.
+DURABILITY_MODES = ("strict", "group", "relaxed")
+
+
+def _durable(method):
+    """Mark a mutating Store method: in `group` mode, block until its WAL record is fsynced.
+
+    In `strict` mode the record is written and fsynced here. Either way this happens after
+    the method has returned, i.e. outside the collection locks, so readers are not held up
+    by disk I/O and other writers keep committing into the same batch meanwhile. Expired
+    sessions are swept first, so their removal shares that commit.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._sweep_sessions()
+        self._await_commit()
+        return result
+
+    return wrapper
 
 
 class Store:
-    def __init__(self):
-        self._lock = threading.RLock()
-        self._data_dir = Path(os.getenv("STELI_DATA_DIR", Path(__file__).resolve().parents[1] / "data"))
+    # Multi-worker mode: how long a blob written (or re-put) by any worker is safe from
+    # garbage collection, i.e. how long an upload may wait for the write lock.
+    _BLOB_MIN_AGE_SECONDS = 600
+
+    def __init__(self, data_dir: Path | None = None):
+        # One reader/writer lock per collection, always taken in `LOCK_ORDER`. Hot read
+        # paths take none: they rely on single dict/list operations being atomic under
+        # the GIL and on the feed and comment indexes being replaced (copy-on-write)
+        # rather than edited in place.
+        self._locks = StoreLocks()
+        self._data_dir = data_dir or Path(os.getenv("STELI_DATA_DIR", Path(__file__).resolve().parents[1] / "data"))
         self._data_file = self._data_dir / "store.json"
         self._schema_version = 1
         self._session_ttl_seconds = int(os.getenv("STELI_SESSION_TTL_SECONDS", str(60 * 60 * 24)))
-        self._fernet = self._init_encryption()
+        self._fernet = load_fernet(self._data_dir)
         self.users: dict[int, dict] = {}
         self.usernames: dict[str, int] = {}  # lowercase username -> user id
-        # token -> {"user_id": int, "expires_at": iso-string}
-        self.tokens: dict[str, dict] = {}
+        self.sessions = SessionTable()  # token -> Session(user_id, expires_at epoch)
         self.follows: set[tuple[int, int]] = set()  # (follower_id, following_id)
         self.follow_requests: set[tuple[int, int]] = set()  # (requester_id, target_id)
+        # Adjacency indexes over `follows` / `follow_requests` (derived, rebuilt on load).
+        # Each value is a sorted list of user ids so lists can be paged by id.
+        self._following: dict[int, list[int]] = {}  # follower_id -> [following_id]
+        self._followers: dict[int, list[int]] = {}  # following_id -> [follower_id]
+        self._requests_sent: dict[int, list[int]] = {}  # requester_id -> [target_id]
+        self._requests_received: dict[int, list[int]] = {}  # target_id -> [requester_id]
+        # Cached friends-of-friends candidates, checked against per-user follow versions.
+        self.follow_suggestions = FollowSuggestions(max_users=int(os.getenv("STELI_SUGGESTION_CACHE_USERS", "10000")))
         self.spots: dict[int, dict] = {}
         self.spot_names: dict[str, int] = {}  # lowercase name -> spot id
+        # Autocomplete indexes over user names and spot names (derived, rebuilt on load).
+        self._user_search = SearchIndex()
+        self._spot_search = SearchIndex()
         self.rankings: dict[int, dict] = {}
         self.user_rankings: dict[int, list[int]] = {}  # user_id -> [ranking_ids in rank order]
+        self.ranking_versions: dict[int, int] = {}  # user_id -> bumped on every change to their list
+        # Per-spot aggregates and leaderboards over all rankings (derived, rebuilt on load).
+        self.spot_stats = SpotStats()
+        # Every /compare outcome and the Elo / Bradley-Terry ratings derived from it.
+        self.pairwise = PairwiseRatings(refit_every=int(os.getenv("STELI_PAIRWISE_REFIT_EVERY", "200")))
+        # Each user's ranked spots ordered for picking matchups (derived, rebuilt on load).
+        self.matchups = MatchupScheduler(self.pairwise)
+        # Collaborative-filtering suggestions over everyone's scores (derived, rebuilt on load).
+        self.recommender = Recommender(refit_every=int(os.getenv("STELI_RECOMMENDER_REFIT_EVERY", "500")))
         self.feed_events: list[dict] = []  # one entry per ranking action (new or reranked)
+        # Derived from `feed_events` (rebuilt on load); only mutate through the feed helpers.
+        self._feed_event_index: dict[int, dict] = {}  # event id -> event
+        self._author_events: dict[int, tuple[int, ...]] = {}  # user_id -> ids of their "new" events, oldest first
+        self._public_events: tuple[int, ...] = ()  # ids of "new" events by public authors, oldest first
+        self.timelines = Timelines(
+            max_len=int(os.getenv("STELI_TIMELINE_LENGTH", "200")),
+            fanout_limit=int(os.getenv("STELI_FANOUT_MAX_FOLLOWERS", "1000")),
+        )
         self.likes: dict[int, set[int]] = {}  # feed_event_id -> set of user_ids
         self.comments: list[dict] = []
+        # feed_event_id -> that event's comments, oldest first (derived from `comments`).
+        self._comments_by_event: dict[int, tuple[dict, ...]] = {}
+        # Counters behind the read endpoints' ETags, bumped as ops are journaled or applied.
+        self.versions = EntityVersions()
         self._next_user_id = 1
         self._next_spot_id = 1
         self._next_ranking_id = 1
         self._next_feed_event_id = 1
         self._next_comment_id = 1
-        self._load()
-
-    def _init_encryption(self) -> Fernet:
-        """Load or generate a Fernet key for encrypting the data file at rest."""
-        self._data_dir.mkdir(parents=True, exist_ok=True)
-        key_file = self._data_dir / ".store.key"
-        if key_file.exists():
-            key = key_file.read_bytes().strip()
+        # Every mutation is journaled as an op; `_persist()` appends the pending ops as
+        # one WAL record and the full snapshot is only rewritten at checkpoints.
+        self._wal = WriteAheadLog(self._data_dir / "store.wal", self._fernet)
+        self._wal_seq = 0  # seq of the last record reflected in memory
+        self._pending = threading.local()  # ops journaled by this thread's current write
+        self._checkpoint_every = int(os.getenv("STELI_WAL_CHECKPOINT_RECORDS", "1000"))
+        # Multi-worker mode: several processes share this data dir. Writers take a file
+        # lock, apply the records other workers appended to the WAL since they last
+        # looked, and append their own before letting go; `sync()` catches readers up.
+        # Records are written through (no flusher) so the next writer sees them.
+        self.multi_worker = os.getenv("STELI_MULTI_WORKER", "").lower() in ("1", "true", "yes")
+        self._file_lock = FileLock(self._data_dir / "store.lock") if self.multi_worker else None
+        self._tail = WalTail(self._data_dir / "store.wal", self._fernet) if self.multi_worker else None
+        self._tail_lock = threading.Lock()
+        self._needs_reload = False  # the tail skipped records; see `_catch_up()`
+        self._durability = os.getenv("STELI_DURABILITY", "strict")
+        if self._durability not in DURABILITY_MODES:
+            raise ValueError(f"STELI_DURABILITY must be one of {DURABILITY_MODES}, got {self._durability!r}")
+        self._flush_interval = int(os.getenv("STELI_FLUSH_INTERVAL_MS", "10")) / 1000
+        self._flush_max_records = int(os.getenv("STELI_FLUSH_MAX_RECORDS", "256"))
+        # Lock order: `_file_lock` -> `_tail_lock` -> collection locks -> `_blob_lock` -> `_commit_lock`
+        # -> `_io_lock` -> `_flush_cond`.
+        self._commit_lock = threading.Lock()  # hands out WAL seqs; records queue in seq order
+        self._io_lock = threading.Lock()  # serializes WAL/snapshot file writes
+        self._flush_cond = threading.Condition()
+        self._flush_queue: list[tuple[int, bytes]] = []  # (seq, serialized record) not yet written
+        self._durable_seq = 0  # highest seq known to be on disk
+        self._flush_error: Exception | None = None
+        self._commit_ticket = threading.local()  # seq this thread last committed
+        self._flusher: threading.Thread | None = None
+        self._closing = False
+        # Photos arrive as data URLs; their bytes live in the blob store and records keep
+        # only the short blob URL. Refcounts are derived state, rebuilt on load.
+        self.blobs = BlobStore(
+            self._data_dir / "blobs", self._fernet, min_age=self._BLOB_MIN_AGE_SECONDS if self.multi_worker else 0
+        )
+        self.images = ImagePipeline(self.blobs)
+        self._blob_refs: dict[str, int] = {}  # digest -> number of records referencing it
+        self._blob_garbage: set[str] = set()  # digests whose refcount dropped to zero
+        self._blob_lock = threading.Lock()  # guards the two above; any collection may retain/release
+        # bcrypt runs on its own bounded pool and never under a store lock.
+        self.passwords = PasswordHasher()
+        if self._file_lock is None:
+            self._load()
         else:
-            key = Fernet.generate_key()
-            key_file.write_bytes(key + b"\n")
-            key_file.chmod(stat.S_IRUSR | stat.S_IWUSR)  # 0600
-        return Fernet(key)
+            with self._file_lock:
+                self._load()
+                self._tail.open(at_end=True)
+        if self._durability != "strict" and not self.multi_worker:
+            self._flusher = threading.Thread(target=self._flush_loop, name="steli-store-flusher", daemon=True)
+            self._flusher.start()
+            atexit.register(self.close)
+
+    def _next_ids(self) -> dict:
+        return {
+            "user": self._next_user_id,
+            "spot": self._next_spot_id,
+            "ranking": self._next_ranking_id,
+            "feed_event": self._next_feed_event_id,
+            "comment": self._next_comment_id,
+        }
 
     def _snapshot(self) -> dict:
         return {
             "schema_version": self._schema_version,
+            "wal_seq": self._wal_seq,
             "users": self.users,
             "usernames": self.usernames,
-            "tokens": self.tokens,
+            "tokens": {token: list(session) for token, session in self.sessions.items()},
             "follows": [list(pair) for pair in sorted(self.follows)],
             "follow_requests": [list(pair) for pair in sorted(self.follow_requests)],
             "spots": self.spots,
             "spot_names": self.spot_names,
             "rankings": self.rankings,
             "user_rankings": self.user_rankings,
+            "ranking_versions": self.ranking_versions,
+            "comparisons": self.pairwise.columns(),
             "feed_events": self.feed_events,
             "likes": {str(k): sorted(v) for k, v in self.likes.items()},
             "comments": self.comments,
-            "next_ids": {
-                "user": self._next_user_id,
-                "spot": self._next_spot_id,
-                "ranking": self._next_ranking_id,
-                "feed_event": self._next_feed_event_id,
-                "comment": self._next_comment_id,
-            },
+            "next_ids": self._next_ids(),
         }
 
+    # ── Persistence (write-ahead log + checkpoints) ────────────────
+
+    def _journal(self, *op):
+        """Queue one mutation for this thread's next WAL record. Must be called with the
+        write lock of the collection it changes held.
+
+        Ops: ("put"|"del"|"patch", collection, key[, value]) on dict collections,
+        ("add"|"discard", "follows"|"follow_requests", [a, b]),
+        ("add"|"discard", "likes", event_id, user_id),
+        ("append"|"trim"|"remove", "feed_events"|"comments", ...),
+        ("append", "comparisons", [user_id, winner_id, loser_id, epoch]).
+        """
+        ops = getattr(self._pending, "ops", None)
+        if ops is None:
+            ops = self._pending.ops = []
+        ops.append(list(op))
+        self._bump_versions(op)
+
     def _persist(self):
-        self._data_dir.mkdir(parents=True, exist_ok=True)
-        plaintext = json.dumps(self._snapshot(), ensure_ascii=True, separators=(",", ":"))
-        ciphertext = self._fernet.encrypt(plaintext.encode("utf-8"))
-        tmp_path = self._data_file.with_suffix(".tmp")
-        with tmp_path.open("wb") as f:
-            f.write(ciphertext)
-            f.flush()
-            os.fsync(f.fileno())
-        tmp_path.replace(self._data_file)
+        """Commit the mutations this thread journaled since its last call as one WAL record.
+
+        The record is only queued here (with the caller's collection locks still held, so
+        records touching the same collection queue in the order they were applied). It is
+        written by `_await_commit()` in `strict` mode and by the background flusher otherwise.
+        """
+        ops = getattr(self._pending, "ops", None)
+        if not ops:
+            return
+        self._pending.ops = []
+        with self._commit_lock:
+            self._wal_seq += 1
+            seq = self._wal_seq
+            record = {"seq": seq, "ops": ops, "next_ids": self._next_ids()}
+            # Serialize before the caller releases its locks: the op values are live store dicts.
+            started = time.perf_counter()
+            payload = json.dumps(record, ensure_ascii=True, separators=(",", ":")).encode("utf-8")
+            STORE_IO.observe(time.perf_counter() - started, "wal_serialize")
+            with self._flush_cond:
+                self._flush_queue.append((seq, payload))
+                if self._flusher is not None and (
+                    len(self._flush_queue) == 1 or len(self._flush_queue) >= self._flush_max_records
+                ):
+                    self._flush_cond.notify_all()
+        self._commit_ticket.seq = seq
+
+    def _await_commit(self):
+        seq = getattr(self._commit_ticket, "seq", 0)
+        if not seq:
+            return
+        self._commit_ticket.seq = 0
+        if self._flusher is None:
+            self._write_through(seq)
+            return
+        if self._durability != "group":
+            return
+        with self._flush_cond:
+            while self._durable_seq < seq and self._flush_error is None:
+                self._flush_cond.wait()
+            if self._durable_seq < seq:
+                raise RuntimeError("Store flusher failed; write may not be durable") from self._flush_error
+
+    def _write_through(self, seq: int):
+        """`strict` (and multi-worker) mode: append and fsync every queued record up to (at
+        least) `seq`. Only `relaxed` durability skips the fsync.
+
+        Writers that finish while another one is fsyncing find their record already
+        written when they get the I/O lock, so concurrent commits share an fsync.
+        """
+        with self._io_lock:
+            with self._flush_cond:
+                if self._durable_seq >= seq:
+                    return
+                batch, self._flush_queue = self._flush_queue, []
+            if batch:
+                self._wal.append([payload for _, payload in batch], fsync=self._durability != "relaxed")
+                with self._flush_cond:
+                    self._durable_seq = max(self._durable_seq, batch[-1][0])
+        if self._wal.records >= self._checkpoint_every:
+            self._checkpoint()
+
+    @contextmanager
+    def _writing(self, *names: str, read: tuple[str, ...] = ()):
+        """Write locks on `names` (and read locks on `read`) for one mutation. In multi-worker
+        mode the file lock is held around them; see `_shared_write()`."""
+        with self._shared_write(), self._locks.hold(read=read, write=names):
+            yield
+
+    @contextmanager
+    def _shared_write(self):
+        """Multi-worker mode: hold the cross-process write lock, applying other workers'
+        records first and appending this worker's before releasing it. A no-op otherwise."""
+        if self._file_lock is None:
+            yield
+            return
+        outermost = self._file_lock.acquire()
+        try:
+            if outermost and not self._catch_up():
+                self._reload()
+            yield
+            if outermost:
+                self._write_through(self._wal_seq)
+        finally:
+            self._file_lock.release()
+
+    def sync(self):
+        """Multi-worker mode: apply the records other workers have appended since the last
+        look. Costs one stat() when nothing changed; a no-op in single-process mode."""
+        if self._tail is None or not self._tail.changed():
+            return
+        if not self._catch_up():
+            with self._shared_write():
+                pass  # reloads under the file lock
+
+    def _catch_up(self) -> bool:
+        """Apply new WAL records from other workers. Returns False if some are missing (the
+        log was swapped more than once since the last look): then only `_reload()` helps."""
+        with self._tail_lock:
+            if self._needs_reload:
+                return False
+            try:
+                records, swapped = self._tail.read()
+            except (InvalidToken, ValueError):
+                self._needs_reload = True
+                return False
+            if swapped:
+                self._wal.records = 0
+            if all(r["seq"] <= self._wal_seq for r in records):
+                return True
+            with self._locks.write(*LOCK_ORDER):
+                for record in records:
+                    if record["seq"] <= self._wal_seq:
+                        continue
+                    if record.get("checkpoint") or record["seq"] != self._wal_seq + 1:
+                        # The records in between are only in the snapshot now. The ones
+                        # read past this point are gone from the tail too, so reload.
+                        self._needs_reload = True
+                        return False
+                    for op in record["ops"]:
+                        self._apply_op(op)
+                        self._bump_versions(op)
+                    self._restore_next_ids(record["next_ids"])
+                    self._wal_seq = record["seq"]
+                    self._wal.records += 1
+            with self._flush_cond:
+                self._durable_seq = max(self._durable_seq, self._wal_seq)
+            return True
+
+    def _reload(self):
+        """Multi-worker mode: rebuild all state from the snapshot and log. File lock held."""
+        with self._tail_lock, self._locks.write(*LOCK_ORDER):
+            if self._data_file.exists():
+                self._load_snapshot()
+            self._replay_wal()
+            self._rebuild_blob_refs()
+            self._rebuild_ranking_indexes()
+            self.pairwise.fit()
+            self.versions.clear()
+            self._tail.open(at_end=True)
+            self._needs_reload = False
+            with self._flush_cond:
+                self._durable_seq = max(self._durable_seq, self._wal_seq)
+
+    def _flush_loop(self):
+        """Background flusher: write queued records every flush interval or max-records batch."""
+        try:
+            while True:
+                with self._flush_cond:
+                    while not self._flush_queue and not self._closing:
+                        self._flush_cond.wait()
+                    if not self._flush_queue:
+                        return
+                    if len(self._flush_queue) < self._flush_max_records and not self._closing:
+                        self._flush_cond.wait(self._flush_interval)
+                    batch, self._flush_queue = self._flush_queue, []
+                if not batch:
+                    continue  # a checkpoint absorbed everything queued
+                with self._io_lock:
+                    self._wal.append([payload for _, payload in batch], fsync=self._durability == "group")
+                with self._flush_cond:
+                    self._durable_seq = max(self._durable_seq, batch[-1][0])
+                    self._flush_cond.notify_all()
+                if self._wal.records >= self._checkpoint_every:
+                    self._checkpoint()
+        except Exception as exc:
+            with self._flush_cond:
+                self._flush_error = exc
+                self._flush_cond.notify_all()
+            raise
+
+    def close(self):
+        """Drain the flusher (if any) and fsync the WAL. Safe to call more than once."""
+        flusher = self._flusher
+        if flusher is not None:
+            with self._flush_cond:
+                self._closing = True
+                self._flush_cond.notify_all()
+            flusher.join()
+            self._flusher = None
+        with self._shared_write(), self._io_lock:
+            with self._flush_cond:
+                batch, self._flush_queue = self._flush_queue, []
+            if batch:  # committed by a write that raised before `_await_commit()`
+                self._wal.append([payload for _, payload in batch], fsync=False)
+            self._wal.sync()
+            self._wal.close()
+        if self._tail is not None:
+            self._tail.close()
+            self._file_lock.close()
+        self.images.shutdown()
+        self.passwords.shutdown()
+        self.pairwise.shutdown()
+        self.recommender.shutdown()
+
+    def _checkpoint(self):
+        """Rewrite the full encrypted snapshot and truncate the WAL it now covers.
+
+        Holds every collection for reading while the snapshot is serialized, so it sees
+        no write half-applied; must not be called with any collection lock held.
+        """
+        with self._locks.read(*LOCK_ORDER), self._blob_lock, self._commit_lock:
+            self._data_dir.mkdir(parents=True, exist_ok=True)
+            with STORE_IO.time("snapshot_serialize"):
+                plaintext = json.dumps(self._snapshot(), ensure_ascii=True, separators=(",", ":"))
+            seq = self._wal_seq
+            garbage = {d for d in self._blob_garbage if d not in self._blob_refs}
+            self._blob_garbage -= garbage
+            # Take the I/O lock before letting writers back in so that no record newer
+            # than this snapshot can be appended and then lost to the reset below.
+            self._io_lock.acquire()
+        try:
+            with self._flush_cond:
+                self._flush_queue = [(q, p) for q, p in self._flush_queue if q > seq]
+            with STORE_IO.time("snapshot_encrypt"):
+                ciphertext = self._fernet.encrypt(plaintext.encode("utf-8"))
+            tmp_path = self._data_file.with_suffix(".tmp")
+            with tmp_path.open("wb") as f:
+                with STORE_IO.time("snapshot_write"):
+                    f.write(ciphertext)
+                    f.flush()
+                with STORE_IO.time("snapshot_fsync"):
+                    os.fsync(f.fileno())
+            tmp_path.replace(self._data_file)
+            # Records at or below the snapshot's wal_seq are skipped on replay, so a crash
+            # between the replace above and this reset cannot double-apply anything. The
+            # new log opens with an empty marker record at the snapshot's seq: a worker
+            # tailing the log that has not reached that seq knows it missed records.
+            marker = {"seq": seq, "ops": [], "checkpoint": True}
+            self._wal.reset(header=json.dumps(marker, separators=(",", ":")).encode("utf-8"))
+            with self._flush_cond:
+                self._durable_seq = max(self._durable_seq, seq)
+                self._flush_cond.notify_all()
+        finally:
+            self._io_lock.release()
+        # The snapshot no longer references these, so their files can go.
+        with self._blob_lock:
+            for digest in garbage:
+                if digest not in self._blob_refs and not self.blobs.delete(digest):
+                    self._blob_garbage.add(digest)  # pinned or too recent; retry next time
+
+    def _apply_op(self, op: list):
+        """Re-apply one journaled op: during WAL replay, or when catching up on another
+        worker's records (so blob refcounts are kept in step too)."""
+        kind, name, *args = op
+        if name == "likes":
+            likers = self.likes.setdefault(int(args[0]), set())
+            if kind == "add":
+                likers.add(args[1])
+            else:
+                likers.discard(args[1])
+            return
+        if name in ("follows", "follow_requests"):
+            pair = tuple(args[0])
+            if name == "follows":
+                (self._add_follow if kind == "add" else self._remove_follow)(*pair)
+            else:
+                (self._add_follow_request if kind == "add" else self._remove_follow_request)(*pair)
+            return
+        if name == "comments" and kind in ("append", "trim"):
+            if kind == "append":
+                self._index_comment(args[0])
+                self.comments.append(args[0])
+            else:
+                self._trim_comments(args[0])
+            return
+        if name == "feed_events":
+            if kind == "append":
+                self._add_feed_event(args[0])
+            elif kind == "trim":
+                self._trim_feed_events(args[0])
+            elif kind == "remove":
+                self._remove_feed_events(args[0])
+            return
+        if name == "comparisons":
+            self.pairwise.record(*args[0])
+            self.matchups.compared(*args[0][:3])
+            return
+        if name == "tokens":
+            session = parse_session(args[1]) if kind == "put" else None
+            if session is not None:
+                self.sessions.add(args[0], session)
+            elif kind == "del":
+                self.sessions.remove(args[0])
+            return
+        if name == "users" and kind == "patch" and "is_public" in args[1] and args[0] in self.users:
+            self._set_public(args[0], args[1]["is_public"])
+        target = getattr(self, name)
+        # Rank-only patches leave the spot aggregates alone, as the live write did.
+        recount = name == "rankings" and (kind != "patch" or "score" in args[1])
+        if recount and args[0] in target:
+            self._uncount_ranking(target[args[0]])
+        photo_field = self._PHOTO_FIELDS.get(name)
+        if photo_field:
+            self._release_blob(target.get(args[0], {}).get(photo_field))
+        if kind == "put":
+            target[args[0]] = args[1]
+        elif kind == "del":
+            target.pop(args[0], None)
+        elif kind == "patch":
+            if args[0] in target:
+                target[args[0]].update(args[1])
+        if photo_field:
+            self._retain_blob(target.get(args[0], {}).get(photo_field))
+        if recount and args[0] in target:
+            self._count_ranking(target[args[0]])
+        elif name == "spots" and args[0] in target:
+            self.spot_stats.set_category(args[0], target[args[0]].get("category", ""))
+        if name in ("users", "spots"):
+            self._index_for_search(name, args[0])
+
+    def _bump_versions(self, op):
+        """Bump the versions of the entities an op changed (see app/versions.py). Called
+        once the op is applied; comment trims bump their events in `_trim_comments()`."""
+        kind, name, *args = op
+        if name == "users":
+            if kind == "put":  # a new user: nobody has seen their name yet
+                self.versions.bump(("user", args[0]))
+            elif not (kind == "patch" and set(args[1]) <= {"password_hash"}):
+                self.versions.bump(("user", args[0]), PROFILES)
+        elif name in ("follows", "follow_requests"):
+            self.versions.bump(("user", args[0][0]), ("user", args[0][1]))
+        elif name == "spots":
+            self.versions.bump(SPOTS)
+        elif name == "ranking_versions":  # put on every change to a user's list
+            self.versions.bump(("rankings", args[0]), ("user", args[0]))
+        elif name == "comparisons":
+            self.versions.bump(("rankings", args[0][0]))
+        elif name == "likes":
+            self.versions.bump(("event", int(args[0])))
+        elif name == "comments" and kind == "append":
+            self.versions.bump(("event", args[0]["feed_event_id"]))
+
+    def entity_versions(self, keys: list[tuple[str, int]]) -> tuple:
+        """The epoch followed by the current version of each entity."""
+        return (self.versions.epoch, *(
+            self.pairwise.strengths_version if key == PAIRWISE else version
+            for key, version in zip(keys, self.versions.get(keys))
+        ))
+
+    def sizes(self) -> dict[str, dict[str, int]]:
+        """Item counts per collection and on-disk file sizes, for the `/metrics` gauges."""
+        return {
+            "items": {
+                "users": len(self.users),
+                "sessions": len(self.sessions),
+                "follows": len(self.follows),
+                "follow_requests": len(self.follow_requests),
+                "spots": len(self.spots),
+                "rankings": len(self.rankings),
+                "comparisons": len(self.pairwise),
+                "feed_events": len(self.feed_events),
+                "likes": sum(map(len, list(self.likes.values()))),
+                "comments": len(self.comments),
+                "blobs": len(self._blob_refs),
+            },
+            "bytes": {
+                "snapshot": self._data_file.stat().st_size if self._data_file.exists() else 0,
+                "wal": self._wal.size_bytes(),
+            },
+        }
 
     @staticmethod
     def _to_int_keyed_dict(raw: dict) -> dict:
         return {int(k): v for k, v in raw.items()}
 
     def _load(self):
-        if not self._data_file.exists():
-            return
+        started = time.perf_counter()
+        needs_encrypt = False
+        if self._data_file.exists():
+            with STORE_IO.time("snapshot_load"):
+                needs_encrypt = self._load_snapshot()
+
+        with STORE_IO.time("wal_replay"):
+            replayed = self._replay_wal()
+        self._durable_seq = self._wal_seq
+
+        # Drop expired sessions after loading.
+        self.sessions.pop_expired(time.time())
+
+        moved_photos = self._externalize_inline_photos()
+        self._rebuild_blob_refs()
+        self._rebuild_ranking_indexes()
+        self.pairwise.fit()
+        # Blobs left behind by writes that never made it into the log.
+        self._blob_garbage = {d for d in self.blobs.digests() if d not in self._blob_refs}
+
+        # Compact on startup so the next boot does not replay the same records again.
+        if needs_encrypt or replayed or moved_photos:
+            self._checkpoint()
+        STORE_IO.observe(time.perf_counter() - started, "load")
+
+    def _replay_wal(self) -> int:
+        """Apply the log's records newer than the snapshot. Returns how many there were."""
+        replayed = 0
+        for record in self._wal.replay():
+            if record["seq"] <= self._wal_seq or record.get("checkpoint"):
+                continue
+            for op in record["ops"]:
+                self._apply_op(op)
+            self._restore_next_ids(record["next_ids"])
+            self._wal_seq = record["seq"]
+            replayed += 1
+        return replayed
+
+    def _restore_next_ids(self, next_ids: dict):
+        self._next_user_id = int(next_ids["user"])
+        self._next_spot_id = int(next_ids["spot"])
+        self._next_ranking_id = int(next_ids["ranking"])
+        self._next_feed_event_id = int(next_ids["feed_event"])
+        self._next_comment_id = int(next_ids["comment"])
+
+    def _load_snapshot(self) -> bool:
+        """Load `store.json`. Returns True if it was still unencrypted and must be rewritten."""
         raw = self._data_file.read_bytes()
         needs_encrypt = False
         try:
@@ -119,37 +666,42 @@ class Store:
         for u in self.users.values():
             u.setdefault("is_public", False)
         self.usernames = dict(data.get("usernames", {}))
-        raw_tokens = data.get("tokens", {})
         # Backwards compat: older versions stored token -> user_id (int).
         # Treat those tokens as re-issued at load-time.
-        now = datetime.now(timezone.utc)
-        tokens: dict[str, dict] = {}
-        for token, val in raw_tokens.items():
+        reissued_until = time.time() + self._session_ttl_seconds
+        self.sessions.clear()
+        for token, val in data.get("tokens", {}).items():
             if isinstance(val, int):
-                tokens[token] = {
-                    "user_id": val,
-                    "expires_at": (now + timedelta(seconds=self._session_ttl_seconds)).isoformat(),
-                }
-            elif isinstance(val, dict):
-                tokens[token] = val
+                session = Session(val, reissued_until)
             else:
-                # Unknown shape: drop it.
-                continue
-        self.tokens = tokens
+                session = parse_session(val)
+            if session is not None:  # Unknown shape: drop it.
+                self.sessions.add(token, session)
         self.follows = {tuple(pair) for pair in data.get("follows", [])}
         self.follow_requests = {tuple(pair) for pair in data.get("follow_requests", [])}
+        self._rebuild_social_index()
         self.spots = self._to_int_keyed_dict(data.get("spots", {}))
         self.spot_names = dict(data.get("spot_names", {}))
+        self._user_search.clear()
+        self._spot_search.clear()
+        for uid in self.users:
+            self._index_for_search("users", uid)
+        for sid in self.spots:
+            self._index_for_search("spots", sid)
         self.rankings = self._to_int_keyed_dict(data.get("rankings", {}))
         self.user_rankings = {
             int(k): [int(v) for v in values]
             for k, values in data.get("user_rankings", {}).items()
         }
+        self.ranking_versions = self._to_int_keyed_dict(data.get("ranking_versions", {}))
+        self.pairwise.load(data.get("comparisons", {}))
         self.feed_events = list(data.get("feed_events", []))
+        self._rebuild_feed_index()
         self.likes = {
             int(k): set(v) for k, v in data.get("likes", {}).items()
         }
         self.comments = list(data.get("comments", []))
+        self._rebuild_comment_index()
 
         next_ids = data.get("next_ids", {})
         self._next_user_id = int(next_ids.get("user", max(self.users.keys(), default=0) + 1))
@@ -157,36 +709,97 @@ class Store:
         self._next_ranking_id = int(next_ids.get("ranking", max(self.rankings.keys(), default=0) + 1))
         self._next_feed_event_id = int(next_ids.get("feed_event", len(self.feed_events) + 1))
         self._next_comment_id = int(next_ids.get("comment", len(self.comments) + 1))
+        self._wal_seq = int(data.get("wal_seq", 0))
+        return needs_encrypt
 
-        # Drop expired sessions after loading.
-        self._cleanup_expired_tokens()
+    # ── Photos (content-addressed blobs) ───────────────────────────
 
-        if needs_encrypt:
-            self._persist()
+    _PHOTO_FIELDS = {"users": "profile_photo_url", "rankings": "photo_url"}  # besides feed events
 
-    def _cleanup_expired_tokens(self):
-        now = datetime.now(timezone.utc)
-        expired = []
-        for token, meta in self.tokens.items():
-            expires_at = meta.get("expires_at")
-            if not expires_at:
-                expired.append(token)
-                continue
+    def _photo_records(self):
+        """(record, field) pairs that may hold a photo URL."""
+        for u in self.users.values():
+            yield u, "profile_photo_url"
+        for r in self.rankings.values():
+            yield r, "photo_url"
+        for e in self.feed_events:
+            yield e, "photo_url"
+
+    def _externalize_inline_photos(self) -> bool:
+        """Migration: move data URLs still stored inline into the blob store."""
+        moved = False
+        for record, field in self._photo_records():
+            url = record.get(field) or ""
             try:
-                exp_dt = datetime.fromisoformat(expires_at)
-                if exp_dt.tzinfo is None:
-                    exp_dt = exp_dt.replace(tzinfo=timezone.utc)
-                if exp_dt <= now:
-                    expired.append(token)
-            except Exception:
-                expired.append(token)
-        for token in expired:
-            self.tokens.pop(token, None)
+                ref = self.blobs.externalize(url)
+            except blobs.InvalidPhoto:
+                ref = ""  # not an image we would accept today: drop it
+            if ref != url:
+                if ref:
+                    self.blobs.unpin(blobs.digest_of(ref))
+                record[field] = ref
+                moved = True
+        return moved
+
+    def _rebuild_blob_refs(self):
+        self._blob_refs = {}
+        for record, field in self._photo_records():
+            self._retain_blob(record.get(field))
+
+    def _retain_blob(self, url: str | None):
+        digest = blobs.digest_of(url)
+        if digest:
+            with self._blob_lock:
+                self._blob_refs[digest] = self._blob_refs.get(digest, 0) + 1
+                self._blob_garbage.discard(digest)
+
+    def _release_blob(self, url: str | None):
+        digest = blobs.digest_of(url)
+        if digest:
+            with self._blob_lock:
+                if digest not in self._blob_refs:
+                    return
+                self._blob_refs[digest] -= 1
+                if self._blob_refs[digest] <= 0:
+                    del self._blob_refs[digest]
+                    self._blob_garbage.add(digest)
+
+    @contextmanager
+    def _photo_uploads(self):
+        """Yields a function turning data URLs into blob URLs. Call it before taking any
+        collection lock (hashing + encrypting a photo is slow); the blobs stay pinned until
+        the block exits, by which time the caller has retained them."""
+        pinned: list[str] = []
+
+        def externalize(url: str) -> str:
+            ref = self.blobs.externalize(url)
+            if ref != url:
+                digest = blobs.digest_of(ref)
+                pinned.append(digest)
+                self.images.submit(digest)  # render size variants in the background
+            return ref
+
+        try:
+            yield externalize
+        finally:
+            for digest in pinned:
+                self.blobs.unpin(digest)
+
+    def get_blob(self, digest: str) -> tuple[bytes, str] | None:
+        return self.blobs.get(digest)
+
+    def get_blob_variant(self, digest: str, variant: str) -> tuple[bytes, str] | None:
+        return self.images.get(digest, variant)
 
     # ── Users ──────────────────────────────────────────────────────
 
+    @_durable
     def create_user(self, username: str, password: str, first_name: str, last_name: str):
-        with self._lock:
+        if username.lower() in self.usernames:
+            return None
+        # Hash before taking the lock; the name is checked again once it is held.
+        password_hash = self.passwords.hash(password)
+        with self._writing("users", "rankings"):
             if username.lower() in self.usernames:
                 return None
             uid = self._next_user_id
@@ -194,7 +807,7 @@ class Store:
             user = {
                 "id": uid,
                 "username": username,
-                "password_hash": bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode(),
+                "password_hash": password_hash,
                 "first_name": first_name,
                 "last_name": last_name,
                 "profile_photo_url": "",
@@ -202,37 +815,76 @@ class Store:
             }
             self.users[uid] = user
             self.usernames[username.lower()] = uid
+            self._index_for_search("users", uid)
             self.user_rankings[uid] = []
+            self._journal("put", "users", uid, user)
+            self._journal("put", "usernames", username.lower(), uid)
+            self._journal("put", "user_rankings", uid, [])
             self._persist()
             return user
 
+    @_durable
     def verify_user(self, username: str, password: str):
+        """The user if the password matches. Re-hashes it if the work factor has changed."""
         uid = self.usernames.get(username.lower())
         if uid is None:
             return None
         user = self.users[uid]
-        if bcrypt.checkpw(password.encode(), user["password_hash"].encode()):
-            return user
-        return None
-
+        old_hash = user["password_hash"]
+        if not self.passwords.verify(password, old_hash):
+            return None
+        if self.passwords.needs_rehash(old_hash):
+            try:
+                new_hash = self.passwords.hash(password)
+            except HasherBusy:
+                return user  # Try again on a later login.
+            with self._writing("users"):
+                if user["password_hash"] == old_hash:
+                    user["password_hash"] = new_hash
+                    self._journal("patch", "users", uid, {"password_hash": new_hash})
+                    self._persist()
+        return user
+
+    @_durable
     def update_profile_photo(self, user_id: int, photo_url: str):
-        with self._lock:
-            user = self.users.get(user_id)
-            if not user:
-                return None
-            user["profile_photo_url"] = photo_url
-            self._persist()
-            return user
+        with self._photo_uploads() as externalize:
+            photo_url = externalize(photo_url)
+            with self._writing("users"):
+                user = self.users.get(user_id)
+                if not user:
+                    return None
+                self._release_blob(user.get("profile_photo_url"))
+                self._retain_blob(photo_url)
+                user["profile_photo_url"] = photo_url
+                self._journal("patch", "users", user_id, {"profile_photo_url": photo_url})
+                self._persist()
+                return user
 
+    @_durable
     def update_privacy(self, user_id: int, is_public: bool):
-        with self._lock:
+        with self._writing("users", "feed"):
             user = self.users.get(user_id)
             if not user:
                 return None
-            user["is_public"] = is_public
+            self._set_public(user_id, is_public)
+            self._journal("patch", "users", user_id, {"is_public": is_public})
             self._persist()
             return user
 
+    def _set_public(self, user_id: int, is_public: bool):
+        """Flip a user's privacy and move their events in or out of `_public_events`."""
+        user = self.users[user_id]
+        was_public = user.get("is_public", False)
+        user["is_public"] = is_public
+        if is_public == was_public:
+            return
+        own = self._author_events.get(user_id, ())
+        if is_public:
+            self._public_events = tuple(heapq.merge(self._public_events, own))
+        else:
+            hidden = set(own)
+            self._public_events = tuple(eid for eid in self._public_events if eid not in hidden)
+
     def is_profile_visible(self, target_id: int, viewer_id: int | None) -> bool:
         """Can viewer see target's rankings? Visible if: own profile, public, or viewer follows target."""
         if viewer_id is not None and viewer_id == target_id:
@@ -250,79 +902,205 @@ class Store:
         uid = self.usernames.get(username.lower())
         return self.users.get(uid) if uid else None
 
-    def search_users(self, query: str):
-        q = query.lower()
-        # Simple in-memory search for autocomplete.
-        # Matches username and name parts (first/last) case-insensitively.
-        return [
-            u
-            for u in self.users.values()
-            if q in u["username"].lower()
-            or q in u["first_name"].lower()
-            or q in u["last_name"].lower()
-            or q in f"{u['first_name']} {u['last_name']}".lower()
-        ]
+    def user_cards(self, user_ids: list[int], viewer_id: int | None = None) -> list[dict]:
+        """Public profile cards (counts + viewer's follow status) for many users in one pass.
+
+        Unknown ids are skipped; order follows `user_ids`.
+        """
+        users, follows, requests = self.users, self.follows, self.follow_requests
+        followers, following = self._followers, self._following
+        rankings, received = self.user_rankings, self._requests_received
+        cards = []
+        for uid in user_ids:
+            user = users.get(uid)
+            if user is None:
+                continue
+            status = "none"
+            if viewer_id:
+                if (viewer_id, uid) in follows:
+                    status = "following"
+                elif (viewer_id, uid) in requests:
+                    status = "requested"
+            photo_url = user.get("profile_photo_url", "")
+            cards.append({
+                "id": uid,
+                "username": user["username"],
+                "first_name": user["first_name"],
+                "last_name": user["last_name"],
+                "profile_photo_url": photo_url,
+                "profile_photo_variants": variant_urls(photo_url),
+                "followers_count": len(followers.get(uid, ())),
+                "following_count": len(following.get(uid, ())),
+                "ranked_count": len(rankings.get(uid, ())),
+                "is_following": status == "following",
+                "is_public": user.get("is_public", False),
+                "follow_status": status,
+                "pending_requests_count": len(received.get(uid, ())) if viewer_id == uid else 0,
+            })
+        return cards
+
+    def _index_for_search(self, collection: str, record_id: int):
+        """(Re-)index a user or spot after it was created or renamed; drops deleted ones."""
+        if collection == "users":
+            user = self.users.get(record_id)
+            if user is None:
+                self._user_search.remove(record_id)
+                return
+            first, last = user.get("first_name", ""), user.get("last_name", "")
+            self._user_search.put(record_id, user["username"], first, last, f"{first} {last}")
+        else:
+            spot = self.spots.get(record_id)
+            if spot is None:
+                self._spot_search.remove(record_id)
+                return
+            name = spot["name"]
+            # Each word too, so "library" finds "Dana Porter Library" as a prefix match.
+            self._spot_search.put(record_id, name, *name.split())
+
+    def search_users(self, query: str, limit: int | None = None):
+        """Users whose username or name matches `query` (exact, then prefix, then substring)."""
+        with self._locks.read("users"):
+            ids = self._user_search.search(query, limit)
+        return [self.users[uid] for uid in ids]
 
     # ── Tokens ─────────────────────────────────────────────────────
 
+    def _sweep_sessions(self):
+        """Journal removal of every expired session (rides along with every write, see
+        `_durable`). A heap peek unless something has expired; then the sessions write
+        lock is taken, so it must not be called with a collection lock held."""
+        if self.sessions.next_expiry() > time.time() or self._locks.holding():
+            return
+        with self._writing("sessions"):
+            for token in self.sessions.pop_expired(time.time()):
+                self._journal("del", "tokens", token)
+            self._persist()
+
+    @_durable
     def create_token(self, user_id: int) -> str:
-        with self._lock:
+        with self._writing("sessions"):
             token = secrets.token_hex(32)
-            expires_at = (datetime.now(timezone.utc) + timedelta(seconds=self._session_ttl_seconds)).isoformat()
-            self.tokens[token] = {"user_id": user_id, "expires_at": expires_at}
+            session = Session(user_id, time.time() + self._session_ttl_seconds)
+            self.sessions.add(token, session)
+            self._journal("put", "tokens", token, list(session))
             self._persist()
             return token
 
     def get_user_by_token(self, token: str):
-        with self._lock:
-            meta = self.tokens.get(token)
-            if not meta:
-                return None
-            try:
-                exp = meta.get("expires_at")
-                if exp:
-                    exp_dt = datetime.fromisoformat(exp)
-                    if exp_dt.tzinfo is None:
-                        exp_dt = exp_dt.replace(tzinfo=timezone.utc)
-                    if exp_dt <= datetime.now(timezone.utc):
-                        self.tokens.pop(token, None)
-                        self._persist()
-                        return None
-            except Exception:
-                self.tokens.pop(token, None)
-                self._persist()
-                return None
-            uid = meta.get("user_id")
-            return self.users.get(uid) if uid else None
+        """Lock-free: expired sessions just stop resolving until a write sweeps them."""
+        uid = self.sessions.lookup(token, time.time())
+        return self.users.get(uid) if uid is not None else None
 
+    @_durable
     def delete_token(self, token: str):
-        with self._lock:
-            self.tokens.pop(token, None)
+        with self._writing("sessions"):
+            if self.sessions.remove(token):
+                self._journal("del", "tokens", token)
             self._persist()
 
     # ── Follows ────────────────────────────────────────────────────
 
+    # `follows` / `follow_requests` stay the source of truth (and what gets persisted);
+    # the adjacency maps index them by each endpoint. Only mutate them through the
+    # helpers below, with the social and feed (home timelines) write locks held, so
+    # both stay in sync.
+
+    @staticmethod
+    def _link(index: dict[int, list[int]], key: int, value: int):
+        values = index.setdefault(key, [])
+        i = bisect.bisect_left(values, value)
+        if i == len(values) or values[i] != value:
+            values.insert(i, value)
+
+    @staticmethod
+    def _unlink(index: dict[int, list[int]], key: int, value: int):
+        values = index.get(key)
+        if values is None:
+            return
+        i = bisect.bisect_left(values, value)
+        if i < len(values) and values[i] == value:
+            del values[i]
+            if not values:
+                del index[key]
+
+    @staticmethod
+    def _id_page(ids: list[int], cursor: str | None, limit: int | None) -> list[int]:
+        """Slice of a sorted id list after the cursor's id (the whole rest if no limit)."""
+        key = decode_cursor(cursor, 1)
+        start = bisect.bisect_right(ids, key[0]) if key else 0
+        return ids[start:start + limit] if limit else ids[start:]
+
+    def _add_follow(self, follower_id: int, following_id: int):
+        self.follows.add((follower_id, following_id))
+        self.follow_suggestions.changed(follower_id)
+        self._link(self._following, follower_id, following_id)
+        self._link(self._followers, following_id, follower_id)
+        if following_id not in self.timelines.pull_authors:
+            self.timelines.backfill(follower_id, self._author_events.get(following_id, ()))
+
+    def _remove_follow(self, follower_id: int, following_id: int):
+        if (follower_id, following_id) not in self.follows:
+            return
+        self.follows.discard((follower_id, following_id))
+        self.follow_suggestions.changed(follower_id)
+        self._unlink(self._following, follower_id, following_id)
+        self._unlink(self._followers, following_id, follower_id)
+
+        def by_author(event_id: int) -> bool:
+            e = self._feed_event_index.get(event_id)
+            return e is None or e["user_id"] == following_id
+
+        self.timelines.purge(follower_id, by_author)
+
+    def _add_follow_request(self, requester_id: int, target_id: int):
+        self.follow_requests.add((requester_id, target_id))
+        self._link(self._requests_sent, requester_id, target_id)
+        self._link(self._requests_received, target_id, requester_id)
+
+    def _remove_follow_request(self, requester_id: int, target_id: int):
+        self.follow_requests.discard((requester_id, target_id))
+        self._unlink(self._requests_sent, requester_id, target_id)
+        self._unlink(self._requests_received, target_id, requester_id)
+
+    def _rebuild_social_index(self):
+        self.follow_suggestions.clear()
+        self._following, self._followers = {}, {}
+        self._requests_sent, self._requests_received = {}, {}
+        for follower_id, following_id in self.follows:
+            self._link(self._following, follower_id, following_id)
+            self._link(self._followers, following_id, follower_id)
+        for requester_id, target_id in self.follow_requests:
+            self._link(self._requests_sent, requester_id, target_id)
+            self._link(self._requests_received, target_id, requester_id)
+
+    @_durable
     def follow(self, follower_id: int, following_id: int) -> str:
         """Returns "following" (instant) or "requested" (needs approval) or "self" (error)."""
-        with self._lock:
+        with self._writing("social", "feed", read=("users",)):
             if follower_id == following_id:
                 return "self"
             if (follower_id, following_id) in self.follows:
                 return "following"
             target = self.users.get(following_id)
             if target and not target.get("is_public", False):
-                self.follow_requests.add((follower_id, following_id))
+                self._add_follow_request(follower_id, following_id)
+                self._journal("add", "follow_requests", [follower_id, following_id])
                 self._persist()
                 return "requested"
-            self.follows.add((follower_id, following_id))
-            self.follow_requests.discard((follower_id, following_id))
+            self._add_follow(follower_id, following_id)
+            self._remove_follow_request(follower_id, following_id)
+            self._journal("add", "follows", [follower_id, following_id])
+            self._journal("discard", "follow_requests", [follower_id, following_id])
             self._persist()
             return "following"
 
+    @_durable
     def unfollow(self, follower_id: int, following_id: int):
-        with self._lock:
-            self.follows.discard((follower_id, following_id))
-            self.follow_requests.discard((follower_id, following_id))
+        with self._writing("social", "feed"):
+            self._remove_follow(follower_id, following_id)
+            self._remove_follow_request(follower_id, following_id)
+            self._journal("discard", "follows", [follower_id, following_id])
+            self._journal("discard", "follow_requests", [follower_id, following_id])
             self._persist()
 
     def is_following(self, follower_id: int, following_id: int) -> bool:
@@ -339,107 +1117,119 @@ class Store:
             return "requested"
         return "none"
 
+    def get_follow_suggestions(self, user_id: int, limit: int = 10) -> list[tuple[int, int]]:
+        """People followed by people `user_id` follows, as (user id, mutual follows), most
+        mutuals first (see `app/suggestions.py`). Private accounts and people the user has
+        already asked to follow are left out."""
+        with self._locks.read("social"):
+            following = self._following
+            candidates = self.follow_suggestions.candidates(
+                user_id, following.get(user_id, []), lambda f: following.get(f, ())
+            )
+            out = []
+            for uid, mutuals in candidates:
+                if len(out) == limit:
+                    break
+                if self.users.get(uid, {}).get("is_public") and (user_id, uid) not in self.follow_requests:
+                    out.append((uid, mutuals))
+            return out
+
     def get_pending_follow_requests(self, user_id: int) -> list[dict]:
         """Incoming follow requests for this user."""
         return [
             self.users[rid]
-            for rid, tid in self.follow_requests
-            if tid == user_id and rid in self.users
+            for rid in tuple(self._requests_received.get(user_id, ()))
+            if rid in self.users
         ]
 
     def pending_requests_count(self, user_id: int) -> int:
-        return sum(1 for _, tid in self.follow_requests if tid == user_id)
+        return len(self._requests_received.get(user_id, ()))
 
+    @_durable
     def approve_follow_request(self, target_id: int, requester_id: int) -> bool:
-        with self._lock:
+        with self._writing("social", "feed"):
             if (requester_id, target_id) not in self.follow_requests:
                 return False
-            self.follow_requests.discard((requester_id, target_id))
-            self.follows.add((requester_id, target_id))
+            self._remove_follow_request(requester_id, target_id)
+            self._add_follow(requester_id, target_id)
+            self._journal("discard", "follow_requests", [requester_id, target_id])
+            self._journal("add", "follows", [requester_id, target_id])
             self._persist()
             return True
 
+    @_durable
     def deny_follow_request(self, target_id: int, requester_id: int) -> bool:
-        with self._lock:
+        with self._writing("social"):
             if (requester_id, target_id) not in self.follow_requests:
                 return False
-            self.follow_requests.discard((requester_id, target_id))
+            self._remove_follow_request(requester_id, target_id)
+            self._journal("discard", "follow_requests", [requester_id, target_id])
             self._persist()
             return True
 
-    def get_followers(self, user_id: int):
-        return [self.users[fid] for fid, tid in self.follows if tid == user_id]
+    def get_followers(self, user_id: int, limit: int | None = None, cursor: str | None = None):
+        """Followers ordered by user id; `cursor` continues after the last id returned."""
+        return [self.users[fid] for fid in self._id_page(self._followers.get(user_id, []), cursor, limit)]
 
-    def get_following(self, user_id: int):
-        return [self.users[tid] for fid, tid in self.follows if fid == user_id]
+    def get_following(self, user_id: int, limit: int | None = None, cursor: str | None = None):
+        """Followed users ordered by user id; `cursor` continues after the last id returned."""
+        return [self.users[tid] for tid in self._id_page(self._following.get(user_id, []), cursor, limit)]
 
     def followers_count(self, user_id: int) -> int:
-        return sum(1 for _, tid in self.follows if tid == user_id)
+        return len(self._followers.get(user_id, ()))
 
     def following_count(self, user_id: int) -> int:
-        return sum(1 for fid, _ in self.follows if fid == user_id)
+        return len(self._following.get(user_id, ()))
 
     # ── Spots ──────────────────────────────────────────────────────
 
     def _get_or_create_spot_unlocked(self, name: str, category: str = ""):
-        """Must be called with `self._lock` held."""
+        """Must be called with the rankings write lock held (spots live under it). Only
+        journals: the caller persists once its whole write is done, so a new spot commits in
+        the same WAL record as the rankings that use it."""
         key = name.lower().strip()
         if key in self.spot_names:
             spot = self.spots[self.spot_names[key]]
             # Update category if provided and spot doesn't have one yet
             if category and not spot.get("category"):
                 spot["category"] = category
-                self._persist()
+                self.spot_stats.set_category(spot["id"], category)
+                self._journal("patch", "spots", spot["id"], {"category": category})
             return spot
         sid = self._next_spot_id
         self._next_spot_id += 1
         spot = {"id": sid, "name": name.strip(), "category": category}
         self.spots[sid] = spot
         self.spot_names[key] = sid
-        self._persist()
+        self._index_for_search("spots", sid)
+        self._journal("put", "spots", sid, spot)
+        self._journal("put", "spot_names", key, sid)
         return spot
 
+    @_durable
     def get_or_create_spot(self, name: str, category: str = ""):
-        with self._lock:
-            return self._get_or_create_spot_unlocked(name, category)
+        with self._writing("rankings"):
+            spot = self._get_or_create_spot_unlocked(name, category)
+            self._persist()
+            return spot
 
     def list_spots(self):
         return list(self.spots.values())
 
-    def search_spots(self, query: str):
-        q = query.lower()
-        return [s for s in self.spots.values() if q in s["name"].lower()]
+    def search_spots(self, query: str, limit: int | None = None):
+        """Spots whose name (or a word of it) matches `query`, best matches first."""
+        with self._locks.read("rankings"):
+            ids = self._spot_search.search(query, limit)
+        return [self.spots[sid] for sid in ids]
 
     # ── Rankings ───────────────────────────────────────────────────
 
-    # Beli-style ranges: Bad / Okay / Good (same boundaries as client).
-    BAD_MAX = 10.0 / 3
-    OKAY_MAX = 20.0 / 3
-
-    @staticmethod
-    def score_to_tier(score: float) -> str:
-        """Convert a numeric score to a letter tier."""
-        if score >= 9.0:
-            return "S"
-        elif score >= 8.0:
-            return "A"
-        elif score >= 7.0:
-            return "B"
-        elif score >= 6.0:
-            return "C"
-        elif score >= 5.0:
-            return "D"
-        return "F"
-
-    @classmethod
-    def score_to_rating(cls, score: float) -> str:
-        """Beli-style: bad / okay / good (for same-range comparison)."""
-        if score < cls.BAD_MAX:
-            return "bad"
-        if score < cls.OKAY_MAX:
-            return "okay"
-        return "good"
+    BAD_MAX = tiers.BAD_MAX
+    OKAY_MAX = tiers.OKAY_MAX
+    score_to_tier = staticmethod(tiers.score_to_tier)
+    score_to_rating = staticmethod(tiers.score_to_rating)
 
+    @_durable
     def set_rankings(self, user_id: int, ranked_items: list[dict]):
         """Replace the full ranked list for a user.
 
@@ -449,105 +1239,310 @@ class Store:
         FEED EVENT STUFF NOT ADDED IN PROJECT YET
         Only adds a feed event when the user adds at least one *new* spot (not when they just reorder or scores change).
         """
-        with self._lock:
-            # Remember which spots they had before (normalized names for comparison)
-            old_spot_names = set()
-            for rid in self.user_rankings.get(user_id, []):
-                r = self.rankings.get(rid)
-                if r:
-                    s = self.spots.get(r["spot_id"])
-                    if s:
-                        old_spot_names.add(s["name"].lower().strip())
-
-            new_spot_names = {item["spot_name"].lower().strip() for item in ranked_items}
-            removed_names = old_spot_names - new_spot_names
-            removed_spot_ids: set[int] = set()
-            if removed_names:
+        with self._photo_uploads() as externalize:
+            ranked_items = [{**item, "photo_url": externalize(item.get("photo_url", ""))} for item in ranked_items]
+            with self._writing("rankings", "feed", read=("users", "social")):
+                # Remember which spots they had before (normalized names for comparison)
+                old_spot_names = set()
                 for rid in self.user_rankings.get(user_id, []):
                     r = self.rankings.get(rid)
-                    if not r:
-                        continue
-                    s = self.spots.get(r["spot_id"])
-                    if s and s["name"].lower().strip() in removed_names:
-                        removed_spot_ids.add(s["id"])
+                    if r:
+                        s = self.spots.get(r["spot_id"])
+                        if s:
+                            old_spot_names.add(s["name"].lower().strip())
 
-            # Remove old rankings for this user
-            for rid in self.user_rankings.get(user_id, []):
-                self.rankings.pop(rid, None)
-            self.user_rankings[user_id] = []
-
-            now_iso = datetime.now(timezone.utc).isoformat()
-
-            for i, item in enumerate(ranked_items):
-                spot = self._get_or_create_spot_unlocked(item["spot_name"], item.get("category", ""))
-                rid = self._next_ranking_id
-                self._next_ranking_id += 1
-                score = item.get("score", 5.0)
-                ranking = {
-                    "id": rid,
-                    "user_id": user_id,
-                    "spot_id": spot["id"],
-                    "rank": i + 1,
-                    "score": score,
-                    "tier": self.score_to_tier(score),
-                    "notes": item.get("notes", ""),
-                    "photo_url": item.get("photo_url", ""),
-                    "created_at": item.get("created_at", now_iso),
-                }
-                self.rankings[rid] = ranking
-                self.user_rankings[user_id].append(rid)
-
-            ####### Not in project yet ######
-            # Feed event only when they explicitly added at least one new spot (not reorder/score-only changes)
-            if ranked_items:
                 new_spot_names = {item["spot_name"].lower().strip() for item in ranked_items}
-                added_names = new_spot_names - old_spot_names
-                if added_names:
-                    # Find the first newly added spot in their list for the feed card
-                    for item in ranked_items:
-                        if item["spot_name"].lower().strip() in added_names:
-                            spot = self._get_or_create_spot_unlocked(item["spot_name"], item.get("category", ""))
-                            score = item.get("score", 5.0)
-                            event_id = self._next_feed_event_id
-                            self._next_feed_event_id += 1
-                            self.feed_events.append({
-                                "id": event_id,
-                                "user_id": user_id,
-                                "created_at": now_iso,
-                                "kind": "new",
-                                "spot": {"id": spot["id"], "name": spot["name"], "category": spot.get("category", "")},
-                                "score": score,
-                                "tier": self.score_to_tier(score),
-                                "photo_url": item.get("photo_url", ""),
-                            })
-                            break
-                    if len(self.feed_events) > 500:
-                        self.feed_events = self.feed_events[-500:]
-            ####### End of not in project yet ######
-
-            # Remove feed "new" events for spots this user no longer ranks (so followers don't see stale items).
-            if removed_spot_ids:
-                self.feed_events = [
-                    e
-                    for e in self.feed_events
-                    if not (
-                        e.get("user_id") == user_id
-                        and e.get("kind", "new") == "new"
-                        and isinstance(e.get("spot"), dict)
-                        and e["spot"].get("id") in removed_spot_ids
-                    )
-                ]
-            self._persist()
-            return self.get_user_rankings(user_id)
+                removed_names = old_spot_names - new_spot_names
+                removed_spot_ids: set[int] = set()
+                if removed_names:
+                    for rid in self.user_rankings.get(user_id, []):
+                        r = self.rankings.get(rid)
+                        if not r:
+                            continue
+                        s = self.spots.get(r["spot_id"])
+                        if s and s["name"].lower().strip() in removed_names:
+                            removed_spot_ids.add(s["id"])
+
+                # Remove old rankings for this user
+                for rid in self.user_rankings.get(user_id, []):
+                    old = self.rankings.pop(rid, None)
+                    if old:
+                        self._release_blob(old.get("photo_url"))
+                        self._uncount_ranking(old)
+                    self._journal("del", "rankings", rid)
+                ranking_ids: list[int] = []
+
+                now_iso = datetime.now(timezone.utc).isoformat()
+
+                for i, item in enumerate(ranked_items):
+                    spot = self._get_or_create_spot_unlocked(item["spot_name"], item.get("category", ""))
+                    rid = self._next_ranking_id
+                    self._next_ranking_id += 1
+                    score = item.get("score", 5.0)
+                    ranking = {
+                        "id": rid,
+                        "user_id": user_id,
+                        "spot_id": spot["id"],
+                        "rank": i + 1,
+                        "score": score,
+                        "tier": self.score_to_tier(score),
+                        "notes": item.get("notes", ""),
+                        "photo_url": item.get("photo_url", ""),
+                        "created_at": item.get("created_at", now_iso),
+                    }
+                    self.rankings[rid] = ranking
+                    ranking_ids.append(rid)
+                    self._retain_blob(ranking["photo_url"])
+                    self._count_ranking(ranking)
+                    self._journal("put", "rankings", rid, ranking)
+                self.user_rankings[user_id] = ranking_ids
+                self._journal("put", "user_rankings", user_id, ranking_ids)
+
+                ####### Not in project yet ######
+                # Feed event only when they explicitly added at least one new spot (not reorder/score-only changes)
+                if ranked_items:
+                    new_spot_names = {item["spot_name"].lower().strip() for item in ranked_items}
+                    added_names = new_spot_names - old_spot_names
+                    if added_names:
+                        # Find the first newly added spot in their list for the feed card
+                        for item in ranked_items:
+                            if item["spot_name"].lower().strip() in added_names:
+                                spot = self._get_or_create_spot_unlocked(item["spot_name"], item.get("category", ""))
+                                self._add_spot_event(user_id, spot, item.get("score", 5.0), item.get("photo_url", ""), now_iso)
+                                break
+                ####### End of not in project yet ######
+
+                # Remove feed "new" events for spots this user no longer ranks (so followers don't see stale items).
+                self._remove_spot_events(user_id, removed_spot_ids)
+                self._bump_ranking_version(user_id)
+                self._persist()
+                return self.get_user_rankings(user_id)
+
+    @_durable
+    def patch_rankings(self, user_id: int, version: int, ops: list[dict]) -> tuple[int, list[dict]]:
+        """Apply incremental ops (see `app.ranking_ops`) to the user's list if it is still at
+        `version`. Returns the new version and the list.
+
+        Only the rankings an op touches are rewritten (plus the list's id order), so a drag
+        or a single edit journals a few small records instead of the whole list. Feed events
+        follow the same rule as `set_rankings`: the first spot the patch adds gets a "new"
+        event and spots it removes lose theirs.
+        """
+        with self._photo_uploads() as externalize:
+            ops = [{**op, "photo_url": externalize(op["photo_url"])} if "photo_url" in op else op for op in ops]
+            with self._writing("rankings", "feed", read=("users", "social")):
+                current = self.ranking_versions.get(user_id, 0)
+                if version != current:
+                    raise RankingVersionConflict(current)
+                order = list(self.user_rankings.get(user_id, []))
+                check_ops(
+                    {rid: self.spots[self.rankings[rid]["spot_id"]]["name"].lower().strip() for rid in order}, ops
+                )
+                if not ops:
+                    return current, self.get_user_rankings(user_id)
+
+                now_iso = datetime.now(timezone.utc).isoformat()
+                inserted: list[tuple[dict, dict]] = []  # (ranking, spot)
+                removed_spot_ids: set[int] = set()
+                for op in ops:
+                    kind = op["op"]
+                    if kind == "insert":
+                        spot = self._get_or_create_spot_unlocked(op["spot_name"], op.get("category", ""))
+                        rid = self._next_ranking_id
+                        self._next_ranking_id += 1
+                        position = clamp_position(op.get("position"), len(order))
+                        score = op.get("score", 5.0)
+                        ranking = {
+                            "id": rid,
+                            "user_id": user_id,
+                            "spot_id": spot["id"],
+                            "rank": position + 1,
+                            "score": score,
+                            "tier": self.score_to_tier(score),
+                            "notes": op.get("notes", ""),
+                            "photo_url": op.get("photo_url", ""),
+                            "created_at": now_iso,
+                        }
+                        self.rankings[rid] = ranking
+                        order.insert(position, rid)
+                        self._retain_blob(ranking["photo_url"])
+                        self._count_ranking(ranking)
+                        self._journal("put", "rankings", rid, ranking)
+                        inserted.append((ranking, spot))
+                    elif kind == "remove":
+                        rid = op["ranking_id"]
+                        order.remove(rid)
+                        old = self.rankings.pop(rid)
+                        self._release_blob(old.get("photo_url"))
+                        self._uncount_ranking(old)
+                        self._journal("del", "rankings", rid)
+                        removed_spot_ids.add(old["spot_id"])
+                    elif kind == "move":
+                        rid = op["ranking_id"]
+                        order.remove(rid)
+                        position = clamp_position(op["position"], len(order))
+                        order.insert(position, rid)
+                        # Stored ranks are only a hint (order lives in `user_rankings`), so
+                        # the rankings the move shifts are not rewritten.
+                        self.rankings[rid]["rank"] = position + 1
+                        self._journal("patch", "rankings", rid, {"rank": position + 1})
+                    else:
+                        rid = op["ranking_id"]
+                        ranking = self.rankings[rid]
+                        changes = {field: op[field] for field in UPDATE_FIELDS if field in op}
+                        if "score" in changes:
+                            changes["tier"] = self.score_to_tier(changes["score"])
+                        if "photo_url" in changes:
+                            self._release_blob(ranking.get("photo_url"))
+                            self._retain_blob(changes["photo_url"])
+                        if "score" in changes:
+                            self._uncount_ranking(ranking)
+                        ranking.update(changes)
+                        if "score" in changes:
+                            self._count_ranking(ranking)
+                        self._journal("patch", "rankings", rid, changes)
+                # Swap in a new list so lock-free readers never see one half-edited.
+                self.user_rankings[user_id] = order
+                self._journal("put", "user_rankings", user_id, order)
+
+                # A spot removed and added back in the same patch keeps its events.
+                readded = {spot["id"] for _, spot in inserted} & removed_spot_ids
+                for ranking, spot in inserted:
+                    if spot["id"] not in readded:
+                        self._add_spot_event(user_id, spot, ranking["score"], ranking["photo_url"], now_iso)
+                        break
+                self._remove_spot_events(user_id, removed_spot_ids - readded)
+                new_version = self._bump_ranking_version(user_id)
+                self._persist()
+                return new_version, self.get_user_rankings(user_id)
+
+    def ranking_version(self, user_id: int) -> int:
+        return self.ranking_versions.get(user_id, 0)
+
+    def _bump_ranking_version(self, user_id: int) -> int:
+        version = self.ranking_versions.get(user_id, 0) + 1
+        self.ranking_versions[user_id] = version
+        self._journal("put", "ranking_versions", user_id, version)
+        return version
+
+    def _add_spot_event(self, user_id: int, spot: dict, score: float, photo_url: str, created_at: str):
+        """Add (and journal) a "new" feed event for a spot the user just ranked."""
+        event_id = self._next_feed_event_id
+        self._next_feed_event_id += 1
+        event = {
+            "id": event_id,
+            "user_id": user_id,
+            "created_at": created_at,
+            "kind": "new",
+            "spot": {"id": spot["id"], "name": spot["name"], "category": spot.get("category", "")},
+            "score": score,
+            "tier": self.score_to_tier(score),
+            "photo_url": photo_url,
+        }
+        self._add_feed_event(event)
+        self._journal("append", "feed_events", event)
+        if self._trim_feed_events(500):
+            self._journal("trim", "feed_events", 500)
+
+    def _remove_spot_events(self, user_id: int, spot_ids: set[int]):
+        """Remove (and journal) the user's "new" events for spots they no longer rank."""
+        if not spot_ids:
+            return
+        stale_ids = [
+            eid
+            for eid in self._author_events.get(user_id, ())
+            if isinstance(self._feed_event_index[eid].get("spot"), dict)
+            and self._feed_event_index[eid]["spot"].get("id") in spot_ids
+        ]
+        if stale_ids:
+            self._remove_feed_events(stale_ids)
+            self._journal("remove", "feed_events", stale_ids)
+
+    # Feed events are only mutated through these helpers (with the feed write lock held),
+    # which keep the id index, per-author lists, home timelines and blob refcounts in step.
+    # Adding one also reads the author's privacy and followers: hold users and social for
+    # reading too.
+    # Per-author and public id lists are tuples replaced on every change, so lock-free
+    # readers always see a complete list.
+
+    def _add_feed_event(self, event: dict):
+        self.feed_events.append(event)
+        self._feed_event_index[event["id"]] = event
+        self._retain_blob(event.get("photo_url"))
+        if event.get("kind", "new") == "new":
+            author_id = event["user_id"]
+            self._author_events[author_id] = (*self._author_events.get(author_id, ()), event["id"])
+            if self.users.get(author_id, {}).get("is_public", False):
+                self._public_events = (*self._public_events, event["id"])
+            self._push_to_timelines(event)
+
+    def _push_to_timelines(self, event: dict):
+        author_id = event["user_id"]
+        followers = self._followers.get(author_id, ())
+        if not self.timelines.is_pull_author(author_id, len(followers)):
+            self.timelines.push(tuple(followers), event["id"])
+
+    def _unindex_feed_event(self, event: dict):
+        self._feed_event_index.pop(event["id"], None)
+        self._release_blob(event.get("photo_url"))
+        ids = self._author_events.get(event["user_id"])
+        if ids and event["id"] in ids:
+            ids = tuple(eid for eid in ids if eid != event["id"])
+            if ids:
+                self._author_events[event["user_id"]] = ids
+            else:
+                del self._author_events[event["user_id"]]
+        i = bisect.bisect_left(self._public_events, event["id"])
+        if i < len(self._public_events) and self._public_events[i] == event["id"]:
+            self._public_events = self._public_events[:i] + self._public_events[i + 1:]
+        # Timelines drop dead ids lazily on read.
+
+    def _remove_feed_events(self, ids: list[int]):
+        stale = set(ids)
+        for e in self.feed_events:
+            if e["id"] in stale:
+                self._unindex_feed_event(e)
+        self.feed_events = [e for e in self.feed_events if e["id"] not in stale]
+
+    def _trim_feed_events(self, keep: int) -> bool:
+        """Keep only the newest `keep` feed events. Returns True if any were dropped."""
+        if len(self.feed_events) <= keep:
+            return False
+        for e in self.feed_events[:-keep]:
+            self._unindex_feed_event(e)
+        self.feed_events = self.feed_events[-keep:]
+        return True
+
+    def _rebuild_feed_index(self):
+        """Recompute everything derived from `feed_events` (needs users and the follow graph
+        loaded). Blob refcounts are rebuilt separately, by `_rebuild_blob_refs()`."""
+        self._feed_event_index = {}
+        self.timelines.clear()
+        author_events: dict[int, list[int]] = {}
+        for e in self.feed_events:
+            self._feed_event_index[e["id"]] = e
+            if e.get("kind", "new") == "new":
+                author_events.setdefault(e["user_id"], []).append(e["id"])
+                self._push_to_timelines(e)
+        self._author_events = {uid: tuple(ids) for uid, ids in author_events.items()}
+        self._public_events = tuple(sorted(
+            eid
+            for uid, ids in author_events.items()
+            if self.users.get(uid, {}).get("is_public", False)
+            for eid in ids
+        ))
 
     def get_user_rankings(self, user_id: int):
         results = []
-        for rid in self.user_rankings.get(user_id, []):
-            r = self.rankings[rid]
-            spot = self.spots[r["spot_id"]]
-            out = {**r, "spot": spot}
-            out["rating"] = self.score_to_rating(r["score"])
-            results.append(out)
+        with self._locks.read("rankings"):
+            for rid in self.user_rankings.get(user_id, []):
+                r = self.rankings[rid]
+                spot = self.spots[r["spot_id"]]
+                out = {**r, "spot": spot}
+                out["photo_variants"] = variant_urls(r.get("photo_url"))
+                out["rating"] = self.score_to_rating(r["score"])
+                out["pairwise"] = self.pairwise.rating(r["spot_id"], user_id)
+                results.append(out)
         # Requirement: profile ranked list ordered by score (desc).
         results.sort(key=lambda x: x["score"], reverse=True)
         for i, item in enumerate(results, start=1):
@@ -557,9 +1552,63 @@ class Store:
     def ranked_count(self, user_id: int) -> int:
         return len(self.user_rankings.get(user_id, []))
 
+    def _count_ranking(self, ranking: dict):
+        spot = self.spots.get(ranking["spot_id"], {})
+        self.spot_stats.add(ranking["spot_id"], spot.get("category", ""), ranking["score"])
+        self.matchups.add(ranking["user_id"], ranking["spot_id"], ranking["score"])
+        self.recommender.set_score(ranking["user_id"], ranking["spot_id"], ranking["score"])
+
+    def _uncount_ranking(self, ranking: dict):
+        self.spot_stats.remove(ranking["spot_id"], ranking["score"])
+        self.matchups.remove(ranking["user_id"], ranking["spot_id"])
+        self.recommender.remove_score(ranking["user_id"], ranking["spot_id"])
+
+    def _rebuild_ranking_indexes(self):
+        """Spot aggregates, matchup pools and recommendations, from the rankings and
+        comparison log."""
+        self.spot_stats.clear()
+        self.matchups.clear()
+        self.recommender.clear()
+        for r in self.rankings.values():
+            self._count_ranking(r)
+        self.matchups.remember(self.pairwise.columns())
+        self.recommender.refresh()
+
+    def get_leaderboard(self, category: str = "", limit: int = 10) -> list[dict]:
+        """Best-rated spots across all users, overall or within `category`."""
+        with self._locks.read("rankings"):
+            top = self.spot_stats.top(category, limit)
+            return [
+                {**stats_response(self.spots[spot_id], *rest), "pairwise": self.pairwise.rating(spot_id)}
+                for spot_id, *rest in top
+            ]
+
+    def get_recommended_spots(self, user_id: int, limit: int = 10) -> list[dict]:
+        """Spots the user has not ranked, best first: the precomputed collaborative-filtering
+        picks (see `app/recommendations.py`), topped up from the overall leaderboard."""
+        with self._locks.read("rankings"):
+            ranked = {self.rankings[rid]["spot_id"] for rid in self.user_rankings.get(user_id, ())}
+            picks = [
+                (spot_id, score) for spot_id, score in self.recommender.recommended(user_id, limit + len(ranked))
+                if spot_id not in ranked
+            ][:limit]
+            if len(picks) < limit:
+                skip = ranked | {spot_id for spot_id, _ in picks}
+                popular = self.spot_stats.top("", limit + len(skip))
+                picks += [(spot_id, None) for spot_id, *_ in popular if spot_id not in skip][:limit - len(picks)]
+            return [recommendation(self.spots[spot_id], score) for spot_id, score in picks]
+
+    def pairwise_rating(self, spot_id: int) -> dict:
+        """A spot's ratings from everyone's pairwise comparisons (see `app/pairwise.py`)."""
+        return self.pairwise.rating(spot_id)
+
     def _ranking_photo_for_user_spot(self, user_id: int, spot_id: int) -> str:
-        """Current photo_url for this user's ranking of spot_id, or empty string."""
-        for rid in self.user_rankings.get(user_id, []):
+        """Current photo_url for this user's ranking of spot_id, or empty string.
+
+        Lock-free: `set_rankings` swaps in a new id list rather than emptying the old one,
+        and a ranking that vanished meanwhile is just skipped.
+        """
+        for rid in self.user_rankings.get(user_id, ()):
             r = self.rankings.get(rid)
             if r and r.get("spot_id") == spot_id:
                 return (r.get("photo_url") or "").strip()
@@ -567,9 +1616,10 @@ class Store:
 
     # ── Likes ──────────────────────────────────────────────────────
 
+    @_durable
     def toggle_like(self, feed_event_id: int, user_id: int) -> bool:
         """Toggle like on a feed event. Returns True if now liked, False if unliked."""
-        with self._lock:
+        with self._writing("engagement"):
             likers = self.likes.setdefault(feed_event_id, set())
             if user_id in likers:
                 likers.discard(user_id)
@@ -577,14 +1627,17 @@ class Store:
             else:
                 likers.add(user_id)
                 liked = True
+            self._journal("add" if liked else "discard", "likes", feed_event_id, user_id)
             self._persist()
             return liked
 
+    @_durable
     def unlike(self, feed_event_id: int, user_id: int):
-        with self._lock:
+        with self._writing("engagement"):
             likers = self.likes.get(feed_event_id)
-            if likers:
+            if likers and user_id in likers:
                 likers.discard(user_id)
+                self._journal("discard", "likes", feed_event_id, user_id)
             self._persist()
 
     def get_likes_count(self, feed_event_id: int) -> int:
@@ -595,8 +1648,9 @@ class Store:
 
     # ── Comments ──────────────────────────────────────────────────
 
+    @_durable
     def add_comment(self, feed_event_id: int, user_id: int, text: str) -> dict:
-        with self._lock:
+        with self._writing("engagement"):
             cid = self._next_comment_id
             self._next_comment_id += 1
             comment = {
@@ -607,13 +1661,56 @@ class Store:
                 "created_at": datetime.now(timezone.utc).isoformat(),
             }
             self.comments.append(comment)
+            self._index_comment(comment)
+            self._journal("append", "comments", comment)
             if len(self.comments) > 5000:
-                self.comments = self.comments[-5000:]
+                self._trim_comments(5000)
+                self._journal("trim", "comments", 5000)
             self._persist()
             return comment
 
-    def get_comments(self, feed_event_id: int) -> list[dict]:
-        return [c for c in self.comments if c["feed_event_id"] == feed_event_id]
+    # Each event's comments are a tuple replaced on every change (copy-on-write), so the
+    # read methods below need no lock.
+
+    def _index_comment(self, comment: dict):
+        eid = comment["feed_event_id"]
+        self._comments_by_event[eid] = (*self._comments_by_event.get(eid, ()), comment)
+
+    def _trim_comments(self, keep: int):
+        """Drop all but the newest `keep` comments, from the global list and the index."""
+        dropped = self.comments[:-keep]
+        self.comments = self.comments[-keep:]
+        # The globally oldest comments are also the oldest of their events.
+        per_event: dict[int, int] = {}
+        for c in dropped:
+            per_event[c["feed_event_id"]] = per_event.get(c["feed_event_id"], 0) + 1
+        for eid, n in per_event.items():
+            remaining = self._comments_by_event.get(eid, ())[n:]
+            if remaining:
+                self._comments_by_event[eid] = remaining
+            else:
+                self._comments_by_event.pop(eid, None)
+        self.versions.bump(*(("event", eid) for eid in per_event))
+
+    def _rebuild_comment_index(self):
+        by_event: dict[int, list[dict]] = {}
+        for c in self.comments:
+            by_event.setdefault(c["feed_event_id"], []).append(c)
+        self._comments_by_event = {eid: tuple(cs) for eid, cs in by_event.items()}
+
+    def get_comments(self, feed_event_id: int, limit: int | None = None, cursor: str | None = None) -> list[dict]:
+        """Comments oldest first; `cursor` (created_at, id) continues after the last one returned."""
+        key = decode_cursor(cursor, 2)
+        event_comments = self._comments_by_event.get(feed_event_id, ())
+        start = bisect.bisect_right(event_comments, key[1], key=lambda c: c["id"]) if key else 0
+        return list(event_comments[start:start + limit] if limit else event_comments[start:])
+
+    def comments_count(self, feed_event_id: int) -> int:
+        return len(self._comments_by_event.get(feed_event_id, ()))
+
+    def recent_comments(self, feed_event_id: int, n: int = 3) -> list[dict]:
+        """The newest `n` comments of an event, oldest first."""
+        return list(self._comments_by_event.get(feed_event_id, ())[-n:]) if n > 0 else []
 
     def _comment_to_response(self, comment: dict) -> dict:
         user = self.users.get(comment["user_id"], {})
@@ -625,6 +1722,7 @@ class Store:
                 "first_name": user.get("first_name", ""),
                 "last_name": user.get("last_name", ""),
                 "profile_photo_url": user.get("profile_photo_url", ""),
+                "profile_photo_variants": variant_urls(user.get("profile_photo_url")),
             },
             "text": comment["text"],
             "created_at": comment["created_at"],
@@ -633,109 +1731,206 @@ class Store:
     # ── Feed ──────────────────────────────────────────────────────
 
     def _feed_events_to_items(self, events: list[dict], viewer_id: int | None = None):
-        """Convert feed event dicts to API response shape, including like/comment counts."""
+        """Convert feed event dicts to API response shape, including like/comment counts.
+
+        Lock-free: events are never edited once written, and the like sets and comment
+        tuples are only read with single (atomic) operations.
+        """
         out = []
-        mutated = False
-        with self._lock:
-            for e in events:
-                if e.get("kind", "new") == "new" and not (e.get("photo_url") or "").strip():
-                    sid = e.get("spot", {}).get("id") if isinstance(e.get("spot"), dict) else None
-                    if sid is not None:
-                        photo = self._ranking_photo_for_user_spot(e["user_id"], int(sid))
-                        if photo:
-                            e["photo_url"] = photo
-                            mutated = True
-                user = self.users[e["user_id"]]
-                event_id = e["id"]
-                event_comments = self.get_comments(event_id)
-                out.append({
-                    "id": event_id,
-                    "user": {
-                        "id": user["id"],
-                        "username": user["username"],
-                        "first_name": user["first_name"],
-                        "last_name": user["last_name"],
-                        "profile_photo_url": user.get("profile_photo_url", ""),
-                    },
-                    "spot": e["spot"],
-                    "rank": 1,
-                    "score": e["score"],
-                    "tier": e["tier"],
-                    "notes": "",
-                    "photo_url": e.get("photo_url", ""),
-                    "created_at": e["created_at"],
-                    "kind": e["kind"],
-                    "likes_count": self.get_likes_count(event_id),
-                    "is_liked": self.has_liked(event_id, viewer_id) if viewer_id else False,
-                    "comments_count": len(event_comments),
-                    "comments": [self._comment_to_response(c) for c in event_comments[-3:]],
-                })
-            if mutated:
-                self._persist()
+        for e in events:
+            photo_url = e.get("photo_url") or ""
+            if e.get("kind", "new") == "new" and not photo_url.strip():
+                # Events written before their ranking got a photo show the ranking's.
+                sid = e.get("spot", {}).get("id") if isinstance(e.get("spot"), dict) else None
+                if sid is not None:
+                    photo_url = self._ranking_photo_for_user_spot(e["user_id"], int(sid)) or photo_url
+            user = self.users[e["user_id"]]
+            event_id = e["id"]
+            out.append({
+                "id": event_id,
+                "user": {
+                    "id": user["id"],
+                    "username": user["username"],
+                    "first_name": user["first_name"],
+                    "last_name": user["last_name"],
+                    "profile_photo_url": user.get("profile_photo_url", ""),
+                    "profile_photo_variants": variant_urls(user.get("profile_photo_url")),
+                },
+                "spot": e["spot"],
+                "rank": 1,
+                "score": e["score"],
+                "tier": e["tier"],
+                "notes": "",
+                "photo_url": photo_url,
+                "photo_variants": variant_urls(photo_url),
+                "created_at": e["created_at"],
+                "kind": e["kind"],
+                "likes_count": self.get_likes_count(event_id),
+                "is_liked": self.has_liked(event_id, viewer_id) if viewer_id else False,
+                "comments_count": self.comments_count(event_id),
+                "comments": [self._comment_to_response(c) for c in self.recent_comments(event_id)],
+            })
         return out
 
-    def get_feed(self, user_id: int, limit: int = 20):
+    def get_feed(self, user_id: int, limit: int = 20, cursor: str | None = None):
         """Feed from users you follow (excluding yourself): sorted by recency (newest first)."""
-        following_ids = {tid for fid, tid in self.follows if fid == user_id}
-        following_ids.discard(user_id)
-        events = [
-            e
-            for e in self.feed_events
-            if e["user_id"] in following_ids and e.get("kind", "new") == "new"
-        ]
-        events.sort(key=lambda x: x["created_at"], reverse=True)
-        return self._feed_events_to_items(events[:limit], viewer_id=user_id)
+        return self._feed_events_to_items(self._feed_page(user_id, limit, cursor), viewer_id=user_id)
 
-    def get_recent_rankings(self, limit: int = 20, viewer_id: int | None = None):
-        """Recent feed: sorted by recency (newest first). One entry per new ranking action."""
-        events = [e for e in self.feed_events if e.get("kind", "new") == "new"]
-        events = sorted(events, key=lambda x: x["created_at"], reverse=True)[:limit]
+    def get_feed_page(self, user_id: int, limit: int = 20, cursor: str | None = None) -> list[dict]:
+        """The id, author and created_at of each item `get_feed()` would return."""
+        return [{"id": e["id"], "user_id": e["user_id"], "created_at": e["created_at"]}
+                for e in self._feed_page(user_id, limit, cursor)]
+
+    def get_feed_items(self, event_ids: list[int], viewer_id: int | None = None) -> list[dict]:
+        """Feed items for these events, in order (events deleted since are skipped)."""
+        events = [e for e in map(self._feed_event_index.get, event_ids) if e is not None]
+        return self._feed_events_to_items(events, viewer_id=viewer_id)
+
+    def _feed_page(self, user_id: int, limit: int, cursor: str | None) -> list[dict]:
+        """The events of one feed page, newest first.
+
+        Reads the precomputed home timeline (at most `STELI_TIMELINE_LENGTH` entries)
+        merged with the recent events of any followed high-fan-out authors. `cursor`
+        (created_at, id) continues after the last item of the previous page.
+        """
+        key = decode_cursor(cursor, 2)
+        before_id = key[1] if key else None
+        following = self._following.get(user_id, ())
+        pull_authors = self.timelines.pull_authors
+        candidates = pull_authors if len(pull_authors) < len(following) else following
+        pulled = []
+        for a in tuple(candidates):
+            if a in pull_authors and (user_id, a) in self.follows:
+                ids = self._author_events.get(a, ())
+                if before_id is not None:
+                    ids = ids[:bisect.bisect_left(ids, before_id)]
+                pulled.append(ids[::-1])
+        events = []
+        for eid in self.timelines.merged(user_id, pulled, before_id):
+            if len(events) >= limit:
+                break
+            e = self._feed_event_index.get(eid)
+            if e is None or e["user_id"] == user_id:
+                continue
+            events.append(e)
+        return events
+
+    @staticmethod
+    def _ids_before(ids: tuple[int, ...], before: int | None) -> Iterator[int]:
+        """Ids of a sorted list that are below `before` (all if None), newest first."""
+        end = bisect.bisect_left(ids, before) if before is not None else len(ids)
+        for i in range(end - 1, -1, -1):
+            yield ids[i]
+
+    def get_recent_rankings(self, limit: int = 20, viewer_id: int | None = None, cursor: str | None = None):
+        """Recent feed: sorted by recency (newest first). One entry per new ranking action.
+
+        Only events the viewer may see (see `is_profile_visible`) are returned: public
+        authors' events merged with those of private authors the viewer follows and the
+        viewer's own. `cursor` (created_at, id) continues after the previous page.
+        """
+        key = decode_cursor(cursor, 2)
+        before_id = key[1] if key else None
+        # Lock-free: the id lists are immutable tuples; an event trimmed since is skipped.
+        sources = [self._ids_before(self._public_events, before_id)]
+        if viewer_id is not None:
+            for author_id in (viewer_id, *self._following.get(viewer_id, ())):
+                author = self.users.get(author_id)
+                own = self._author_events.get(author_id)
+                if author and not author.get("is_public", False) and own:
+                    sources.append(self._ids_before(own, before_id))
+        events = []
+        last = None
+        for eid in heapq.merge(*sources, reverse=True):
+            if len(events) >= limit:
+                break
+            e = self._feed_event_index.get(eid)
+            if eid == last or e is None:
+                continue
+            last = eid
+            events.append(e)
         return self._feed_events_to_items(events, viewer_id=viewer_id)
 
+    @_durable
     def record_pairwise_result(self, user_id: int, winner_spot_name: str, loser_spot_name: str):
-        """Record a pairwise comparison outcome as a feed event (does not change rankings)."""
-        with self._lock:
+        """Record a pairwise comparison outcome: it updates the spots' pairwise ratings and
+        is posted as a feed event (the user's ranked list is unchanged)."""
+        with self._writing("rankings", "feed", read=("users", "social")):
             winner = self._get_or_create_spot_unlocked(winner_spot_name, "")
             loser = self._get_or_create_spot_unlocked(loser_spot_name, "")
-            now_iso = datetime.now(timezone.utc).isoformat()
+            now = datetime.now(timezone.utc)
+            comparison = [user_id, winner["id"], loser["id"], now.timestamp()]
+            self.pairwise.record(*comparison)
+            self.matchups.compared(user_id, winner["id"], loser["id"])
+            self._journal("append", "comparisons", comparison)
+            now_iso = now.isoformat()
             event_id = self._next_feed_event_id
             self._next_feed_event_id += 1
-            self.feed_events.append(
-                {
-                    "id": event_id,
-                    "user_id": user_id,
-                    "created_at": now_iso,
-                    "kind": "compare",
-                    "spot": {"id": winner["id"], "name": winner["name"], "category": winner.get("category", "")},
-                    "score": 0.0,
-                    "tier": "—",
-                    "meta": {"loser": {"id": loser["id"], "name": loser["name"]}},
-                }
-            )
-            if len(self.feed_events) > 500:
-                self.feed_events = self.feed_events[-500:]
+            event = {
+                "id": event_id,
+                "user_id": user_id,
+                "created_at": now_iso,
+                "kind": "compare",
+                "spot": {"id": winner["id"], "name": winner["name"], "category": winner.get("category", "")},
+                "score": 0.0,
+                "tier": "—",
+                "meta": {"loser": {"id": loser["id"], "name": loser["name"]}},
+            }
+            self._add_feed_event(event)
+            self._journal("append", "feed_events", event)
+            if self._trim_feed_events(500):
+                self._journal("trim", "feed_events", 500)
             self._persist()
             return {"winner": winner, "loser": loser}
 
     # ── Pairwise Matchups (Rank screen) ────────────────────────────
 
     def get_matchup(self, user_id: int):
-        """Return two random spots for the user to compare."""
-        spot_list = list(self.spots.values())
-        if len(spot_list) < 2:
-            return None
-        pair = random.sample(spot_list, 2)
-        return {"spot_a": pair[0], "spot_b": pair[1]}
+        """Return two spots for the user to compare: the most informative pair of spots
+        they ranked (see `app/matchups.py`), or random ones until they ranked two."""
+        with self._locks.read("rankings"):
+            pair = self.matchups.pick(user_id)
+            if pair is None:
+                if len(self.spots) < 2:
+                    return None
+                # Spot ids are handed out in order and never deleted, so a random id is
+                # almost always a spot.
+                pair = self.matchups.ranked(user_id)[:1]
+                while len(pair) < 2:
+                    spot_id = random.randrange(1, self._next_spot_id)
+                    if spot_id in self.spots and spot_id not in pair:
+                        pair.append(spot_id)
+            return {"spot_a": self.spots[pair[0]], "spot_b": self.spots[pair[1]]}
+
+
+_singleton_lock = threading.Lock()
+
+
+def __getattr__(name: str):
+    """`store`, the app's Store, is created (and seeded if empty) on first use of the
+    name, so importing the module for `Store` alone loads nothing."""
+    global store
+    if name != "store":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _singleton_lock:
+        if "store" not in globals():
+            store = Store()
+            _seed()
+    return store
 
 
-store = Store()
+def _seed():
+    """Populate an empty store with data matching the app mockups.
 
+    In multi-worker mode the first worker to take the write lock seeds; the others
+    catch up on its records and find the users already there.
+    """
+    with store._shared_write():
+        if not store.users:
+            _seed_demo_data()
 
-def _seed():
-    """Populate the store with data matching the app mockups."""
 
-    if store.users:
-        return
+def _seed_demo_data():
     now = datetime.now(timezone.utc)
 
     # ── Study Spots (pre-create with categories) ───────────────────
@@ -872,10 +2067,9 @@ def _seed():
     ])
 
     # ── Follows (social graph) ─────────────────────────────────────
-    # Seed follows bypass the request flow (directly add to follows set).
+    # Seed follows bypass the request flow (directly add to the follow graph).
     # alex_zhang follows everyone (so the home feed shows all users)
-    for i in range(1, len(created)):
-        store.follows.add((created[0]["id"], created[i]["id"]))
+    seed_follows = [(created[0]["id"], created[i]["id"]) for i in range(1, len(created))]
 
     # Build out the rest of the social graph
     follow_pairs = [
@@ -894,14 +2088,14 @@ def _seed():
         # chris follows alex, mike, jordan
         (8, 1), (8, 3), (8, 6),
     ]
-    for follower, following in follow_pairs:
-        store.follows.add((follower, following))
-    store._persist()
+    with store._writing("social", "feed"):
+        for follower, following in seed_follows + follow_pairs:
+            store._add_follow(follower, following)
+            store._journal("add", "follows", [follower, following])
+        store._persist()
+    store._await_commit()
 
     # Extra follows to get alex_zhang closer to 47 followers / 32 following
     # alex_zhang already follows 7 people; add more dummy follow relationships
     # to bump the numbers shown in the mockup (47 followers, 32 following, 23 ranked)
     # Since we only have 8 users, the exact counts won't match, but the structure is right.
-
-
-_seed()
@@ -0,0 +1,29 @@
+"""Score -> tier / rating mapping shared by every storage backend."""
+
+# Beli-style ranges: Bad / Okay / Good (same boundaries as client).
+BAD_MAX = 10.0 / 3
+OKAY_MAX = 20.0 / 3
+
+
+def score_to_tier(score: float) -> str:
+    """Convert a numeric score to a letter tier."""
+    if score >= 9.0:
+        return "S"
+    elif score >= 8.0:
+        return "A"
+    elif score >= 7.0:
+        return "B"
+    elif score >= 6.0:
+        return "C"
+    elif score >= 5.0:
+        return "D"
+    return "F"
+
+
+def score_to_rating(score: float) -> str:
+    """Beli-style: bad / okay / good (for same-range comparison)."""
+    if score < BAD_MAX:
+        return "bad"
+    if score < OKAY_MAX:
+        return "okay"
+    return "good"
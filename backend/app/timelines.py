@@ -0,0 +1,75 @@
+"""Precomputed home timelines (fan-out on write, fan-out on read for big accounts)."""
+
+import bisect
+import heapq
+from collections import deque
+from typing import Callable, Iterable
+
+
+class Timelines:
+    """Per-user bounded lists of feed event ids, newest first.
+
+    New events are pushed into each follower's timeline when written. Authors with
+    more than `fanout_limit` followers are instead merged in at read time; once an
+    author crosses the limit they stay in that set, so nothing pushed earlier is
+    lost and nothing is shown twice (reads de-duplicate).
+
+    Event ids are allocated in creation order, so ordering by id is ordering by time.
+    Mutate only with the store's feed write lock held. `ids()` and `merged()` may run
+    without it: each deque is copied in one (GIL-atomic) step or swapped out whole.
+    """
+
+    def __init__(self, max_len: int = 200, fanout_limit: int = 1000):
+        self.max_len = max_len
+        self.fanout_limit = fanout_limit
+        self._lines: dict[int, deque[int]] = {}
+        self.pull_authors: set[int] = set()
+
+    def clear(self):
+        self._lines = {}
+        self.pull_authors = set()
+
+    def is_pull_author(self, author_id: int, follower_count: int) -> bool:
+        if follower_count > self.fanout_limit:
+            self.pull_authors.add(author_id)
+        return author_id in self.pull_authors
+
+    def push(self, follower_ids: Iterable[int], event_id: int):
+        for uid in follower_ids:
+            line = self._lines.get(uid)
+            if line is None:
+                line = self._lines[uid] = deque(maxlen=self.max_len)
+            line.appendleft(event_id)
+
+    def backfill(self, user_id: int, event_ids: Iterable[int]):
+        """Merge an author's event ids (any order) into a user's timeline."""
+        line = self._lines.get(user_id, ())
+        merged = heapq.nlargest(self.max_len, set(line).union(event_ids))
+        if merged:
+            self._lines[user_id] = deque(merged, maxlen=self.max_len)
+
+    def purge(self, user_id: int, drop: Callable[[int], bool]):
+        line = self._lines.get(user_id)
+        if line is None:
+            return
+        kept = [eid for eid in line if not drop(eid)]
+        if kept:
+            self._lines[user_id] = deque(kept, maxlen=self.max_len)
+        else:
+            del self._lines[user_id]
+
+    def ids(self, user_id: int) -> list[int]:
+        """Snapshot of a user's pushed timeline, newest first."""
+        return list(self._lines.get(user_id, ()))
+
+    def merged(self, user_id: int, pulled: Iterable[list[int]], before: int | None = None) -> Iterable[int]:
+        """Pushed ids (older than `before`, if given) merged with pulled authors' id lists
+        (each newest first), de-duplicated."""
+        pushed = self.ids(user_id)
+        if before is not None:
+            pushed = pushed[bisect.bisect_right(pushed, -before, key=lambda eid: -eid):]
+        last = None
+        for eid in heapq.merge(pushed, *pulled, reverse=True):
+            if eid != last:
+                yield eid
+                last = eid
@@ -0,0 +1,49 @@
+"""Per-entity version counters behind the ETags of the cached read endpoints (app/etags.py).
+
+An entity is a (kind, id) pair whose version changes whenever something it renders to
+changes:
+
+    ("spots", 0)        the spot list
+    ("user", id)        a profile card: names, photo, privacy, follow counts and requests,
+                        ranked count
+    ("profile", 0)      any user's name or photo (shown on feed items and comments)
+    ("rankings", id)    a user's ranked list and their own comparisons
+    ("event", id)       a feed event's likes and comments
+    ("pairwise", 0)     outcomes covered by the fitted Bradley-Terry strengths
+
+Readers take versions before data, so a body is never older than the versions it is
+stamped with. Counters may restart (the JSON store keeps them in memory), so each set
+comes with an epoch that changes when they do.
+"""
+
+import secrets
+import threading
+from typing import Iterable
+
+PAIRWISE = ("pairwise", 0)
+PROFILES = ("profile", 0)
+SPOTS = ("spots", 0)
+
+
+class EntityVersions:
+    """In-memory counters for the JSON store. Thread-safe."""
+
+    def __init__(self):
+        self._versions: dict[tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+        self.epoch = secrets.token_hex(4)
+
+    def clear(self):
+        """Forget every counter; a fresh epoch keeps old ETags from matching."""
+        with self._lock:
+            self._versions = {}
+            self.epoch = secrets.token_hex(4)
+
+    def bump(self, *keys: tuple[str, int]):
+        with self._lock:
+            for key in keys:
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def get(self, keys: Iterable[tuple[str, int]]) -> tuple[int, ...]:
+        versions = self._versions
+        return tuple(versions.get(key, 0) for key in keys)
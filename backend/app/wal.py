@@ -0,0 +1,180 @@
+"""Encrypted append-only operation log backing the Store."""
+
+import json
+import os
+from pathlib import Path
+from typing import Iterator
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from app.metrics import STORE_IO
+
+
+def _swapped(path: Path, fh) -> bool:
+    """Whether `path` no longer names the file open as `fh`."""
+    try:
+        return os.stat(path).st_ino != os.fstat(fh.fileno()).st_ino
+    except FileNotFoundError:
+        return True
+
+
+class WriteAheadLog:
+    """One Fernet token per line; each line decrypts to a JSON record.
+
+    Records are only ever appended. A torn final line (crash mid-write) is
+    detected on replay and truncated away so later appends start clean.
+    """
+
+    def __init__(self, path: Path, fernet: Fernet):
+        self._path = path
+        self._fernet = fernet
+        self._fh = None
+        self.records = 0  # records appended since the last reset
+
+    def _handle(self):
+        if self._fh is not None and _swapped(self._path, self._fh):
+            # Another process checkpointed and swapped in a fresh log (see `reset`).
+            self.close()
+        if self._fh is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = self._path.open("ab")
+        return self._fh
+
+    def append(self, payloads: list[bytes], fsync: bool = True) -> int:
+        """Encrypt and append serialized JSON records with a single flush (and fsync).
+
+        Returns the number of bytes written.
+        """
+        with STORE_IO.time("wal_encrypt"):
+            lines = b"".join(self._fernet.encrypt(p) + b"\n" for p in payloads)
+        f = self._handle()
+        with STORE_IO.time("wal_write"):
+            f.write(lines)
+            f.flush()
+        if fsync:
+            with STORE_IO.time("wal_fsync"):
+                os.fsync(f.fileno())
+        self.records += len(payloads)
+        return len(lines)
+
+    def sync(self) -> None:
+        if self._fh is not None:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+
+    def replay(self) -> Iterator[dict]:
+        """Yield every intact record in append order."""
+        if not self._path.exists():
+            return
+        raw = self._path.read_bytes()
+        valid_end = 0
+        count = 0
+        for line in raw.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(self._fernet.decrypt(line.strip()).decode("utf-8"))
+            except (InvalidToken, ValueError):
+                break
+            valid_end += len(line)
+            count += 1
+            yield record
+        if valid_end < len(raw):
+            self.close()
+            with self._path.open("r+b") as f:
+                f.truncate(valid_end)
+                f.flush()
+                os.fsync(f.fileno())
+        self.records = count
+
+    def reset(self, header: bytes | None = None) -> None:
+        """Drop all records (called once they are covered by a snapshot).
+
+        The file is replaced rather than truncated, so another process still reading the
+        old one (`WalTail`) can finish it. `header`, if given, becomes its first record.
+        """
+        self.close()
+        tmp_path = self._path.with_name(self._path.name + ".tmp")
+        with tmp_path.open("wb") as f:
+            if header is not None:
+                f.write(self._fernet.encrypt(header) + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(self._path)
+        self.records = 0
+
+    def size_bytes(self) -> int:
+        return self._path.stat().st_size if self._path.exists() else 0
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+class WalTail:
+    """Reads the records other processes append to the log (multi-worker mode).
+
+    Keeps its own read handle and position. When a checkpoint swaps the log out
+    (`WriteAheadLog.reset`), the old file is drained before moving on to the new one.
+    Callers serialize `read()`; `changed()` may be called from any thread.
+    """
+
+    def __init__(self, path: Path, fernet: Fernet):
+        self._path = path
+        self._fernet = fernet
+        self._fh = None
+        self._ino: int | None = None
+        self._pos = 0
+        self._partial = b""
+
+    def open(self, at_end: bool = True) -> None:
+        """Start following the current log file, from its end or its beginning."""
+        self.close()
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._path.touch(exist_ok=True)
+        self._fh = self._path.open("rb")
+        self._ino = os.fstat(self._fh.fileno()).st_ino
+        self._pos = self._fh.seek(0, os.SEEK_END) if at_end else 0
+        self._partial = b""
+
+    def changed(self) -> bool:
+        """Cheap check (one stat) for appended records or a swapped log."""
+        try:
+            st = os.stat(self._path)
+        except FileNotFoundError:
+            return False
+        return st.st_ino != self._ino or st.st_size != self._pos
+
+    def read(self) -> tuple[list[dict], bool]:
+        """Records appended since the last call, and whether the log was swapped meanwhile.
+
+        A record still being written is left for the next call. Raises InvalidToken or
+        ValueError if the log holds something unreadable.
+        """
+        records: list[dict] = []
+        swapped = False
+        while True:
+            try:
+                ino = os.stat(self._path).st_ino
+            except FileNotFoundError:
+                ino = self._ino
+            # Everything appended to the old file happened before it was swapped out,
+            # i.e. before the stat above, so this drains it completely.
+            records.extend(self._drain())
+            if ino == self._ino:
+                return records, swapped
+            self.open(at_end=False)
+            swapped = True
+
+    def _drain(self) -> list[dict]:
+        data = self._fh.read()
+        self._pos += len(data)
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        return [json.loads(self._fernet.decrypt(line).decode("utf-8")) for line in lines if line]
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
@@ -0,0 +1,111 @@
+"""Read throughput against concurrent writes at increasing reader thread counts.
+
+    python -m benchmarks.contention [--users 200] [--seconds 3] [--writers 2] [--durability strict] [--threads 1,2,4,8,16]
+
+Builds a throwaway store (users following each other, rankings, public and private
+authors), keeps `--writers` threads liking, commenting and following for the whole run,
+and prints one line per reader thread count: feed + recent reads/sec, p50/p99 read
+latency and the writes/sec achieved alongside.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _populate(store, users: int, rng: random.Random) -> list[int]:
+    ids = [store.create_user(f"reader{i}", "benchmark-password", "Bench", str(i))["id"] for i in range(users)]
+    for uid in ids[::2]:
+        store.update_privacy(uid, True)
+    for uid in ids:
+        for other in rng.sample(ids, min(20, len(ids))):
+            if other != uid:
+                store.follow(uid, other)
+                store.approve_follow_request(other, uid)
+        store.set_rankings(uid, [
+            {"spot_name": f"Spot {n}", "score": round(rng.uniform(0, 10), 1)}
+            for n in rng.sample(range(60), 5)
+        ])
+    return ids
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--durability", default="strict", choices=("strict", "group", "relaxed"))
+    parser.add_argument("--threads", default="1,2,4,8,16")
+    args = parser.parse_args(argv)
+
+    # Configure the store before it is imported (it is created at import time).
+    os.environ["STELI_DATA_DIR"] = tempfile.mkdtemp(prefix="steli-bench-")
+    os.environ["STELI_DURABILITY"] = args.durability
+    os.environ.setdefault("STELI_BCRYPT_ROUNDS", "4")
+    from app.store import store
+
+    rng = random.Random(0)
+    user_ids = _populate(store, args.users, rng)
+
+    print("readers  reads/s  p50_ms  p99_ms  writes/s")
+    for level in [int(t) for t in args.threads.split(",")]:
+        latencies: list[float] = []
+        writes = 0
+        lock = threading.Lock()
+        stop = threading.Event()
+        deadline = time.perf_counter() + args.seconds
+
+        def writer(seed: int):
+            nonlocal writes
+            r = random.Random(seed)
+            done = 0
+            while not stop.is_set():
+                uid, other = r.choice(user_ids), r.choice(user_ids)
+                events = store.get_recent_rankings(20, viewer_id=uid)
+                if events and done % 3 == 0:
+                    store.toggle_like(r.choice(events)["id"], uid)
+                elif events and done % 3 == 1:
+                    store.add_comment(r.choice(events)["id"], uid, "benchmark comment")
+                elif uid != other:
+                    store.follow(uid, other)
+                done += 1
+            with lock:
+                writes += done
+
+        def reader(offset: int):
+            r = random.Random(offset)
+            local: list[float] = []
+            while time.perf_counter() < deadline:
+                uid = r.choice(user_ids)
+                start = time.perf_counter()
+                store.get_feed(uid, 20)
+                store.get_recent_rankings(20, viewer_id=uid)
+                local.append(time.perf_counter() - start)
+            with lock:
+                latencies.extend(local)
+
+        writer_threads = [threading.Thread(target=writer, args=(level * 100 + i,)) for i in range(args.writers)]
+        for t in writer_threads:
+            t.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            list(pool.map(reader, range(level)))
+        wall = time.perf_counter() - started
+        stop.set()
+        for t in writer_threads:
+            t.join()
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1000 if latencies else 0.0
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0
+        print(f"{level:>7}  {len(latencies) / wall:>7.1f}  {p50:>6.2f}  {p99:>6.2f}  {writes / wall:>8.1f}")
+    store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""Deterministic synthetic data for the benchmarks, at any size.
+
+    from benchmarks.dataset import DatasetSpec, generate
+    data = generate(store, DatasetSpec(users=10000))
+
+Everything goes through the store's public methods, so indexes, feed timelines and the
+WAL look exactly as they would after real traffic. The same spec (seed included) always
+makes the same calls in the same order; only timestamps and password salts differ.
+
+Shape of the data:
+  - follows: out-degrees are Pareto(2) distributed with mean `follows`; targets are
+    drawn by Zipf(`follow_skew`) popularity, so a few users collect most followers.
+    Follows of private users become requests, of which 80% are approved.
+  - rankings: about `rankings` spots per user, picked by Zipf(1) spot popularity and
+    scored around a per-spot quality, added in `events` batches (one feed event each).
+  - engagement: about `likes` likes and `comments` comments per feed event, on the
+    events still kept once every ranking is in (the store keeps the newest 500 events
+    and 5000 comments), and `comparisons` pairwise outcomes per user.
+  - photos: a `photos` fraction of ranked items carry a JPEG of about `photo_kb` KB,
+    drawn from a pool of 16 distinct images.
+"""
+
+import argparse
+import base64
+import bisect
+import io
+import itertools
+import random
+from typing import NamedTuple
+
+FIRST_NAMES = ("maya", "liam", "noah", "emma", "olivia", "ava", "lucas", "mia", "ethan", "zoe",
+               "arjun", "priya", "wei", "yuki", "omar", "sara", "leo", "nina", "ivan", "chloe")
+LAST_NAMES = ("chen", "smith", "patel", "kim", "garcia", "nguyen", "brown", "singh", "lee", "wong",
+              "martin", "khan", "lopez", "wilson", "tanaka", "ali", "clark", "davis", "ross", "young")
+SPOT_WORDS = ("Quiet", "Sunny", "Upper", "North", "Corner", "Silent", "Group", "Garden", "Annex", "Loft")
+CATEGORIES = ("Library", "Cafe", "Academic Building", "Student Center", "Outdoors", "Recreation")
+PHOTO_POOL = 16
+
+
+class DatasetSpec(NamedTuple):
+    users: int = 1000
+    spots: int = 300
+    follows: float = 20.0  # mean out-degree
+    follow_skew: float = 1.1  # Zipf exponent of follow-target popularity
+    public: float = 0.7  # fraction of public accounts
+    rankings: int = 10  # mean spots ranked per user
+    events: int = 3  # ranking batches (feed events) per user
+    likes: float = 3.0  # mean per feed event
+    comments: float = 1.0  # mean per feed event
+    comparisons: int = 5  # per user
+    photos: float = 0.1  # fraction of ranked items with a photo
+    photo_kb: int = 20
+    seed: int = 0
+
+
+class Dataset(NamedTuple):
+    user_ids: list[int]
+    usernames: list[str]
+    spot_names: list[str]
+    event_ids: list[int]
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """One `--option` per `DatasetSpec` field, defaulting to the spec's defaults."""
+    group = parser.add_argument_group("dataset")
+    for field, default in DatasetSpec._field_defaults.items():
+        group.add_argument(f"--{field.replace('_', '-')}", type=type(default), default=default)
+
+
+def spec_from_args(args: argparse.Namespace) -> DatasetSpec:
+    return DatasetSpec(**{field: getattr(args, field) for field in DatasetSpec._fields})
+
+
+def _zipf_cum_weights(n: int, skew: float) -> list[float]:
+    return list(itertools.accumulate(1.0 / (rank + 1) ** skew for rank in range(n)))
+
+
+def _draw_distinct(rng: random.Random, population: list, cum_weights: list[float], k: int, exclude=None) -> list:
+    """`k` distinct items by weight (fewer if the population runs out)."""
+    k = min(k, len(population) - (exclude is not None))
+    chosen: dict = {}
+    total = cum_weights[-1]
+    while len(chosen) < k:
+        item = population[bisect.bisect(cum_weights, rng.random() * total)]
+        if item != exclude:
+            chosen[item] = None
+    return list(chosen)
+
+
+def photo_pool(rng: random.Random, kb: int, count: int = PHOTO_POOL) -> list[str]:
+    """`count` distinct noise JPEGs of about `kb` KB each, as data URLs."""
+    from PIL import Image
+
+    side = max(8, int((kb * 1024 / 1.2) ** 0.5))  # noise compresses to ~1.2 bytes/pixel at q82
+    urls = []
+    for _ in range(count):
+        img = Image.frombytes("RGB", (side, side), rng.randbytes(side * side * 3))
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=82)
+        urls.append("data:image/jpeg;base64," + base64.b64encode(buf.getvalue()).decode("ascii"))
+    return urls
+
+
+def generate(store, spec: DatasetSpec, password: str = "benchmark-password") -> Dataset:
+    """Populate `store` (usually empty, or holding only the demo seed) according to `spec`."""
+    rng = random.Random(spec.seed)
+
+    usernames = [
+        f"{FIRST_NAMES[i % len(FIRST_NAMES)]}_{LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]}{i}"
+        for i in range(spec.users)
+    ]
+    user_ids = []
+    for name in usernames:
+        first, last = name.split("_")
+        user = store.create_user(name, password, first.title(), last.rstrip("0123456789").title())
+        user_ids.append(user["id"])
+        if rng.random() < spec.public:
+            store.update_privacy(user["id"], True)
+
+    popularity = user_ids[:]
+    rng.shuffle(popularity)
+    follow_weights = _zipf_cum_weights(len(popularity), spec.follow_skew)
+    for uid in user_ids:
+        degree = int(rng.paretovariate(2.0) * spec.follows / 2)
+        for target in _draw_distinct(rng, popularity, follow_weights, degree, exclude=uid):
+            if store.follow(uid, target) == "requested" and rng.random() < 0.8:
+                store.approve_follow_request(target, uid)
+
+    spot_names = [
+        f"{SPOT_WORDS[i % len(SPOT_WORDS)]} {CATEGORIES[i % len(CATEGORIES)]} {i}" for i in range(spec.spots)
+    ]
+    for i, name in enumerate(spot_names):
+        store.get_or_create_spot(name, CATEGORIES[i % len(CATEGORIES)])
+    quality = [rng.uniform(2.0, 9.0) for _ in spot_names]
+    spot_weights = _zipf_cum_weights(len(spot_names), 1.0)
+    photos = photo_pool(rng, spec.photo_kb) if spec.photos > 0 else []
+    for uid in user_ids:
+        count = rng.randint(max(1, spec.rankings // 2), max(1, spec.rankings * 3 // 2))
+        picks = _draw_distinct(rng, list(range(len(spot_names))), spot_weights, count)
+        items = [
+            {
+                "spot_name": spot_names[s],
+                "score": round(min(10.0, max(0.0, rng.gauss(quality[s], 1.5))), 1),
+                "notes": "",
+                "photo_url": rng.choice(photos) if photos and rng.random() < spec.photos else "",
+            }
+            for s in picks
+        ]
+        batch = -(-len(items) // max(1, spec.events))
+        for end in range(batch, len(items) + batch, batch):
+            store.set_rankings(uid, items[:end])
+        for _ in range(spec.comparisons if len(items) > 1 else 0):
+            winner, loser = rng.sample(items, 2)
+            store.record_pairwise_result(uid, winner["spot_name"], loser["spot_name"])
+
+    event_ids = [e["id"] for e in store.feed_events if e.get("kind", "new") == "new"]
+    for eid in event_ids:
+        for uid in rng.sample(user_ids, min(len(user_ids), rng.randint(0, int(2 * spec.likes)))):
+            store.toggle_like(eid, uid)
+        for _ in range(rng.randint(0, int(2 * spec.comments))):
+            store.add_comment(eid, rng.choice(user_ids), "Great spot, the outlets actually work")
+
+    return Dataset(user_ids, usernames, spot_names, event_ids)
@@ -0,0 +1,76 @@
+"""Login throughput at increasing concurrency.
+
+    python -m benchmarks.login [--users 32] [--seconds 3] [--rounds 12] [--concurrency 1,2,4,8,16]
+
+Runs against a throwaway data directory through the real /api/auth/login route and
+prints one line per concurrency level (logins/sec, p50/p99 latency, 503s).
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt work factor")
+    parser.add_argument("--concurrency", default="1,2,4,8,16")
+    args = parser.parse_args(argv)
+
+    # Configure the store before it is imported (it is created at import time).
+    os.environ["STELI_DATA_DIR"] = tempfile.mkdtemp(prefix="steli-bench-")
+    os.environ["STELI_BCRYPT_ROUNDS"] = str(args.rounds)
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.store import store
+
+    password = "benchmark-password"
+    names = [f"bench{i}" for i in range(args.users)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda n: store.create_user(n, password, "Bench", n), names))
+
+    client = TestClient(app)
+    print("concurrency  logins/s  p50_ms  p99_ms  busy_503")
+    for level in [int(c) for c in args.concurrency.split(",")]:
+        latencies: list[float] = []
+        busy = 0
+        lock = threading.Lock()
+        deadline = time.perf_counter() + args.seconds
+
+        def worker(offset: int):
+            nonlocal busy
+            i = offset
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                resp = client.post("/api/auth/login", json={"username": names[i % len(names)], "password": password})
+                elapsed = time.perf_counter() - start
+                with lock:
+                    if resp.status_code == 200:
+                        latencies.append(elapsed)
+                    elif resp.status_code == 503:
+                        busy += 1
+                    else:
+                        raise RuntimeError(f"login failed: {resp.status_code} {resp.text}")
+                i += level
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            list(pool.map(worker, range(level)))
+        wall = time.perf_counter() - started
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1000 if latencies else 0.0
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0
+        print(f"{level:>11}  {len(latencies) / wall:>8.1f}  {p50:>6.1f}  {p99:>6.1f}  {busy:>8}")
+    store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
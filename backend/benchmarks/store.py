@@ -0,0 +1,309 @@
+"""Micro-benchmarks of the Store methods behind the routes, on a synthetic dataset.
+
+    python -m benchmarks.store [--users 1000 ...dataset options] [--durability strict] [--seconds 1]
+                               [--only 'get_feed*,_load'] [--json results.json] [--compare baseline.json]
+
+Builds a throwaway data directory with `benchmarks.dataset` (see `--help` for its
+options), reopens it with the chosen durability and times each method for `--seconds`
+(and at least `--min-runs` calls), spreading calls over users, events and spots. Prints
+mean / p50 / p99 latency per method; `--json` also writes them with the dataset spec and
+environment, and `--compare` flags methods whose p50 grew by more than `--threshold`
+against an earlier `--json` file (exit status 1 if any did).
+"""
+
+import argparse
+import datetime
+import fnmatch
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from benchmarks.dataset import Dataset, add_arguments, generate, photo_pool, spec_from_args
+
+SCHEMA = 1
+SAMPLE = 256  # users (and events) each benchmark cycles through
+
+
+@contextmanager
+def _env(**values: str):
+    old = {key: os.environ.get(key) for key in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for key, value in old.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def _measure(fn, seconds: float, min_runs: int, cleanup=None) -> list[float]:
+    """Seconds taken by each `fn(i)` call; `cleanup(result)` runs untimed after each."""
+    times = []
+    deadline = time.perf_counter() + seconds
+    while len(times) < min_runs or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        result = fn(len(times))
+        times.append(time.perf_counter() - start)
+        if cleanup is not None:
+            cleanup(result)
+    return times
+
+
+def _benchmarks(store, data: Dataset, seed: int) -> dict:
+    """name -> fn(i) (or (fn, cleanup), see `_measure()`), in the order they run: reads,
+    then writes, then persistence. None for what the dataset has nothing to run on."""
+    from app import blobs
+    from app.store import Store
+    from app.versions import PAIRWISE, PROFILES, SPOTS
+
+    rng = random.Random(seed)
+    users = rng.sample(data.user_ids, min(SAMPLE, len(data.user_ids)))
+    names = [store.users[uid]["username"] for uid in users]
+    events = rng.sample(data.event_ids, min(SAMPLE, len(data.event_ids)))
+    spot_ids = [store.spot_names[name.lower()] for name in data.spot_names]
+    tokens = [store.create_token(uid) for uid in users]
+    queries = [name[:n] for name in names[:32] for n in (2, 4)]
+    ranked = [uid for uid in users if len(store.user_rankings.get(uid, ())) >= 2] or users[:1]
+    digests = sorted({d for r in store.rankings.values() if (d := blobs.digest_of(r.get("photo_url")))})
+    liked = [(eid, uid) for eid in events for uid in sorted(store.likes.get(eid, ()))][:SAMPLE]
+
+    def pick(seq: list, i: int):
+        return seq[i % len(seq)]
+
+    def pairs(target_public: bool) -> list[tuple[int, int]]:
+        out = []
+        for _ in range(SAMPLE * 20):
+            a, b = rng.sample(data.user_ids, 2)
+            if (store.users[b]["is_public"] == target_public and store.follow_status(a, b) == "none"
+                    and (a, b) not in out):
+                out.append((a, b))
+            if len(out) == SAMPLE:
+                break
+        return out or [(users[0], users[-1])]
+
+    def stamp_keys(uid: int) -> list:
+        page = store.get_feed_page(uid, 20)
+        authors = dict.fromkeys(("rankings", e["user_id"]) for e in page)
+        return [PROFILES, SPOTS, PAIRWISE, *(("event", e["id"]) for e in page), *authors]
+
+    feed_pages = {uid: [e["id"] for e in store.get_feed_page(uid, 20)] for uid in users}
+    version_keys = {uid: stamp_keys(uid) for uid in users}
+    lists = {}
+    for uid in ranked:
+        lists[uid] = [
+            {"spot_name": r["spot"]["name"], "score": r["score"], "notes": r["notes"], "photo_url": r["photo_url"]}
+            for r in store.get_user_rankings(uid)
+        ]
+    public_pairs, private_pairs = pairs(True), pairs(False)
+    new_photos = photo_pool(random.Random(seed + 1), 20, count=2)
+
+    def set_rankings(i: int):
+        uid = pick(ranked, i // 2)
+        items = lists[uid]
+        if i % 2 == 0:
+            score = items[0]["score"]
+            items = [{**items[0], "score": score - 0.1 if score >= 0.1 else score + 0.1}, *items[1:]]
+        store.set_rankings(uid, items)
+
+    def patch_rankings(i: int):
+        uid = pick(ranked, i)
+        order = store.user_rankings[uid]
+        store.patch_rankings(uid, store.ranking_version(uid), [{"op": "move", "ranking_id": order[-1], "position": 0}])
+
+    def follow_unfollow(i: int):
+        a, b = pick(public_pairs, i // 2)
+        (store.follow if i % 2 == 0 else store.unfollow)(a, b)
+
+    def follow_request_deny(i: int):
+        a, b = pick(private_pairs, i // 2)
+        if i % 2 == 0:
+            store.follow(a, b)
+        else:
+            store.deny_follow_request(b, a)
+
+    def create_delete_token(i: int):
+        store.delete_token(store.create_token(pick(users, i)))
+
+    def persist(i: int):
+        # Journals an existing like again (a no-op on replay), so only the commit path runs.
+        eid, uid = pick(liked, i)
+        with store._writing("engagement"):
+            store._journal("add", "likes", eid, uid)
+            store._persist()
+        store._await_commit()
+
+    load_dir = Path(tempfile.mkdtemp(prefix="steli-bench-load-")) / "data"
+    store._checkpoint()
+    shutil.copytree(store._data_dir, load_dir)
+
+    def load(i: int):
+        with _env(STELI_DATA_DIR=str(load_dir), STELI_DURABILITY="strict"):
+            return Store()
+
+    return {
+        # Reads
+        "get_user_by_token": lambda i: store.get_user_by_token(pick(tokens, i)),
+        "get_user_by_username": lambda i: store.get_user_by_username(pick(names, i)),
+        "verify_user": lambda i: store.verify_user(pick(names, i), "benchmark-password"),
+        "search_users": lambda i: store.search_users(pick(queries, i), 20),
+        "user_cards": lambda i: store.user_cards(
+            [f["id"] for f in store.get_following(pick(users, i), 20)], pick(users, i + 1)
+        ),
+        "is_profile_visible": lambda i: store.is_profile_visible(pick(users, i), pick(users, i + 1)),
+        "follow_status": lambda i: store.follow_status(pick(users, i), pick(users, i + 1)),
+        "get_followers": lambda i: store.get_followers(pick(users, i), 50),
+        "get_following": lambda i: store.get_following(pick(users, i), 50),
+        "get_pending_follow_requests": lambda i: store.get_pending_follow_requests(pick(users, i)),
+        "get_follow_suggestions": lambda i: store.get_follow_suggestions(pick(users, i), 10),
+        "list_spots": lambda i: store.list_spots(),
+        "search_spots": lambda i: store.search_spots(pick(data.spot_names, i)[:3], 20),
+        "get_leaderboard": lambda i: store.get_leaderboard("", 10),
+        "get_recommended_spots": lambda i: store.get_recommended_spots(pick(users, i), 10),
+        "pairwise_rating": lambda i: store.pairwise_rating(pick(spot_ids, i)),
+        "get_user_rankings": lambda i: store.get_user_rankings(pick(users, i)),
+        "ranking_version": lambda i: store.ranking_version(pick(users, i)),
+        "get_matchup": lambda i: store.get_matchup(pick(ranked, i)),
+        "get_feed": lambda i: store.get_feed(pick(users, i), 20),
+        "get_feed_page": lambda i: store.get_feed_page(pick(users, i), 20),
+        "get_feed_items": lambda i: store.get_feed_items(feed_pages[pick(users, i)], pick(users, i)),
+        "entity_versions": lambda i: store.entity_versions(version_keys[pick(users, i)]),
+        "get_recent_rankings": lambda i: store.get_recent_rankings(20, pick(users, i)),
+        "get_comments": lambda i: store.get_comments(pick(events, i), 20),
+        "get_blob": (lambda i: store.get_blob(pick(digests, i))) if digests else None,
+        # Writes
+        "create_user": lambda i: store.create_user(f"bench_new{i}", "benchmark-password", "Bench", str(i)),
+        "create_token+delete_token": create_delete_token,
+        "update_profile_photo": lambda i: store.update_profile_photo(pick(users, i), pick(new_photos, i)),
+        "update_privacy": lambda i: store.update_privacy(pick(users, i), not store.users[pick(users, i)]["is_public"]),
+        "follow+unfollow": follow_unfollow,
+        "follow+deny_follow_request": follow_request_deny,
+        "get_or_create_spot": lambda i: store.get_or_create_spot(f"Bench Spot {i}", "Cafe"),
+        "set_rankings": set_rankings,
+        "patch_rankings": patch_rankings,
+        "record_pairwise_result": lambda i: store.record_pairwise_result(
+            pick(ranked, i), *(lists[pick(ranked, i)][n]["spot_name"] for n in (i % 2, 1 - i % 2))
+        ),
+        "toggle_like": lambda i: store.toggle_like(pick(events, i // 2), pick(users, i // 2)),
+        "add_comment": lambda i: store.add_comment(pick(events, i), pick(users, i), "Quiet until noon, then packed"),
+        # Persistence
+        "_persist": persist if liked else None,
+        "_checkpoint": lambda i: store._checkpoint(),
+        "_load": (load, lambda loaded: loaded.close()),
+    }
+
+
+def _summary(times: list[float]) -> dict:
+    times = sorted(times)
+    mean = statistics.fmean(times)
+    return {
+        "runs": len(times),
+        "mean_us": round(mean * 1e6, 2),
+        "p50_us": round(statistics.median(times) * 1e6, 2),
+        "p99_us": round(times[max(0, int(len(times) * 0.99) - 1)] * 1e6, 2),
+        "ops_per_sec": round(1 / mean, 1) if mean else None,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=Path(__file__).resolve().parent,
+        )
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--durability", default="strict", choices=("strict", "group", "relaxed"))
+    parser.add_argument("--seconds", type=float, default=1.0, help="per benchmark")
+    parser.add_argument("--min-runs", type=int, default=5)
+    parser.add_argument("--only", default="", help="comma-separated name patterns, e.g. 'get_feed*,_load'")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON ('-' for stdout)")
+    parser.add_argument("--compare", metavar="PATH", help="a previous --json file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="p50 slowdown counted as a regression")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    spec = spec_from_args(args)
+
+    # Configure the store before it is imported (it is created at import time). The
+    # dataset is built without fsyncs, then reopened with the durability under test.
+    data_dir = tempfile.mkdtemp(prefix="steli-bench-")
+    os.environ["STELI_DATA_DIR"] = data_dir
+    os.environ["STELI_DURABILITY"] = "relaxed"
+    os.environ.setdefault("STELI_BCRYPT_ROUNDS", "4")
+    from app import store as store_module
+
+    started = time.perf_counter()
+    data = generate(store_module.store, spec)
+    store_module.store._checkpoint()
+    store_module.store.close()
+    os.environ["STELI_DURABILITY"] = args.durability
+    store = store_module.Store()
+    log = sys.stderr if args.json == "-" else sys.stdout
+    print(f"dataset: {len(store.users)} users, {len(store.follows)} follows, {len(store.rankings)} rankings, "
+          f"{len(store.feed_events)} events, {len(store.comments)} comments "
+          f"(built in {time.perf_counter() - started:.1f}s)", file=log)
+
+    baseline = {}
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+    patterns = [p for p in args.only.split(",") if p]
+    results = {}
+    regressions = []
+    print(f"{'benchmark':<28}  {'runs':>6}  {'mean_us':>10}  {'p50_us':>10}  {'p99_us':>10}  {'ops/s':>10}"
+          + ("  vs_base" if baseline else ""), file=log)
+    for name, fn in _benchmarks(store, data, spec.seed).items():
+        if fn is None or (patterns and not any(fnmatch.fnmatchcase(name, p) for p in patterns)):
+            continue
+        fn, cleanup = fn if isinstance(fn, tuple) else (fn, None)
+        result = results[name] = _summary(_measure(fn, args.seconds, args.min_runs, cleanup))
+        line = (f"{name:<28}  {result['runs']:>6}  {result['mean_us']:>10.1f}  {result['p50_us']:>10.1f}  "
+                f"{result['p99_us']:>10.1f}  {result['ops_per_sec']:>10.1f}")
+        base = baseline.get(name)
+        if base:
+            change = result["p50_us"] / base["p50_us"] - 1
+            line += f"  {change:>+7.1%}"
+            if change > args.threshold:
+                regressions.append(name)
+                line += "  REGRESSED"
+        print(line, file=log)
+    store.close()
+
+    if args.json:
+        doc = json.dumps({
+            "schema": SCHEMA,
+            "suite": "store",
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "durability": args.durability,
+            "dataset": spec._asdict(),
+            "results": results,
+        }, indent=2)
+        if args.json == "-":
+            print(doc)
+        else:
+            Path(args.json).write_text(doc + "\n")
+    if regressions:
+        print(f"regressed by more than {args.threshold:.0%}: {', '.join(regressions)}", file=log)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
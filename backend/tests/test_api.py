@@ -0,0 +1,86 @@
+"""HTTP behaviour of the ranking PATCH and the cursor-paged list endpoints."""
+
+import itertools
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.pagination import NEXT_CURSOR_HEADER
+from app.ranking_ops import RANKINGS_VERSION_HEADER
+
+_names = itertools.count()
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    # The facade picks its store when app.main is first imported, so the environment has
+    # to be in place before that.
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("STELI_DATA_DIR", str(tmp_path_factory.mktemp("data")))
+        mp.setenv("STELI_STORAGE", "json")
+        mp.setenv("STELI_BCRYPT_ROUNDS", "4")
+        mp.setenv("STELI_DURABILITY", "strict")
+        mp.delenv("STELI_MULTI_WORKER", raising=False)
+        from app.main import app
+
+        with TestClient(app) as c:
+            yield c
+
+
+def _register(client, public=False):
+    username = f"tester{next(_names)}"
+    r = client.post("/api/auth/register", json={
+        "username": username, "password": "password123", "first_name": "Test", "last_name": "User",
+    })
+    assert r.status_code == 200, r.text
+    headers = {"Authorization": f"Bearer {r.json()['token']}"}
+    if public:
+        assert client.put("/api/users/me/privacy", json={"is_public": True}, headers=headers).status_code == 200
+    return username, headers
+
+
+def test_patch_with_stale_version_answers_409(client):
+    username, auth = _register(client)
+    assert client.put("/api/rankings", json={"rankings": [{"spot_name": "First"}]}, headers=auth).status_code == 200
+    r = client.get(f"/api/rankings/user/{username}", headers=auth)
+    assert r.status_code == 200, r.text
+    seen = int(r.headers[RANKINGS_VERSION_HEADER])
+
+    ok = client.patch("/api/rankings", json={"version": seen, "ops": [{"op": "insert", "spot_name": "Second"}]},
+                      headers=auth)
+    assert ok.status_code == 200, ok.text
+    current = int(ok.headers[RANKINGS_VERSION_HEADER])
+    assert current == seen + 1
+
+    stale = client.patch("/api/rankings", json={"version": seen, "ops": [{"op": "insert", "spot_name": "Third"}]},
+                         headers=auth)
+    assert stale.status_code == 409
+    assert stale.json()["detail"]["code"] == "RANKINGS_CHANGED"
+    assert int(stale.headers[RANKINGS_VERSION_HEADER]) == current
+    names = {r["spot"]["name"] for r in client.get(f"/api/rankings/user/{username}", headers=auth).json()}
+    assert names == {"First", "Second"}
+
+
+def test_followers_are_paged_with_the_next_cursor_header(client):
+    target, _ = _register(client, public=True)
+    fans = []
+    for _ in range(5):
+        fan, auth = _register(client)
+        assert client.post(f"/api/users/{target}/follow", headers=auth).status_code == 200
+        fans.append(fan)
+
+    seen, params = [], {"limit": 2}
+    while True:
+        r = client.get(f"/api/users/{target}/followers", params=params)
+        assert r.status_code == 200, r.text
+        seen += [u["username"] for u in r.json()]
+        if NEXT_CURSOR_HEADER not in r.headers:
+            break
+        params["cursor"] = r.headers[NEXT_CURSOR_HEADER]
+    assert seen == fans
+
+
+def test_bad_cursor_answers_400(client):
+    target, _ = _register(client, public=True)
+    r = client.get(f"/api/users/{target}/followers", params={"limit": 2, "cursor": "not-a-cursor"})
+    assert r.status_code == 400
@@ -0,0 +1,56 @@
+"""Several processes starting together on an empty data dir must agree on one key."""
+
+import multiprocessing
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from cryptography.fernet import Fernet
+
+from app.keys import load_fernet
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+def _load_and_encrypt(data_dir: str, start, results):
+    start.wait()
+    results.put(load_fernet(Path(data_dir)).encrypt(b"hello"))
+
+
+def test_concurrent_load_fernet_agrees_on_one_key(tmp_path):
+    ctx = multiprocessing.get_context("spawn")
+    for attempt in range(30):
+        data_dir = tmp_path / str(attempt)
+        start, results = ctx.Event(), ctx.Queue()
+        procs = [ctx.Process(target=_load_and_encrypt, args=(str(data_dir), start, results)) for _ in range(8)]
+        for p in procs:
+            p.start()
+        start.set()
+        tokens = [results.get(timeout=60) for _ in procs]
+        for p in procs:
+            p.join(timeout=60)
+            assert p.exitcode == 0
+        key = Fernet((data_dir / ".store.key").read_bytes().strip())
+        assert all(key.decrypt(token) == b"hello" for token in tokens)
+        assert [f.name for f in data_dir.iterdir()] == [".store.key"]
+        assert (data_dir / ".store.key").stat().st_mode & 0o777 == 0o600
+
+
+def test_multi_worker_start_on_empty_dir(tmp_path):
+    env = {
+        **os.environ,
+        "STELI_DATA_DIR": str(tmp_path),
+        "STELI_MULTI_WORKER": "1",
+        "STELI_BCRYPT_ROUNDS": "4",
+        "PYTHONPATH": str(BACKEND),
+    }
+    code = "from app.store import store; print(len(store.users)); store.close()"
+    workers = [subprocess.Popen([sys.executable, "-c", code], env=env, stdout=subprocess.PIPE) for _ in range(4)]
+    outputs = [w.communicate(timeout=120)[0] for w in workers]
+    assert [w.returncode for w in workers] == [0] * 4
+    assert len(set(outputs)) == 1
+    # A later start reads what the first ones wrote.
+    again = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, timeout=120)
+    assert again.returncode == 0, again.stderr
+    assert again.stdout == outputs[0]
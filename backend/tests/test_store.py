@@ -0,0 +1,187 @@
+"""JSON Store behaviour: WAL replay, ranking patches and cursor paging."""
+
+import shutil
+
+import pytest
+
+from app.pagination import next_cursor
+from app.ranking_ops import InvalidRankingOp, RankingVersionConflict
+from app.store import Store
+
+
+@pytest.fixture(autouse=True)
+def _env(monkeypatch):
+    monkeypatch.setenv("STELI_BCRYPT_ROUNDS", "4")
+    monkeypatch.setenv("STELI_DURABILITY", "strict")
+    monkeypatch.delenv("STELI_MULTI_WORKER", raising=False)
+
+
+@pytest.fixture
+def open_store():
+    opened = []
+
+    def _open(data_dir):
+        s = Store(data_dir)
+        opened.append(s)
+        return s
+
+    yield _open
+    for s in opened:
+        s.close()
+
+
+def _user(s, username):
+    return s.create_user(username, "password123", username.title(), "Test")
+
+
+def _rankings(s, user_id):
+    return [(r["spot"]["name"], r["score"], r["notes"]) for r in s.get_user_rankings(user_id)]
+
+
+def _assert_consistent(s):
+    for rid, r in s.rankings.items():
+        assert r["spot_id"] in s.spots, f"ranking {rid} points at a missing spot"
+    for uid in s.users:
+        s.get_user_rankings(uid)
+
+
+def test_replay_restores_rankings_and_new_spots(tmp_path, open_store):
+    s = open_store(tmp_path)
+    uid = _user(s, "alice")["id"]
+    s.set_rankings(uid, [
+        {"spot_name": "Cafe One", "score": 9.0, "notes": "first", "category": "Cafe"},
+        {"spot_name": "Cafe Two", "score": 7.5, "notes": "", "category": "Cafe"},
+    ])
+    version, _ = s.patch_rankings(uid, s.ranking_version(uid), [{"op": "insert", "spot_name": "Bar Three", "position": 0}])
+    expected = _rankings(s, uid)
+    s.close()
+
+    again = open_store(tmp_path)
+    assert _rankings(again, uid) == expected
+    assert again.ranking_version(uid) == version
+    assert {sp["name"] for sp in again.spots.values()} == {"Cafe One", "Cafe Two", "Bar Three"}
+
+
+def _state(s):
+    return {uid: _rankings(s, uid) for uid in s.users}, {sp["name"] for sp in s.spots.values()}
+
+
+def test_every_wal_prefix_replays_to_a_whole_write(tmp_path, open_store):
+    """A crash can cut the log after any record; each record must hold one whole write, so
+    whatever survives replays to the state after some write, never to half of one."""
+    src = tmp_path / "src"
+    s = open_store(src)
+    a, b = _user(s, "alice")["id"], _user(s, "bob")["id"]
+    states = [_state(s)]
+    writes = [
+        lambda: s.set_rankings(a, [{"spot_name": "Noodle Bar"}, {"spot_name": "Taco Stand"}]),
+        lambda: s.patch_rankings(a, s.ranking_version(a), [{"op": "insert", "spot_name": "Dumpling House"}]),
+        lambda: s.record_pairwise_result(b, "Pizza Place", "Burger Joint"),
+        lambda: s.set_rankings(b, [{"spot_name": "Taco Stand"}, {"spot_name": "Ramen Shop"}]),
+        lambda: s.get_or_create_spot("Corner Deli", "Deli"),
+    ]
+    for write in writes:
+        write()
+        states.append(_state(s))
+    s.close()
+
+    lines = (src / "store.wal").read_bytes().splitlines(keepends=True)
+    assert len(lines) == 2 + len(writes)  # the two users, then one record per write
+    for n in range(len(lines) + 1):
+        dst = tmp_path / f"prefix{n}"
+        shutil.copytree(src, dst)
+        (dst / "store.wal").write_bytes(b"".join(lines[:n]))
+        replayed = open_store(dst)
+        _assert_consistent(replayed)
+        if n >= 2:
+            assert _state(replayed) == states[n - 2]
+
+
+def test_torn_final_record_is_dropped(tmp_path, open_store):
+    s = open_store(tmp_path)
+    uid = _user(s, "alice")["id"]
+    s.set_rankings(uid, [{"spot_name": "Kept"}])
+    kept = _rankings(s, uid)
+    s.set_rankings(uid, [{"spot_name": "Kept"}, {"spot_name": "Torn"}])
+    s.close()
+    wal = tmp_path / "store.wal"
+    wal.write_bytes(wal.read_bytes()[:-20])
+
+    again = open_store(tmp_path)
+    assert _rankings(again, uid) == kept
+    assert "torn" not in again.spot_names
+    # The torn tail is gone, so the next write replays after the intact records.
+    again.set_rankings(uid, [{"spot_name": "Kept"}, {"spot_name": "Later"}])
+    expected = _rankings(again, uid)
+    again.close()
+    assert _rankings(open_store(tmp_path), uid) == expected
+
+
+def test_patch_with_stale_version_conflicts(tmp_path, open_store):
+    s = open_store(tmp_path)
+    uid = _user(s, "alice")["id"]
+    s.set_rankings(uid, [{"spot_name": "One"}, {"spot_name": "Two"}])
+    seen = s.ranking_version(uid)
+    version, _ = s.patch_rankings(uid, seen, [{"op": "insert", "spot_name": "Three"}])
+    assert version == seen + 1
+    before = _rankings(s, uid)
+
+    with pytest.raises(RankingVersionConflict) as exc:
+        s.patch_rankings(uid, seen, [{"op": "insert", "spot_name": "Four"}])
+    assert exc.value.current == version
+    assert _rankings(s, uid) == before
+
+
+def test_patch_with_an_invalid_op_changes_nothing(tmp_path, open_store):
+    s = open_store(tmp_path)
+    uid = _user(s, "alice")["id"]
+    s.set_rankings(uid, [{"spot_name": "One"}])
+    version, before = s.ranking_version(uid), _rankings(s, uid)
+
+    with pytest.raises(InvalidRankingOp):
+        s.patch_rankings(uid, version, [{"op": "insert", "spot_name": "Two"}, {"op": "remove", "ranking_id": -1}])
+    assert s.ranking_version(uid) == version
+    assert _rankings(s, uid) == before
+
+
+def _all_pages(fetch, limit, *fields):
+    items, cursor = [], None
+    while True:
+        page = fetch(limit=limit, cursor=cursor)
+        assert len(page) <= limit
+        items += page
+        cursor = next_cursor(page, limit, *fields)
+        if cursor is None:
+            return items
+
+
+@pytest.mark.parametrize("limit", [1, 3, 7, 50])
+def test_follower_pages_cover_every_follower_once(tmp_path, open_store, limit):
+    s = open_store(tmp_path)
+    target = _user(s, "target")["id"]
+    s.update_privacy(target, True)
+    followers = [_user(s, f"fan{i}")["id"] for i in range(7)]
+    for fid in reversed(followers):
+        assert s.follow(fid, target) == "following"
+
+    pages = _all_pages(lambda **kw: s.get_followers(target, **kw), limit, "id")
+    assert [u["id"] for u in pages] == sorted(followers)
+
+
+@pytest.mark.parametrize("limit", [1, 2, 5])
+def test_comment_pages_are_oldest_first_without_gaps(tmp_path, open_store, limit):
+    s = open_store(tmp_path)
+    uid = _user(s, "alice")["id"]
+    s.set_rankings(uid, [{"spot_name": "Spot"}])
+    event_id = s.feed_events[-1]["id"]
+    ids = [s.add_comment(event_id, uid, f"comment {i}")["id"] for i in range(5)]
+
+    pages = _all_pages(lambda **kw: s.get_comments(event_id, **kw), limit, "created_at", "id")
+    assert [c["id"] for c in pages] == ids
+
+
+def test_empty_list_has_no_next_cursor(tmp_path, open_store):
+    s = open_store(tmp_path)
+    uid = _user(s, "alice")["id"]
+    assert s.get_followers(uid, limit=10) == []
+    assert next_cursor([], 10, "id") is None